@@ -1,8 +1,11 @@
+import hashlib
+import json
 from datetime import datetime
-from typing import Dict
+from functools import cached_property
+from typing import Dict, Optional
 from urllib.parse import parse_qs
 
-from pydantic import BaseModel, Field, computed_field
+from pydantic import BaseModel, ConfigDict, Field, computed_field
 
 
 class FortuneTigerRequest(BaseModel):
@@ -29,10 +32,99 @@ class FortuneTigerResponse(BaseModel):
     date: datetime = Field()
 
 
+SPIN_FIELDS = {
+    "bet_profit": "np",
+    "bet_amount": "tb",
+    "win_amount": "tw",
+    "current_balance": "bl",
+}
+
+
+def extract_spin_fields(response_body: Dict) -> Dict[str, int]:
+    """
+    Walk response.body["dt"]["si"] once and read every derived field, each
+    falling back to 0 when missing or not a number.
+    """
+    try:
+        spin = response_body["dt"]["si"]
+    except Exception:
+        spin = {}
+    fields = {}
+    for field, key in SPIN_FIELDS.items():
+        try:
+            fields[field] = int(spin[key])
+        except Exception:
+            fields[field] = 0
+    return fields
+
+
+def spin_key(game_id: str, response_body: Dict) -> Optional[str]:
+    """
+    The natural key of a round: the game session and the spin id in
+    response.body["dt"]["si"], or a digest of the whole spin payload when it
+    has no id.
+    :return: None for responses without a spin payload, such as errors.
+    """
+    try:
+        spin = response_body["dt"]["si"]
+    except Exception:
+        return None
+    if not isinstance(spin, dict):
+        return None
+    spin_id = spin.get("sid")
+    if spin_id is None:
+        spin_id = hashlib.sha1(
+            json.dumps(spin, sort_keys=True, separators=(",", ":")).encode()
+        ).hexdigest()
+    return f"{game_id}:{spin_id}"
+
+
+def copy_document(value):
+    """
+    Deep copy a JSON document, faster than copy.deepcopy since it only has to
+    handle dicts, lists and immutable scalars.
+    """
+    if isinstance(value, dict):
+        return {key: copy_document(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_document(item) for item in value]
+    return value
+
+
 class FortuneTigerData(BaseModel):
+    # Frozen, so request and response cannot be swapped under the cached
+    # to_document() and spin fields. Those are computed from the nested models
+    # on first use, so changing a nested field afterwards outdates them too;
+    # build a changed copy with model_copy instead
+    model_config = ConfigDict(frozen=True)
     request: FortuneTigerRequest
     response: FortuneTigerResponse
 
+    @classmethod
+    def trusted(
+        cls, request: FortuneTigerRequest, response: FortuneTigerResponse
+    ) -> "FortuneTigerData":
+        """
+        Build the data from parts that are already valid, such as the ones the
+        interceptor parses, skipping validation and copies.
+        """
+        return cls.model_construct(request=request, response=response)
+
+    def to_document(self) -> Dict:
+        """
+        The model_dump(mode="json") of the data, computed on the first call.
+        :return: A deep copy, so callers may change it without touching the
+            cached one.
+        """
+        return copy_document(self._json_document)
+
+    def model_copy(self, *, update=None, deep: bool = False) -> "FortuneTigerData":
+        copied = super().model_copy(update=update, deep=deep)
+        # The copy shares the caches of the original, which update may outdate
+        for name in ("_json_document", "_spin_fields"):
+            copied.__dict__.pop(name, None)
+        return copied
+
     @computed_field
     @property
     def game_id(self) -> str:
@@ -44,31 +136,32 @@ class FortuneTigerData(BaseModel):
     @computed_field
     @property
     def bet_profit(self) -> int:
-        try:
-            return int(self.response.body["dt"]["si"]["np"])
-        except Exception as e:
-            return 0
+        return self._spin_fields["bet_profit"]
 
     @computed_field
     @property
     def bet_amount(self) -> int:
-        try:
-            return int(self.response.body["dt"]["si"]["tb"])
-        except Exception as e:
-            return 0
+        return self._spin_fields["bet_amount"]
 
     @computed_field
     @property
     def win_amount(self) -> int:
-        try:
-            return int(self.response.body["dt"]["si"]["tw"])
-        except Exception as e:
-            return 0
+        return self._spin_fields["win_amount"]
 
     @computed_field
     @property
     def current_balance(self) -> int:
-        try:
-            return int(self.response.body["dt"]["si"]["bl"])
-        except Exception as e:
-            return 0
+        return self._spin_fields["current_balance"]
+
+    @computed_field
+    @property
+    def spin_key(self) -> Optional[str]:
+        return spin_key(self.game_id, self.response.body)
+
+    @cached_property
+    def _json_document(self) -> Dict:
+        return self.model_dump(mode="json")
+
+    @cached_property
+    def _spin_fields(self) -> Dict[str, int]:
+        return extract_spin_fields(self.response.body)
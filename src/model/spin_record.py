@@ -0,0 +1,92 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+from model.data import SPIN_FIELDS, FortuneTigerData, extract_spin_fields, spin_key
+
+
+class SpinRecord:
+    """
+    A lean, read-only view of a spin for bulk processing, such as scanning stored
+    documents. Every derived field is extracted once, at construction, into
+    slots; nothing is validated.
+    """
+
+    __slots__ = (
+        "game_id",
+        "date",
+        "spin",
+        "bet_profit",
+        "bet_amount",
+        "win_amount",
+        "current_balance",
+        "key",
+        "_document",
+    )
+
+    game_id: str
+    date: datetime
+    spin: Dict
+    bet_profit: int
+    bet_amount: int
+    win_amount: int
+    current_balance: int
+    # The natural key of the round, None for responses without a spin
+    key: Optional[str]
+    _document: Optional[Dict]
+
+    def __init__(
+        self,
+        game_id: str,
+        date: datetime,
+        spin: Dict,
+        document: Optional[Dict] = None,
+        key: Optional[str] = None,
+    ):
+        self.game_id = game_id
+        self.date = date
+        self.spin = spin
+        fields = extract_spin_fields({"dt": {"si": spin}})
+        for field in SPIN_FIELDS:
+            setattr(self, field, fields[field])
+        if key is None and spin:
+            key = spin_key(game_id, {"dt": {"si": spin}})
+        self.key = key
+        self._document = document
+
+    @classmethod
+    def from_data(cls, data: FortuneTigerData) -> "SpinRecord":
+        try:
+            spin = data.response.body["dt"]["si"]
+        except Exception:
+            spin = {}
+        return cls(
+            game_id=data.game_id, date=data.response.date, spin=spin, key=data.spin_key
+        )
+
+    @classmethod
+    def from_document(cls, document: Dict) -> "SpinRecord":
+        """
+        :param document: A stored spin, in the full or the compact format.
+        """
+        spin = document.get("spin")
+        if spin is None:
+            try:
+                spin = document["response"]["body"]["dt"]["si"]
+            except Exception:
+                spin = {}
+        date = document["response"]["date"]
+        if isinstance(date, str):
+            date = datetime.fromisoformat(date)
+        return cls(
+            game_id=document.get("game_id", 0),
+            date=date,
+            spin=spin,
+            document=document,
+            key=document.get("spin_key"),
+        )
+
+    def to_document(self) -> Optional[Dict]:
+        """
+        :return: The stored document the record was read from, if any.
+        """
+        return self._document
@@ -0,0 +1,3 @@
+from monitoring.pipeline import PipelineMetrics, StageSnapshot, pipeline_metrics
+from monitoring.profiler import SamplingProfiler
+from monitoring.server import MetricsReporter, MetricsServer
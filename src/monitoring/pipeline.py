@@ -0,0 +1,200 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+# Upper bounds, in seconds, of the latency histogram buckets. They go from a
+# sub-millisecond gzip decode to a multi-second OCR call
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+
+class StageSnapshot(BaseModel):
+    stage: str
+    count: int
+    errors: int
+    total_seconds: float
+    # Cumulative counts, one per LATENCY_BUCKETS bound plus +Inf
+    buckets: List[int]
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.count if self.count else 0
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.count if self.count else 0
+
+    def quantile_seconds(self, quantile: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in.
+        """
+        if not self.count:
+            return 0
+        rank = quantile * self.count
+        for bound, cumulative in zip(LATENCY_BUCKETS, self.buckets):
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+class _StageStats:
+    __slots__ = ("count", "errors", "total_seconds", "bucket_counts")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+class _StageTimer:
+    __slots__ = ("_metrics", "_stage", "_started_at")
+
+    def __init__(self, metrics: "PipelineMetrics", stage: str):
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self) -> "_StageTimer":
+        self._started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self._metrics.observe(
+            self._stage, time.perf_counter() - self._started_at, exc_type is not None
+        )
+
+
+class PipelineMetrics:
+    """
+    Latency histograms, counts and errors for each stage of the scraping
+    pipeline. A stage is any block wrapped with stage(name); an exception leaving
+    the block counts as an error of that stage and is re-raised.
+
+    Recording only takes a clock read, a bisect and a short lock, so it can stay
+    on while scraping.
+    """
+
+    _lock: threading.Lock
+    _stages: Dict[str, _StageStats]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def stage(self, name: str) -> _StageTimer:
+        return _StageTimer(self, name)
+
+    def observe(self, stage: str, seconds: float, error: bool = False) -> None:
+        bucket = bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = _StageStats()
+            stats.count += 1
+            stats.total_seconds += seconds
+            stats.bucket_counts[bucket] += 1
+            if error:
+                stats.errors += 1
+
+    def snapshot(self) -> Dict[str, StageSnapshot]:
+        with self._lock:
+            stages = {
+                name: (
+                    stats.count,
+                    stats.errors,
+                    stats.total_seconds,
+                    list(stats.bucket_counts),
+                )
+                for name, stats in self._stages.items()
+            }
+        snapshots = {}
+        for name, (count, errors, total_seconds, bucket_counts) in sorted(
+            stages.items()
+        ):
+            cumulative = []
+            running = 0
+            for bucket_count in bucket_counts:
+                running += bucket_count
+                cumulative.append(running)
+            snapshots[name] = StageSnapshot(
+                stage=name,
+                count=count,
+                errors=errors,
+                total_seconds=total_seconds,
+                buckets=cumulative,
+            )
+        return snapshots
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages = {}
+
+    def render_prometheus(self, prefix: str = "fortune_tiger") -> str:
+        """
+        Render the stages in the Prometheus text exposition format.
+        """
+        snapshots = self.snapshot().values()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Latency of each pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for snapshot in snapshots:
+            label = f'stage="{snapshot.stage}"'
+            bounds = [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+            for bound, cumulative in zip(bounds, snapshot.buckets):
+                lines.append(
+                    f'{prefix}_stage_seconds_bucket{{{label},le="{bound}"}} '
+                    f"{cumulative}"
+                )
+            lines.append(
+                f"{prefix}_stage_seconds_sum{{{label}}} {snapshot.total_seconds}"
+            )
+            lines.append(f"{prefix}_stage_seconds_count{{{label}}} {snapshot.count}")
+        lines += [
+            f"# HELP {prefix}_stage_errors_total Errors raised by each pipeline stage.",
+            f"# TYPE {prefix}_stage_errors_total counter",
+        ]
+        for snapshot in snapshots:
+            lines.append(
+                f'{prefix}_stage_errors_total{{stage="{snapshot.stage}"}} '
+                f"{snapshot.errors}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Optional[str]:
+        """
+        :return: One line with the count, mean, p95 and errors of every stage,
+            or None if nothing was recorded yet.
+        """
+        snapshots = self.snapshot().values()
+        if not snapshots:
+            return None
+        return "; ".join(
+            f"{snapshot.stage} n={snapshot.count} "
+            f"mean={snapshot.mean_seconds * 1000:.1f}ms "
+            f"p95<={snapshot.quantile_seconds(0.95) * 1000:.0f}ms "
+            f"errors={snapshot.error_rate:.1%}"
+            for snapshot in snapshots
+        )
+
+
+# Shared by the scraper, the recognizers and the repository unless they are
+# given their own
+pipeline_metrics = PipelineMetrics()
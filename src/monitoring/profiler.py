@@ -0,0 +1,69 @@
+import cProfile
+import io
+import os
+import pstats
+from contextlib import contextmanager
+from logging import Logger, getLogger
+from typing import Iterator, Optional
+
+
+class SamplingProfiler:
+    """
+    Runs cProfile on one of every sample_every blocks wrapped with sample(), so
+    a long run can be profiled without paying the profiler cost on every batch.
+    Each profile is dumped to output_dir for snakeviz or pstats, and its
+    hottest functions are logged.
+    """
+
+    _sample_every: int
+    _output_dir: str
+    _top: int
+    _logger: Logger
+    _calls: int
+    _active: bool
+
+    def __init__(
+        self,
+        sample_every: int,
+        output_dir: str = "profiles",
+        top: int = 15,
+        logger: Logger = getLogger(__name__),
+    ):
+        if sample_every < 1:
+            raise ValueError("sample_every must be at least 1")
+        self._sample_every = sample_every
+        self._output_dir = output_dir
+        self._top = top
+        self._logger = logger
+        self._calls = 0
+        self._active = False
+
+    @contextmanager
+    def sample(self, name: str = "batch") -> Iterator[Optional[cProfile.Profile]]:
+        """
+        :return: The profile when this block is sampled, otherwise None.
+        """
+        self._calls += 1
+        # cProfile cannot nest, a block inside a sampled one is left alone
+        if self._active or (self._calls - 1) % self._sample_every:
+            yield None
+            return
+        profile = cProfile.Profile()
+        self._active = True
+        profile.enable()
+        try:
+            yield profile
+        finally:
+            profile.disable()
+            self._active = False
+            self._dump(profile, f"{name}-{self._calls:06d}")
+
+    def _dump(self, profile: cProfile.Profile, name: str) -> None:
+        os.makedirs(self._output_dir, exist_ok=True)
+        path = os.path.join(self._output_dir, f"{name}.prof")
+        profile.dump_stats(path)
+        output = io.StringIO()
+        pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(
+            self._top
+        )
+        self._logger.info(f"profile saved at {path}\n{output.getvalue()}")
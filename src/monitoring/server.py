@@ -0,0 +1,144 @@
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import Logger, getLogger
+from typing import Callable, Optional
+
+from pydantic import BaseModel
+
+from monitoring.pipeline import PipelineMetrics
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+JSON_CONTENT_TYPE = "application/json"
+
+
+class MetricsServer:
+    """
+    Serves the pipeline metrics at /metrics for Prometheus to scrape, from a
+    background thread, and the spin statistics at /statistics when given.
+    """
+
+    _metrics: PipelineMetrics
+    _statistics: Optional[Callable[[], BaseModel]]
+    _host: str
+    _port: int
+    _logger: Logger
+    _server: Optional[ThreadingHTTPServer]
+    _thread: Optional[threading.Thread]
+
+    def __init__(
+        self,
+        metrics: PipelineMetrics,
+        port: int = 9108,
+        host: str = "127.0.0.1",
+        logger: Logger = getLogger(__name__),
+        statistics: Optional[Callable[[], BaseModel]] = None,
+    ):
+        """
+        :param statistics: Returns the current statistics, served as JSON.
+        """
+        self._metrics = metrics
+        self._statistics = statistics
+        self._host = host
+        self._port = port
+        self._logger = logger
+        self._server = None
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        """
+        The bound port, which differs from the configured one when it was 0.
+        """
+        if self._server is None:
+            return self._port
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        metrics = self._metrics
+        statistics = self._statistics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/metrics":
+                    body = metrics.render_prometheus().encode()
+                    content_type = PROMETHEUS_CONTENT_TYPE
+                elif path == "/statistics" and statistics is not None:
+                    body = statistics().model_dump_json().encode()
+                    content_type = JSON_CONTENT_TYPE
+                else:
+                    self.send_error(HTTPStatus.NOT_FOUND)
+                    return
+                self.send_response(HTTPStatus.OK)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self._host, self._port), Handler)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics-server", daemon=True
+        )
+        self._thread.start()
+        self._logger.info(f"serving metrics at http://{self._host}:{self.port}/metrics")
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+
+class MetricsReporter:
+    """
+    Logs the pipeline metrics summary every interval_seconds.
+    """
+
+    _metrics: PipelineMetrics
+    _interval_seconds: float
+    _logger: Logger
+    _stopped: threading.Event
+    _thread: Optional[threading.Thread]
+
+    def __init__(
+        self,
+        metrics: PipelineMetrics,
+        interval_seconds: float = 60,
+        logger: Logger = getLogger(__name__),
+    ):
+        self._metrics = metrics
+        self._interval_seconds = interval_seconds
+        self._logger = logger
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-reporter", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        self.report()
+
+    def report(self) -> None:
+        summary = self._metrics.summary()
+        if summary is not None:
+            self._logger.info(f"pipeline stages: {summary}")
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval_seconds):
+            self.report()
@@ -1,18 +1,43 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Iterator, List, Optional
 
 from model.data import FortuneTigerData
+from model.spin_record import SpinRecord
 
 
 class FortuneTigerRepository(ABC):
     @abstractmethod
-    def save_data(self, data: FortuneTigerData) -> str:
+    def save_data(self, data: FortuneTigerData) -> Optional[str]:
         """
         Save a document to the database.
         :param data: An instance of a Pydantic BaseModel containing the data to save.
-        :return: The ID of the saved document.
+        :return: The ID of the saved document, None if the repository already
+            had it.
         """
         pass
 
+    def save_batch(self, batch: List[FortuneTigerData]) -> List[str]:
+        """
+        Save several documents, one by one unless the repository can write them
+        together.
+        :return: The IDs of the saved documents, leaving out the ones the
+            repository already had.
+        """
+        saved = [self.save_data(data) for data in batch]
+        return [inserted_id for inserted_id in saved if inserted_id is not None]
+
+    def iter_records_since(self, since: Optional[datetime]) -> Iterator[SpinRecord]:
+        """
+        Read the spins back from a response date on, to catch up after a
+        restart.
+        :param since: The first response date to read, None to read everything.
+        :return: The spins as SpinRecord, the ones at since included.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} cannot read the spins back"
+        )
+
     @abstractmethod
     def ping(self) -> bool:
         """
@@ -0,0 +1,201 @@
+import threading
+import time
+from collections import deque
+from logging import Logger, getLogger
+from typing import Callable, Deque, Dict, List, Optional
+
+from pydantic import BaseModel
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
+
+from monitoring import PipelineMetrics, pipeline_metrics
+from repository.mongodb.upsert import DUPLICATE_KEY_ERROR, bulk_upsert
+
+
+class BufferedWriterStats(BaseModel):
+    written: int
+    duplicates: int
+    pending: int
+    dropped: int
+    failed: int
+    flushes: int
+    retries: int
+
+
+class BufferedMongoWriter:
+    """
+    Collects documents in memory and writes them with unordered insert_many on a
+    background thread, whenever batch_size documents are pending or
+    flush_interval_seconds have passed. While MongoDB is unreachable the pending
+    batch is kept and retried; once max_buffered_documents are pending, the
+    oldest ones are dropped so memory stays bounded.
+
+    Documents must carry their own _id, so a retried batch that was partially
+    written only fails with duplicate keys for the rows already stored. With an
+    upsert_key, documents are upserted on that natural key instead, so spins
+    captured twice are not stored twice either. on_written is called from the
+    writer thread with the documents each flush actually stored, and the ones
+    it found already stored.
+    """
+
+    _collection: Collection
+    _batch_size: int
+    _flush_interval_seconds: float
+    _max_buffered_documents: int
+    _retry_interval_seconds: float
+    _upsert_key: Optional[str]
+    _on_written: Optional[Callable[[List[Dict], List[Dict]], None]]
+    _logger: Logger
+    _metrics: PipelineMetrics
+    _buffer: Deque[Dict]
+    _condition: threading.Condition
+    _closing: bool
+    _close_deadline: float
+    _worker: Optional[threading.Thread]
+    _stats: Dict[str, int]
+
+    def __init__(
+        self,
+        collection: Collection,
+        batch_size: int = 500,
+        flush_interval_seconds: float = 1,
+        max_buffered_documents: int = 100_000,
+        retry_interval_seconds: float = 5,
+        upsert_key: Optional[str] = None,
+        on_written: Optional[Callable[[List[Dict], List[Dict]], None]] = None,
+        logger: Logger = getLogger(__name__),
+        metrics: PipelineMetrics = pipeline_metrics,
+    ):
+        self._collection = collection
+        self._batch_size = batch_size
+        self._flush_interval_seconds = flush_interval_seconds
+        self._max_buffered_documents = max_buffered_documents
+        self._retry_interval_seconds = retry_interval_seconds
+        self._upsert_key = upsert_key
+        self._on_written = on_written
+        self._logger = logger
+        self._metrics = metrics
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._closing = False
+        self._close_deadline = 0
+        self._stats = dict(
+            written=0, duplicates=0, dropped=0, failed=0, flushes=0, retries=0
+        )
+        self._worker = threading.Thread(
+            target=self._run, name="mongo-buffered-writer", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, document: Dict) -> None:
+        with self._condition:
+            if len(self._buffer) >= self._max_buffered_documents:
+                self._buffer.popleft()
+                self._stats["dropped"] += 1
+            self._buffer.append(document)
+            if len(self._buffer) >= self._batch_size:
+                self._condition.notify()
+
+    def stats(self) -> BufferedWriterStats:
+        with self._condition:
+            return BufferedWriterStats(pending=len(self._buffer), **self._stats)
+
+    def close(self, timeout: float = 30) -> None:
+        """
+        Flush every pending document, retrying while MongoDB is unavailable and
+        giving up after the timeout.
+        """
+        with self._condition:
+            self._closing = True
+            self._close_deadline = time.monotonic() + timeout
+            self._condition.notify()
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+        pending = self.stats().pending
+        if pending:
+            self._logger.error(f"closing with {pending} documents not written")
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closing or len(self._buffer) >= self._batch_size,
+                    timeout=self._flush_interval_seconds,
+                )
+                closing = self._closing
+                batch = self._take_batch()
+            if batch:
+                written = self._write(batch)
+                if not written:
+                    if closing and time.monotonic() >= self._close_deadline:
+                        return
+                    time.sleep(self._retry_interval_seconds)
+                    continue
+            if closing and not batch:
+                return
+
+    def _take_batch(self) -> List[Dict]:
+        batch_length = min(self._batch_size, len(self._buffer))
+        return [self._buffer.popleft() for _ in range(batch_length)]
+
+    def _write(self, batch: List[Dict]) -> bool:
+        """
+        :return: False if the batch was put back to be retried.
+        """
+        started_at = time.perf_counter()
+        failed = []
+        try:
+            if self._upsert_key is not None:
+                result = bulk_upsert(self._collection, batch, self._upsert_key)
+                written = set(result.written)
+                failed = result.errors
+            else:
+                self._collection.insert_many(batch, ordered=False)
+                written = set(range(len(batch)))
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            rejected = {err["index"] for err in errors}
+            written = set(range(len(batch))) - rejected
+            failed = [err for err in errors if err["code"] != DUPLICATE_KEY_ERROR]
+        except ConnectionFailure as e:
+            self._metrics.observe(
+                "mongo_bulk_write", time.perf_counter() - started_at, error=True
+            )
+            self._logger.warning(f"mongodb unavailable, retrying batch later: {e}")
+            with self._condition:
+                self._buffer.extendleft(reversed(batch))
+                while len(self._buffer) > self._max_buffered_documents:
+                    self._buffer.popleft()
+                    self._stats["dropped"] += 1
+                self._stats["retries"] += 1
+            return False
+        except PyMongoError as e:
+            self._metrics.observe(
+                "mongo_bulk_write", time.perf_counter() - started_at, error=True
+            )
+            self._logger.error(f"dropping batch of {len(batch)} documents: {e}")
+            with self._condition:
+                self._stats["failed"] += len(batch)
+            return True
+        self._metrics.observe("mongo_bulk_write", time.perf_counter() - started_at)
+        stored = [doc for index, doc in enumerate(batch) if index in written]
+        # What was neither written nor rejected was already in the collection
+        settled = written | {err["index"] for err in failed}
+        known = [doc for index, doc in enumerate(batch) if index not in settled]
+        duplicates = len(known)
+        if failed:
+            self._logger.error(
+                f"{len(failed)} documents rejected: {failed[0]['errmsg']}"
+            )
+        if self._on_written is not None and (stored or known):
+            try:
+                self._on_written(stored, known)
+            except PyMongoError as e:
+                self._logger.error(f"error after writing {len(stored)} documents: {e}")
+        with self._condition:
+            self._stats["written"] += len(stored)
+            self._stats["duplicates"] += duplicates
+            self._stats["failed"] += len(failed)
+            self._stats["flushes"] += 1
+        return True
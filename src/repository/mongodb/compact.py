@@ -0,0 +1,153 @@
+import copy
+import hashlib
+import json
+from typing import Dict, List, Tuple
+
+import bson
+import zstandard
+
+from model.data import FortuneTigerData
+
+COMPACT_FORMAT_VERSION = 1
+# Headers that change on every spin stay in the spin document, the rest of the
+# header set is stored once per session
+VOLATILE_HEADERS = {"date", "content-length", "x-request-id", "traceparent"}
+
+_compressor = zstandard.ZstdCompressor(level=3)
+_decompressor = zstandard.ZstdDecompressor()
+
+
+def _split_headers(headers: Dict) -> Tuple[Dict, Dict]:
+    stable = {}
+    volatile = {}
+    for name, value in headers.items():
+        if name.lower() in VOLATILE_HEADERS:
+            volatile[name] = value
+        else:
+            stable[name] = value
+    return stable, volatile
+
+
+def to_compact_document(
+    data: FortuneTigerData, compress_body: bool = False
+) -> Tuple[Dict, Dict]:
+    """
+    Split a spin into a compact spin document and the session document holding
+    its endpoint and header set, which are the same for every spin of a
+    session. The spin payload dt.si is stored as the "spin" field, next to the
+    derived fields the full format also has, so the same queries and indexes
+    work on both formats.
+    :param compress_body: Store the rest of the response body zstd compressed.
+    :return: The spin document and the session document it references.
+    """
+    request_headers, request_volatile = _split_headers(data.request.headers)
+    response_headers, response_volatile = _split_headers(data.response.headers)
+    session = {
+        "method": data.request.method,
+        "path": data.request.path,
+        "host": data.request.host,
+        "url": data.request.url,
+        "request_headers": request_headers,
+        "response_headers": response_headers,
+    }
+    session["_id"] = hashlib.sha1(
+        json.dumps(session, sort_keys=True).encode()
+    ).hexdigest()
+
+    body = copy.deepcopy(data.response.body)
+    spin = None
+    # A null dt.si stays in the body, so it reads back as null and not missing
+    if isinstance(body.get("dt"), dict) and body["dt"].get("si") is not None:
+        spin = body["dt"].pop("si")
+    document = {
+        "format": COMPACT_FORMAT_VERSION,
+        "session_id": session["_id"],
+        "game_id": data.game_id,
+        "spin_key": data.spin_key,
+        "bet_profit": data.bet_profit,
+        "bet_amount": data.bet_amount,
+        "win_amount": data.win_amount,
+        "current_balance": data.current_balance,
+        "spin": spin,
+        "request": {
+            "query_string": data.request.query_string,
+            "body": data.request.body,
+            "volatile_headers": request_volatile,
+        },
+        "response": {
+            "status_code": data.response.status_code,
+            "date": data.to_document()["response"]["date"],
+            "volatile_headers": response_volatile,
+        },
+    }
+    if compress_body:
+        document["response"]["body_zstd"] = _compressor.compress(
+            json.dumps(body, separators=(",", ":")).encode()
+        )
+    else:
+        document["response"]["body"] = body
+    return document, session
+
+
+def is_compact_document(document: Dict) -> bool:
+    return document.get("format") == COMPACT_FORMAT_VERSION
+
+
+def from_compact_document(document: Dict, session: Dict) -> FortuneTigerData:
+    """
+    Rebuild the FortuneTigerData a compact document was made from.
+    """
+    request = document["request"]
+    response = document["response"]
+    if "body_zstd" in response:
+        body = json.loads(_decompressor.decompress(response["body_zstd"]))
+    else:
+        body = copy.deepcopy(response["body"])
+    if document.get("spin") is not None:
+        body.setdefault("dt", {})["si"] = document["spin"]
+    return FortuneTigerData.model_validate(
+        {
+            "request": {
+                "headers": {
+                    **session["request_headers"],
+                    **request["volatile_headers"],
+                },
+                "query_string": request["query_string"],
+                "body": request["body"],
+                "method": session["method"],
+                "path": session["path"],
+                "host": session["host"],
+                "url": session["url"],
+            },
+            "response": {
+                "status_code": response["status_code"],
+                "headers": {
+                    **session["response_headers"],
+                    **response["volatile_headers"],
+                },
+                "body": body,
+                "date": response["date"],
+            },
+        }
+    )
+
+
+def bytes_per_spin(data: List[FortuneTigerData]) -> Dict[str, float]:
+    """
+    Average BSON size of a spin in each format. The session documents are
+    amortized over the spins that reference them.
+    """
+    if not data:
+        return {}
+    full = sum(len(bson.encode(item.to_document())) for item in data)
+    sizes = {"full": full / len(data)}
+    for name, compress_body in (("compact", False), ("compact_zstd", True)):
+        total = 0
+        session_sizes = {}
+        for item in data:
+            document, session = to_compact_document(item, compress_body)
+            total += len(bson.encode(document))
+            session_sizes[session["_id"]] = len(bson.encode(session))
+        total += sum(session_sizes.values())
+        sizes[name] = total / len(data)
+    return sizes
@@ -0,0 +1,270 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from logging import Logger, getLogger
+from typing import Dict, Iterable, List, Literal, Optional
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from pydantic import BaseModel, Field
+from pymongo.collection import Collection
+
+from repository.mongodb.compact import is_compact_document
+from repository.mongodb.timeseries import date_field, date_query, is_timeseries
+
+STATE_FILE_NAME = "_export_state.json"
+# Only what the rows are built from; headers and the rest of the body stay in
+# the database
+EXPORT_PROJECTION = {
+    "format": 1,
+    "game_id": 1,
+    "bet_profit": 1,
+    "bet_amount": 1,
+    "win_amount": 1,
+    "current_balance": 1,
+    "response.status_code": 1,
+    "response.date": 1,
+    "response.body.dt.si": 1,
+    "spin": 1,
+}
+# Reel symbols of dt.si: the final reels, and the original ones before a
+# transformation when the spin had one
+SPIN_ARRAY_FIELDS = ("rl", "orl")
+SPIN_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        # As captured: the scraper stores naive local times, aware ones are
+        # converted to UTC
+        ("date", pa.timestamp("us")),
+        ("game_id", pa.string()),
+        ("status_code", pa.int16()),
+        ("bet_profit", pa.int64()),
+        ("bet_amount", pa.int64()),
+        ("win_amount", pa.int64()),
+        ("current_balance", pa.int64()),
+        ("sid", pa.string()),
+        ("psid", pa.string()),
+        *[(field, pa.list_(pa.int32())) for field in SPIN_ARRAY_FIELDS],
+    ]
+)
+
+
+class ExportConfig(BaseModel):
+    output_dir: str
+    # arrow writes uncompressed IPC files, which can be memory mapped as is
+    file_format: Literal["parquet", "arrow"] = "parquet"
+    # Continue after the last exported response.date saved in the output dir
+    incremental: bool = True
+    # Leave out the spins of the last seconds, which a buffered writer may
+    # still be inserting out of order
+    lag_seconds: float = Field(default=60, ge=0)
+    cursor_batch_size: int = Field(default=5000, gt=0)
+    row_group_size: int = Field(default=100_000, gt=0)
+
+
+class ExportStats(BaseModel):
+    rows: int
+    files: List[str]
+    high_water_mark: Optional[str]
+
+
+def _parse_date(value) -> datetime:
+    if isinstance(value, datetime):
+        date = value
+    else:
+        date = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+
+def _int_list(value) -> Optional[List[int]]:
+    if not isinstance(value, list):
+        return None
+    try:
+        return [int(item) for item in value]
+    except (TypeError, ValueError):
+        return None
+
+
+def spin_row(document: Dict) -> Dict:
+    """
+    Flatten a stored spin, in the full or the compact format, into a row of
+    SPIN_SCHEMA.
+    """
+    response = document.get("response", {})
+    if is_compact_document(document):
+        spin = document.get("spin")
+    else:
+        try:
+            spin = response["body"]["dt"]["si"]
+        except (KeyError, TypeError):
+            spin = None
+    spin = spin if isinstance(spin, dict) else {}
+    row = {
+        "id": str(document.get("_id", "")),
+        "date": _parse_date(response["date"]),
+        "game_id": str(document.get("game_id", "")),
+        "status_code": response.get("status_code"),
+        "bet_profit": document.get("bet_profit", 0),
+        "bet_amount": document.get("bet_amount", 0),
+        "win_amount": document.get("win_amount", 0),
+        "current_balance": document.get("current_balance", 0),
+        "sid": None if spin.get("sid") is None else str(spin["sid"]),
+        "psid": None if spin.get("psid") is None else str(spin["psid"]),
+    }
+    for field in SPIN_ARRAY_FIELDS:
+        row[field] = _int_list(spin.get(field))
+    return row
+
+
+class SpinExporter:
+    """
+    Writes spins as typed columnar files, one directory per day in the hive
+    layout (day=2024-12-01/), so analyses can scan the columns they need with
+    pyarrow.dataset instead of parsing JSON documents. Every run adds new part
+    files and remembers the last exported response.date, so the next run only
+    reads what was inserted since.
+    """
+
+    _config: ExportConfig
+    _logger: Logger
+    _run_id: str
+    _day: Optional[str]
+    _rows: List[Dict]
+    _writer: Optional[object]
+    _files: List[str]
+    _written: int
+    _last_date: Optional[str]
+    _high_water_mark: Optional[str]
+
+    def __init__(self, config: ExportConfig, logger: Logger = getLogger(__name__)):
+        self._config = config
+        self._logger = logger
+        self._high_water_mark = self.load_high_water_mark()
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self._config.output_dir, STATE_FILE_NAME)
+
+    def load_high_water_mark(self) -> Optional[str]:
+        if not self._config.incremental or not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path) as state_file:
+            return json.load(state_file)["high_water_mark"]
+
+    def query(self, now: Optional[datetime] = None, timeseries: bool = False) -> Dict:
+        """
+        The filter of the spins this run exports: after the high-water mark
+        and older than lag_seconds. response.date is stored in the scraper
+        local time, so the cutoff is a local time too.
+        """
+        now = now or datetime.now()
+        cutoff = now - timedelta(seconds=self._config.lag_seconds)
+        bounds = {"lte": cutoff.replace(microsecond=0)}
+        if self._high_water_mark is not None:
+            bounds["gt"] = datetime.fromisoformat(self._high_water_mark)
+        return date_query(timeseries, **bounds)
+
+    def export(self, collection: Collection) -> ExportStats:
+        """
+        Stream the spins of the collection, oldest first, into the output dir.
+        """
+        timeseries = is_timeseries(collection.database, collection.name)
+        cursor = (
+            collection.find(self.query(timeseries=timeseries), EXPORT_PROJECTION)
+            .sort(date_field(timeseries), 1)
+            .batch_size(self._config.cursor_batch_size)
+        )
+        try:
+            return self.export_documents(cursor)
+        finally:
+            cursor.close()
+
+    def export_documents(self, documents: Iterable[Dict]) -> ExportStats:
+        """
+        :param documents: Stored spins sorted by response.date.
+        """
+        os.makedirs(self._config.output_dir, exist_ok=True)
+        self._run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        self._day = None
+        self._rows = []
+        self._writer = None
+        self._files = []
+        self._written = 0
+        self._last_date = None
+        try:
+            for document in documents:
+                row = spin_row(document)
+                day = row["date"].date().isoformat()
+                if day != self._day:
+                    self._close_day()
+                    self._day = day
+                self._rows.append(row)
+                self._last_date = document["response"]["date"]
+                if len(self._rows) >= self._config.row_group_size:
+                    self._write_rows()
+            self._close_day()
+        except BaseException:
+            self._discard_day()
+            raise
+        self._logger.info(
+            f"exported {self._written} spins to {len(self._files)} files, "
+            f"up to {self._high_water_mark}"
+        )
+        return ExportStats(
+            rows=self._written,
+            files=self._files,
+            high_water_mark=self._high_water_mark,
+        )
+
+    def _write_rows(self) -> None:
+        table = pa.Table.from_pylist(self._rows, schema=SPIN_SCHEMA)
+        if self._writer is None:
+            self._writer = self._open_writer()
+        self._writer.write_table(table)
+        self._written += len(self._rows)
+        self._rows = []
+
+    def _open_writer(self):
+        directory = os.path.join(self._config.output_dir, f"day={self._day}")
+        os.makedirs(directory, exist_ok=True)
+        extension = "parquet" if self._config.file_format == "parquet" else "arrow"
+        path = os.path.join(directory, f"part-{self._run_id}.{extension}")
+        self._files.append(path)
+        if self._config.file_format == "parquet":
+            return pq.ParquetWriter(path, SPIN_SCHEMA, compression="zstd")
+        return ipc.new_file(path, SPIN_SCHEMA)
+
+    def _close_day(self) -> None:
+        """
+        Finish the file of the current day and move the high-water mark past
+        it. The dates are sorted, so everything before it is exported.
+        """
+        if self._rows:
+            self._write_rows()
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        self._high_water_mark = self._last_date
+        if self._config.incremental:
+            self._save_high_water_mark()
+
+    def _discard_day(self) -> None:
+        """
+        Remove the file of a day that failed halfway, since the high-water mark
+        was not moved and the next run exports those spins again.
+        """
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        os.remove(self._files.pop())
+
+    def _save_high_water_mark(self) -> None:
+        temporary_path = f"{self.state_path}.tmp"
+        with open(temporary_path, "w") as state_file:
+            json.dump({"high_water_mark": self._high_water_mark}, state_file)
+        os.replace(temporary_path, self.state_path)
@@ -0,0 +1,113 @@
+from logging import Logger, getLogger
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+from pymongo import IndexModel
+from pymongo.collection import Collection
+
+ID_INDEX_NAME = "_id_"
+
+
+class IndexSpec(BaseModel):
+    keys: List[Tuple[str, int]] = Field(min_length=1)
+    unique: bool = False
+    # Only documents matching the filter are indexed
+    partial_filter: Optional[Dict] = None
+
+    @property
+    def name(self) -> str:
+        # Same naming scheme pymongo uses when no name is given
+        return "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+    def to_index_model(self) -> IndexModel:
+        options = {}
+        if self.partial_filter is not None:
+            options["partialFilterExpression"] = self.partial_filter
+        return IndexModel(self.keys, name=self.name, unique=self.unique, **options)
+
+
+# MongoDB walks a single field index in both directions, and a compound index
+# serves queries on any of its prefixes, so only these are needed for:
+# - a session's spins over time, and the game_id prefix alone
+# - spins in a date range, optionally filtered or sorted by profit
+# - the biggest wins and losses over the whole history
+SPIN_INDEXES: List[IndexSpec] = [
+    IndexSpec(keys=[("game_id", 1), ("response.date", 1)]),
+    IndexSpec(keys=[("response.date", 1), ("bet_profit", 1)]),
+    IndexSpec(keys=[("bet_profit", 1)]),
+]
+
+# One document per round. Spins stored before the key existed, and responses
+# without a spin payload, have no key and are left out of the index
+SPIN_KEY_INDEX = IndexSpec(
+    keys=[("spin_key", 1)],
+    unique=True,
+    partial_filter={"spin_key": {"$type": "string"}},
+)
+
+
+# The ascending and descending single field indexes older versions created,
+# all served by SPIN_INDEXES now. Only these are dropped by default, so indexes
+# added by hand are left alone
+LEGACY_SPIN_INDEX_NAMES: List[str] = [
+    f"{field}_{direction}"
+    for direction in (1, -1)
+    for field in (
+        "game_id",
+        "bet_profit",
+        "bet_amount",
+        "win_amount",
+        "current_balance",
+        "response.date",
+    )
+]
+
+
+def _direction(value):
+    # index_information may report 1.0 for 1; text or hashed keys stay strings
+    return int(value) if isinstance(value, (int, float)) else value
+
+
+def reconcile_indexes(
+    collection: Collection,
+    specs: List[IndexSpec],
+    drop_unspecified: bool = False,
+    drop_names: Iterable[str] = (),
+    logger: Logger = getLogger(__name__),
+) -> Dict[str, List[str]]:
+    """
+    Make the collection indexes match the specs: create the missing ones and
+    drop the ones no spec asks for that are named in drop_names, or all of
+    them when drop_unspecified is set.
+    :return: The names of the created and dropped indexes.
+    """
+    existing = collection.index_information()
+    existing_keys = {
+        name: [(field, _direction(value)) for field, value in info["key"]]
+        for name, info in existing.items()
+    }
+    wanted = {spec.name: spec for spec in specs}
+    missing = [
+        spec
+        for spec in specs
+        if spec.name not in existing and spec.keys not in existing_keys.values()
+    ]
+    redundant = [
+        name
+        for name, keys in existing_keys.items()
+        if name != ID_INDEX_NAME
+        and name not in wanted
+        and keys not in [spec.keys for spec in specs]
+    ]
+    if missing:
+        collection.create_indexes([spec.to_index_model() for spec in missing])
+        logger.info(f"created indexes: {', '.join(spec.name for spec in missing)}")
+    drop_names = set(drop_names)
+    dropped = []
+    for name in redundant:
+        if drop_unspecified or name in drop_names:
+            collection.drop_index(name)
+            dropped.append(name)
+    if dropped:
+        logger.info(f"dropped redundant indexes: {', '.join(dropped)}")
+    return {"created": [spec.name for spec in missing], "dropped": dropped}
@@ -1,15 +1,83 @@
-from pydantic import BaseModel
+import threading
+from datetime import datetime
+from logging import Logger, getLogger
+from typing import Dict, Iterator, List, Literal, Optional, Set
+
+from bson import ObjectId
+from pydantic import BaseModel, Field
 from pymongo import MongoClient
-from pymongo.errors import ServerSelectionTimeoutError
+from pymongo.errors import BulkWriteError, ServerSelectionTimeoutError
 
 from model.data import FortuneTigerData
+from model.spin_record import SpinRecord
+from monitoring import PipelineMetrics, pipeline_metrics
 from repository.fortune_tiger_interface import FortuneTigerRepository
+from repository.mongodb.buffered_writer import BufferedMongoWriter
+from repository.mongodb.compact import (
+    from_compact_document,
+    is_compact_document,
+    to_compact_document,
+)
+from repository.mongodb.indexes import (
+    LEGACY_SPIN_INDEX_NAMES,
+    SPIN_INDEXES,
+    SPIN_KEY_INDEX,
+    IndexSpec,
+    reconcile_indexes,
+)
+from repository.mongodb.rollups import RollupGranularity, RollupWriter
+from repository.mongodb.timeseries import (
+    TIME_FIELD,
+    Granularity,
+    date_query,
+    is_timeseries,
+    timeseries_indexes,
+    timeseries_options,
+)
+from repository.mongodb.upsert import SPIN_KEY_FIELD, RecentKeys, bulk_upsert
 
 
 class MongoConfig(BaseModel):
     connection_string: str
     database_name: str
     collection_name: str
+    # Write in bulk from a background thread instead of one insert per spin
+    buffered: bool = False
+    flush_batch_size: int = Field(default=500, gt=0)
+    flush_interval_seconds: float = Field(default=1, gt=0)
+    max_buffered_documents: int = Field(default=100_000, gt=0)
+    # Drop every index the specification does not ask for, also the ones added
+    # by hand; otherwise only the single field indexes older versions created
+    drop_unspecified_indexes: bool = False
+    # "compact" stores the parsed spin and references a deduplicated header set
+    # in the <collection_name>_sessions collection
+    document_format: Literal["full", "compact"] = "full"
+    compress_body: bool = False
+    # Store each round once: spins are upserted on their natural key, which a
+    # unique index enforces, and the keys of the last recent_keys spins written
+    # are kept in memory to drop repeats without a round trip
+    deduplicate: bool = True
+    recent_keys: int = Field(default=100_000, ge=0)
+    # "timeseries" creates the collection as a MongoDB time-series collection,
+    # bucketed by a top level copy of response.date and by timeseries_meta_field.
+    # Time-series collections take neither unique indexes nor upserts, so only
+    # the recent keys drop duplicates there
+    collection_type: Literal["plain", "timeseries"] = "plain"
+    timeseries_meta_field: str = "game_id"
+    timeseries_granularity: Granularity = "seconds"
+    # Keep per bucket and game totals of the written spins in a
+    # <collection_name>_rollup_<granularity> collection per granularity
+    rollups: List[RollupGranularity] = ["minute", "hour"]
+
+
+# The fields SpinRecord.from_document reads, in the full and compact formats
+SPIN_RECORD_PROJECTION = {
+    "game_id": 1,
+    "spin": 1,
+    "response.date": 1,
+    "response.body.dt.si": 1,
+    SPIN_KEY_FIELD: 1,
+}
 
 
 # MongoDB Repository Implementation
@@ -17,22 +85,212 @@ class MongoConfig(BaseModel):
 
 class MongoRepository(FortuneTigerRepository):
     _config: MongoConfig
+    _writer: Optional[BufferedMongoWriter]
+    _known_sessions: Set[str]
+    _recent_keys: RecentKeys
+    # The buffered writer thread remembers the keys it writes
+    _recent_keys_lock: threading.Lock
+    _rollups: Optional[RollupWriter]
+    _metrics: PipelineMetrics
 
-    def __init__(self, config: MongoConfig):
+    def __init__(
+        self,
+        config: MongoConfig,
+        metrics: PipelineMetrics = pipeline_metrics,
+        logger: Logger = getLogger(__name__),
+    ):
         self._config = config
+        self._metrics = metrics
+        self._logger = logger
         self.client: MongoClient = MongoClient(
             config.connection_string, serverSelectionTimeoutMS=5000
         )
         self.database = self.client[config.database_name]
         self.collection = self.database[config.collection_name]
+        self.sessions = self.database[f"{config.collection_name}_sessions"]
+        self._known_sessions = set()
+        self._recent_keys = RecentKeys(config.recent_keys)
+        self._recent_keys_lock = threading.Lock()
+        self._rollups = None
+        if config.rollups:
+            self._rollups = RollupWriter(
+                self.database, config.collection_name, config.rollups, logger=logger
+            )
+        self._writer = None
+        if config.buffered:
+            self._writer = BufferedMongoWriter(
+                self.collection,
+                batch_size=config.flush_batch_size,
+                flush_interval_seconds=config.flush_interval_seconds,
+                max_buffered_documents=config.max_buffered_documents,
+                upsert_key=SPIN_KEY_FIELD if self._upserts else None,
+                on_written=self._on_flushed,
+                metrics=metrics,
+            )
+
+    def save_data(self, data: FortuneTigerData) -> Optional[str]:
+        """
+        Save a document to the MongoDB collection. In buffered mode the document
+        is only queued, and the returned ID is assigned before it is written.
+        :return: None for a spin the collection already has.
+        """
+        saved = self.save_batch([data])
+        return saved[0] if saved else None
+
+    def save_batch(self, batch: List[FortuneTigerData]) -> List[str]:
+        """
+        Save the documents with one unordered bulk write, or queue them all in
+        buffered mode. With deduplicate, spins already stored are left out.
+        :return: The IDs of the documents written or queued.
+        """
+        if self._config.deduplicate:
+            batch = self._drop_recent_duplicates(batch)
+        with self._metrics.stage("mongo_encode"):
+            documents = [self._to_document(data) for data in batch]
+        for document in documents:
+            document["_id"] = ObjectId()
+        if self._writer is not None:
+            for document in documents:
+                self._writer.submit(document)
+        elif documents:
+            documents = self._write(documents)
+        return [str(document["_id"]) for document in documents]
+
+    def _write(self, documents: List[Dict]) -> List[Dict]:
+        """
+        :return: The documents that were not in the collection yet.
+        """
+        error = None
+        if not self._upserts:
+            try:
+                with self._metrics.stage("mongo_insert"):
+                    self.collection.insert_many(documents, ordered=False)
+                rejected = set()
+            except BulkWriteError as e:
+                error = e
+                rejected = {err["index"] for err in e.details.get("writeErrors", [])}
+            written = [doc for i, doc in enumerate(documents) if i not in rejected]
+        else:
+            with self._metrics.stage("mongo_insert"):
+                result = bulk_upsert(self.collection, documents, SPIN_KEY_FIELD)
+            if result.errors:
+                error = BulkWriteError(
+                    {"writeErrors": result.errors, "nUpserted": len(result.written)}
+                )
+            rejected = {err["index"] for err in result.errors}
+            written = [documents[index] for index in result.written]
+        # The part of a failed batch that was stored is rolled up all the same
+        self._remember_keys(
+            [doc for i, doc in enumerate(documents) if i not in rejected]
+        )
+        self._apply_rollups(written)
+        if error is not None:
+            raise error
+        return written
+
+    def _on_flushed(self, written: List[Dict], known: List[Dict]) -> None:
+        """
+        Called by the buffered writer once a batch is stored. Keys are only
+        remembered here, so a spin whose batch was dropped can still be saved
+        again.
+        """
+        self._remember_keys(written + known)
+        self._apply_rollups(written)
+
+    def _apply_rollups(self, documents: List[Dict]) -> None:
+        if self._rollups is None or not documents:
+            return
+        with self._metrics.stage("mongo_rollup"):
+            self._rollups.apply(documents)
+
+    def _drop_recent_duplicates(
+        self, batch: List[FortuneTigerData]
+    ) -> List[FortuneTigerData]:
+        """
+        Leave out the spins written recently, and the repeats inside the batch.
+        """
+        unique = []
+        keys = set()
+        with self._recent_keys_lock:
+            for data in batch:
+                key = data.spin_key
+                if key is not None and (key in keys or key in self._recent_keys):
+                    continue
+                keys.add(key)
+                unique.append(data)
+        return unique
+
+    def _remember_keys(self, documents: List[Dict]) -> None:
+        if not self._config.deduplicate:
+            return
+        with self._recent_keys_lock:
+            for document in documents:
+                self._recent_keys.add(document.get(SPIN_KEY_FIELD))
+
+    def iter_data(
+        self, query: Optional[Dict] = None, limit: int = 0
+    ) -> Iterator[FortuneTigerData]:
+        """
+        Read spins back as FortuneTigerData, whatever format they were stored in.
+        """
+        sessions: Dict[str, Dict] = {}
+        for document in self.collection.find(query or {}, limit=limit):
+            if not is_compact_document(document):
+                yield FortuneTigerData.model_validate(document)
+                continue
+            session_id = document["session_id"]
+            if session_id not in sessions:
+                sessions[session_id] = self.sessions.find_one({"_id": session_id})
+            yield from_compact_document(document, sessions[session_id])
 
-    def save_data(self, data: FortuneTigerData) -> str:
+    def iter_records(
+        self, query: Optional[Dict] = None, limit: int = 0
+    ) -> Iterator[SpinRecord]:
         """
-        Save a document to the MongoDB collection.
+        Read spins back as SpinRecord, without building the models, for bulk
+        reads that only need the derived fields.
         """
-        document = data.model_dump(mode="json")
-        result = self.collection.insert_one(document)
-        return str(result.inserted_id)  # Return the inserted document's ID
+        for document in self.collection.find(
+            query or {}, SPIN_RECORD_PROJECTION, limit=limit
+        ):
+            yield SpinRecord.from_document(document)
+
+    def iter_records_since(self, since: Optional[datetime]) -> Iterator[SpinRecord]:
+        """
+        Read back as SpinRecord the spins with a response date from since on,
+        the ones at since included, or all of them when since is None.
+        """
+        query = {}
+        if since is not None:
+            timeseries = is_timeseries(self.database, self.collection.name)
+            query = date_query(timeseries, gte=since)
+        return self.iter_records(query)
+
+    @property
+    def _timeseries(self) -> bool:
+        return self._config.collection_type == "timeseries"
+
+    @property
+    def _upserts(self) -> bool:
+        return self._config.deduplicate and not self._timeseries
+
+    def _to_document(self, data: FortuneTigerData) -> Dict:
+        if self._config.document_format != "compact":
+            document = data.to_document()
+            if self._timeseries:
+                document[TIME_FIELD] = data.response.date
+            return document
+        document, session = to_compact_document(
+            data, compress_body=self._config.compress_body
+        )
+        if self._timeseries:
+            document[TIME_FIELD] = data.response.date
+        if session["_id"] not in self._known_sessions:
+            self.sessions.update_one(
+                {"_id": session["_id"]}, {"$setOnInsert": session}, upsert=True
+            )
+            self._known_sessions.add(session["_id"])
+        return document
 
     def ping(self) -> bool:
         """
@@ -45,25 +303,66 @@ class MongoRepository(FortuneTigerRepository):
             return False
 
     def create_collection(self) -> bool:
+        """
+        Create the collection if it does not exist yet, and reconcile its
+        indexes with the repository index specification.
+        :return: True if the collection was created.
+        """
+        name = self._config.collection_name
         existing_collections = self.database.list_collection_names()
-        if self._config.collection_name not in existing_collections:
-            self.database.create_collection(self._config.collection_name)
-            self.collection = self.database[self._config.collection_name]
-
-            self.collection.create_index([("game_id", 1)])
-            self.collection.create_index([("bet_profit", 1)])
-            self.collection.create_index([("bet_amount", 1)])
-            self.collection.create_index([("win_amount", 1)])
-            self.collection.create_index([("current_balance", 1)])
-            self.collection.create_index([("response.date", 1)])
-
-            self.collection.create_index([("game_id", -1)])
-            self.collection.create_index([("bet_profit", -1)])
-            self.collection.create_index([("bet_amount", -1)])
-            self.collection.create_index([("win_amount", -1)])
-            self.collection.create_index([("current_balance", -1)])
-            self.collection.create_index([("response.date", -1)])
+        created = name not in existing_collections
+        if created and self._timeseries:
+            self.database.create_collection(
+                name,
+                timeseries=timeseries_options(
+                    self._config.timeseries_meta_field,
+                    self._config.timeseries_granularity,
+                ),
+            )
+        elif created:
+            self.database.create_collection(name)
+        elif self._timeseries != is_timeseries(self.database, name):
+            self._logger.warning(
+                f"{name} is not a {self._config.collection_type} collection, "
+                "migrate it with migrate-timeseries"
+            )
+        if created:
+            self.collection = self.database[name]
+        reconcile_indexes(
+            self.collection,
+            self.index_specs(),
+            drop_unspecified=self._config.drop_unspecified_indexes,
+            drop_names=LEGACY_SPIN_INDEX_NAMES,
+        )
+        if self._rollups is not None:
+            self._rollups.create_indexes()
+        return created
+
+    def backfill_rollups(self, since: Optional[datetime] = None) -> int:
+        """
+        Rebuild the rollup collections from the stored spins.
+        :return: How many spins were read.
+        """
+        if self._rollups is None:
+            return 0
+        return self._rollups.backfill(self.collection, since)
+
+    def index_specs(self) -> List[IndexSpec]:
+        if self._timeseries:
+            return timeseries_indexes(self._config.timeseries_meta_field)
+        if self._config.deduplicate:
+            return SPIN_INDEXES + [SPIN_KEY_INDEX]
+        return list(SPIN_INDEXES)
 
     def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._rollups is not None and self._rollups.stale_hours:
+            since = self._rollups.stale_hours[0].isoformat()
+            self._logger.error(
+                f"rollups are missing spins from {since}, "
+                f"rebuild them with backfill-rollups --since {since}"
+            )
         if self.client:
             self.client.close()
@@ -0,0 +1,271 @@
+from datetime import datetime, timedelta, timezone
+from logging import Logger, getLogger
+from typing import Dict, Iterable, List, Literal, Optional, Set, Tuple
+
+from pydantic import BaseModel
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+from pymongo.database import Database
+from pymongo.errors import PyMongoError
+
+from repository.mongodb.indexes import IndexSpec, reconcile_indexes
+from repository.mongodb.timeseries import date_query, is_timeseries
+
+RollupGranularity = Literal["minute", "hour"]
+
+# Fields truncated away to get the start of each granularity bucket
+_TRUNCATED_FIELDS: Dict[str, Dict[str, int]] = {
+    "minute": {"second": 0, "microsecond": 0},
+    "hour": {"minute": 0, "second": 0, "microsecond": 0},
+}
+# Summed with $inc, the balance is tracked with $min and $max instead
+SUMMED_FIELDS = ("bet_amount", "win_amount", "bet_profit")
+ROLLUP_PROJECTION = {
+    "game_id": 1,
+    "response.date": 1,
+    "current_balance": 1,
+    **{field: 1 for field in SUMMED_FIELDS},
+}
+ROLLUP_INDEXES = [IndexSpec(keys=[("start", 1), ("game_id", 1)], unique=True)]
+
+
+def rollup_collection_name(collection_name: str, granularity: str) -> str:
+    return f"{collection_name}_rollup_{granularity}"
+
+
+def bucket_start(date, granularity: RollupGranularity) -> datetime:
+    """
+    :param date: A response.date, as stored or as a datetime.
+    :return: The start of its bucket, aware dates being converted to UTC.
+    """
+    if not isinstance(date, datetime):
+        date = datetime.fromisoformat(date.replace("Z", "+00:00"))
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date.replace(**_TRUNCATED_FIELDS[granularity])
+
+
+class RollupBucket(BaseModel):
+    spins: int = 0
+    wins: int = 0
+    bet_amount: int = 0
+    win_amount: int = 0
+    bet_profit: int = 0
+    balance_min: Optional[int] = None
+    balance_max: Optional[int] = None
+
+    def add(self, document: Dict) -> None:
+        self.spins += 1
+        self.wins += document.get("win_amount", 0) > 0
+        for field in SUMMED_FIELDS:
+            setattr(self, field, getattr(self, field) + document.get(field, 0))
+        balance = document.get("current_balance")
+        if balance is not None:
+            self.balance_min = (
+                balance if self.balance_min is None else min(self.balance_min, balance)
+            )
+            self.balance_max = (
+                balance if self.balance_max is None else max(self.balance_max, balance)
+            )
+
+    def to_update(self) -> Dict:
+        update = {
+            "$inc": {
+                "spins": self.spins,
+                "wins": self.wins,
+                **{field: getattr(self, field) for field in SUMMED_FIELDS},
+            }
+        }
+        if self.balance_min is not None:
+            update["$min"] = {"balance_min": self.balance_min}
+            update["$max"] = {"balance_max": self.balance_max}
+        return update
+
+
+def aggregate_documents(
+    documents: Iterable[Dict], granularity: RollupGranularity
+) -> Dict[Tuple[datetime, str], RollupBucket]:
+    """
+    Sum stored spin documents, of either format, per bucket and game.
+    """
+    buckets: Dict[Tuple[datetime, str], RollupBucket] = {}
+    for document in documents:
+        key = (
+            bucket_start(document["response"]["date"], granularity),
+            str(document.get("game_id")),
+        )
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = RollupBucket()
+        bucket.add(document)
+    return buckets
+
+
+class RollupWriter:
+    """
+    Keeps a rollup collection per granularity up to date with the spins
+    written to a collection: a batch is summed in memory first, then applied
+    with one bulk write of $inc, $min and $max upserts per granularity, so
+    each bucket and game costs one update per batch whatever its spins.
+    Only spins actually written must be passed, or duplicates count twice.
+
+    The updates are not idempotent, so a failed batch is not retried as is:
+    the hours of its spins are recorded as stale instead, and rebuilt from the
+    raw spins once a later batch applies.
+    """
+
+    _database: Database
+    _collection_name: str
+    _collections: Dict[str, Collection]
+    _stale_hours: Set[datetime]
+    _logger: Logger
+
+    def __init__(
+        self,
+        database: Database,
+        collection_name: str,
+        granularities: List[RollupGranularity],
+        logger: Logger = getLogger(__name__),
+    ):
+        self._database = database
+        self._collection_name = collection_name
+        self._collections = {
+            granularity: database[rollup_collection_name(collection_name, granularity)]
+            for granularity in granularities
+        }
+        self._stale_hours = set()
+        self._logger = logger
+
+    @property
+    def stale_hours(self) -> List[datetime]:
+        """
+        The starts of the hours whose rollups missed spins and are not rebuilt
+        yet, to backfill if the process stops before they are.
+        """
+        return sorted(self._stale_hours)
+
+    def create_indexes(self) -> None:
+        for collection in self._collections.values():
+            reconcile_indexes(collection, ROLLUP_INDEXES, logger=self._logger)
+
+    def apply(self, documents: List[Dict]) -> None:
+        """
+        Add written spins to the rollups. Call it from the thread that writes
+        them, after each write, since rebuilding the stale hours reads the raw
+        spins and the ones written but not applied yet would count twice.
+        """
+        if not documents:
+            return
+        try:
+            self._update_buckets(documents)
+        except PyMongoError:
+            self._stale_hours.update(
+                bucket_start(document["response"]["date"], "hour")
+                for document in documents
+            )
+            raise
+        if self._stale_hours:
+            self._rebuild_stale_hours()
+
+    def _update_buckets(self, documents: List[Dict]) -> None:
+        if not documents:
+            return
+        for granularity, collection in self._collections.items():
+            operations = [
+                UpdateOne(
+                    {"start": start, "game_id": game_id},
+                    bucket.to_update(),
+                    upsert=True,
+                )
+                for (start, game_id), bucket in aggregate_documents(
+                    documents, granularity
+                ).items()
+            ]
+            collection.bulk_write(operations, ordered=False)
+
+    def _rebuild_stale_hours(self) -> None:
+        source = self._database[self._collection_name]
+        try:
+            timeseries = is_timeseries(source.database, source.name)
+            for start in self.stale_hours:
+                end = start + timedelta(hours=1)
+                for collection in self._collections.values():
+                    collection.delete_many({"start": {"$gte": start, "$lt": end}})
+                query = date_query(timeseries, gte=start, lt=end)
+                self._update_buckets(list(source.find(query, ROLLUP_PROJECTION)))
+                self._stale_hours.discard(start)
+                self._logger.info(f"rebuilt the stale rollups of {start}")
+        except PyMongoError as e:
+            self._logger.warning(f"could not rebuild the stale rollups yet: {e}")
+
+    def clear(self, since: Optional[datetime] = None) -> None:
+        query = {} if since is None else {"start": {"$gte": since}}
+        for collection in self._collections.values():
+            collection.delete_many(query)
+
+    def backfill(
+        self,
+        source: Collection,
+        since: Optional[datetime] = None,
+        batch_size: int = 10_000,
+    ) -> int:
+        """
+        Rebuild the rollups from the raw spins, all of them or the ones from
+        since on, rounded down to the hour so no bucket is rebuilt partially.
+        Spins written while it runs may be counted twice, so run it with the
+        scraper stopped, or from a point before the live data.
+        :return: How many spins were read.
+        """
+        query = {}
+        if since is not None:
+            since = bucket_start(since, "hour")
+            timeseries = is_timeseries(source.database, source.name)
+            query = date_query(timeseries, gte=since)
+        self.clear(since)
+        read = 0
+        batch = []
+        for document in source.find(query, ROLLUP_PROJECTION, batch_size=batch_size):
+            batch.append(document)
+            if len(batch) == batch_size:
+                self._update_buckets(batch)
+                read += len(batch)
+                batch = []
+                self._logger.info(f"rolled up {read} spins")
+        self._update_buckets(batch)
+        self._stale_hours = {
+            start for start in self._stale_hours if since is not None and start < since
+        }
+        return read + len(batch)
+
+
+def rollup_totals(
+    collection: Collection,
+    since: datetime,
+    until: datetime,
+    game_id: Optional[str] = None,
+) -> List[Dict]:
+    """
+    The totals of each bucket in [since, until), across games unless game_id
+    is given, read from a rollup collection instead of the raw spins.
+    """
+    match = {"start": {"$gte": since, "$lt": until}}
+    if game_id is not None:
+        match["game_id"] = game_id
+    return list(
+        collection.aggregate(
+            [
+                {"$match": match},
+                {
+                    "$group": {
+                        "_id": "$start",
+                        "spins": {"$sum": "$spins"},
+                        "wins": {"$sum": "$wins"},
+                        **{field: {"$sum": f"${field}"} for field in SUMMED_FIELDS},
+                        "balance_min": {"$min": "$balance_min"},
+                        "balance_max": {"$max": "$balance_max"},
+                    }
+                },
+                {"$sort": {"_id": 1}},
+            ]
+        )
+    )
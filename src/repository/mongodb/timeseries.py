@@ -0,0 +1,299 @@
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from logging import Logger, getLogger
+from typing import Dict, Iterator, List, Literal, Optional
+
+from pydantic import BaseModel, TypeAdapter
+from pymongo.collection import Collection
+from pymongo.database import Database
+
+from repository.mongodb.indexes import IndexSpec, reconcile_indexes
+
+# Time-series collections need a top level BSON date; response.date stays an
+# ISO string, so the documents read back the same in both collection types
+TIME_FIELD = "date"
+
+_dates = TypeAdapter(datetime)
+
+Granularity = Literal["seconds", "minutes", "hours"]
+
+# Synthetic sessions: each game spins every 1.5 seconds, like the scraper does
+SYNTHETIC_GAMES = 100
+SYNTHETIC_SPIN_INTERVAL_SECONDS = 1.5
+
+
+def timeseries_options(meta_field: str, granularity: Granularity) -> Dict:
+    return {
+        "timeField": TIME_FIELD,
+        "metaField": meta_field,
+        "granularity": granularity,
+    }
+
+
+def timeseries_indexes(meta_field: str) -> List[IndexSpec]:
+    # Buckets are clustered by time, so a time range alone needs no index.
+    # MongoDB 6.3+ creates the meta and time index itself, under the same name
+    return [
+        IndexSpec(keys=[(meta_field, 1), (TIME_FIELD, 1)]),
+        IndexSpec(keys=[("bet_profit", 1)]),
+    ]
+
+
+def is_timeseries(database: Database, collection_name: str) -> bool:
+    for info in database.list_collections(filter={"name": collection_name}):
+        return info.get("type") == "timeseries"
+    return False
+
+
+def date_field(timeseries: bool) -> str:
+    return TIME_FIELD if timeseries else "response.date"
+
+
+def date_query(timeseries: bool, **bounds: datetime) -> Dict:
+    """
+    Filter spins on their date, e.g. date_query(timeseries, gte=since). A
+    time-series collection is filtered on its time field, which its buckets are
+    clustered by; response.date is not indexed there. A plain collection is
+    filtered on response.date, compared as the ISO string it is stored as.
+    """
+    if timeseries:
+        return {TIME_FIELD: {f"${op}": date for op, date in bounds.items()}}
+    return {
+        "response.date": {
+            f"${op}": _dates.dump_python(date, mode="json")
+            for op, date in bounds.items()
+        }
+    }
+
+
+def _parse_date(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def to_timeseries_document(document: Dict) -> Dict:
+    """
+    Add the time field a time-series collection needs to a stored spin
+    document, of either format.
+    """
+    document[TIME_FIELD] = _parse_date(document["response"]["date"])
+    return document
+
+
+class MigrationStats(BaseModel):
+    source: str
+    target: str
+    copied: int
+    seconds: float
+
+
+def migrate_to_timeseries(
+    database: Database,
+    collection_name: str,
+    meta_field: str = "game_id",
+    granularity: Granularity = "seconds",
+    batch_size: int = 5000,
+    logger: Logger = getLogger(__name__),
+) -> MigrationStats:
+    """
+    Turn a plain spin collection into a time-series one with the same name.
+    Time-series collections cannot be renamed, so the plain collection is
+    renamed to <collection_name>_plain first, then copied into the new one in
+    batches, and kept as a backup to be dropped once the copy is checked.
+    """
+    started_at = time.perf_counter()
+    backup_name = f"{collection_name}_plain"
+    if is_timeseries(database, collection_name):
+        raise ValueError(f"{collection_name} already is a time-series collection")
+    if backup_name in database.list_collection_names():
+        raise ValueError(f"{backup_name} exists, drop it or finish that migration")
+    database[collection_name].rename(backup_name)
+    source = database[backup_name]
+    database.create_collection(
+        collection_name, timeseries=timeseries_options(meta_field, granularity)
+    )
+    target = database[collection_name]
+    copied = 0
+    batch = []
+    for document in source.find(batch_size=batch_size):
+        batch.append(to_timeseries_document(document))
+        if len(batch) == batch_size:
+            target.insert_many(batch, ordered=False)
+            copied += len(batch)
+            batch = []
+            logger.info(f"copied {copied} spins into {collection_name}")
+    if batch:
+        target.insert_many(batch, ordered=False)
+        copied += len(batch)
+    reconcile_indexes(target, timeseries_indexes(meta_field), logger=logger)
+    expected = source.estimated_document_count()
+    if copied != expected:
+        logger.warning(f"copied {copied} spins of the {expected} in {backup_name}")
+    return MigrationStats(
+        source=backup_name,
+        target=collection_name,
+        copied=copied,
+        seconds=time.perf_counter() - started_at,
+    )
+
+
+def synthetic_documents(
+    count: int,
+    games: int = SYNTHETIC_GAMES,
+    start: datetime = datetime(2024, 1, 1),
+    spin_interval_seconds: float = SYNTHETIC_SPIN_INTERVAL_SECONDS,
+    seed: int = 0,
+) -> Iterator[Dict]:
+    """
+    Spin documents shaped like the full format, games playing in turns, for
+    storage benchmarks. Built as plain dicts, the models being too slow for
+    millions of spins.
+    """
+    generator = random.Random(seed)
+    balances = [100000] * games
+    for index in range(count):
+        game = index % games
+        bet = generator.choice([30, 90, 450, 900])
+        win = bet * generator.choice([0, 0, 0, 0, 1, 2, 5, 10])
+        balances[game] += win - bet
+        date = start + timedelta(seconds=index * spin_interval_seconds / games)
+        yield {
+            "request": {
+                "headers": {"content-type": "application/x-www-form-urlencoded"},
+                "query_string": f"traceId={index:08X}",
+                "body": {"atk": [f"token-{game}"], "id": [str(index)]},
+                "method": "POST",
+                "path": "/game-api/fortune-tiger/v2/Spin",
+                "host": "api.pg-demo.com",
+                "url": "https://api.pg-demo.com/game-api/fortune-tiger/v2/Spin",
+                "body_format": "Form Value",
+                "query_string_map": {"traceId": [f"{index:08X}"]},
+            },
+            "response": {
+                "status_code": 200,
+                "headers": {"content-encoding": "gzip"},
+                "body": {
+                    "dt": {
+                        "si": {
+                            "sid": str(index),
+                            "bl": balances[game],
+                            "tb": bet,
+                            "tw": win,
+                            "np": win - bet,
+                            "rl": [generator.randint(0, 7) for _ in range(9)],
+                        }
+                    },
+                    "err": None,
+                },
+                "date": date.isoformat(),
+            },
+            "game_id": f"token-{game}",
+            "bet_profit": win - bet,
+            "bet_amount": bet,
+            "win_amount": win,
+            "current_balance": balances[game],
+            "spin_key": f"token-{game}:{index}",
+        }
+
+
+class StorageBenchmarkResult(BaseModel):
+    layout: str
+    spins: int
+    storage_bytes: int
+    index_bytes: int
+    inserts_per_second: float
+    median_range_query_ms: float
+    p95_range_query_ms: float
+
+
+def _storage_sizes(database: Database, collection_name: str) -> Dict[str, int]:
+    stats = database.command("collStats", collection_name)
+    return {
+        "storage_bytes": int(stats.get("storageSize", 0)),
+        "index_bytes": int(stats.get("totalIndexSize", 0)),
+    }
+
+
+def benchmark_storage(
+    database: Database,
+    specs_by_layout: Dict[str, Optional[List[IndexSpec]]],
+    spins: int,
+    meta_field: str = "game_id",
+    granularity: Granularity = "seconds",
+    batch_size: int = 5000,
+    queries: int = 50,
+    range_minutes: float = 10,
+    logger: Logger = getLogger(__name__),
+) -> List[StorageBenchmarkResult]:
+    """
+    Load the same synthetic spins into a collection per layout, and compare
+    their size, insert rate and the latency of reading a time range.
+    :param specs_by_layout: The indexes of each plain layout; None for the
+        time-series layout.
+    """
+    results = []
+    start = datetime(2024, 1, 1)
+    last = start + timedelta(
+        seconds=spins * SYNTHETIC_SPIN_INTERVAL_SECONDS / SYNTHETIC_GAMES
+    )
+    for layout, specs in specs_by_layout.items():
+        name = f"benchmark_{layout}"
+        database.drop_collection(name)
+        timeseries = specs is None
+        if timeseries:
+            database.create_collection(
+                name, timeseries=timeseries_options(meta_field, granularity)
+            )
+            specs = timeseries_indexes(meta_field)
+        collection: Collection = database[name]
+        reconcile_indexes(collection, specs, logger=logger)
+        elapsed = 0.0
+        batch = []
+        for document in synthetic_documents(spins, start=start):
+            if timeseries:
+                to_timeseries_document(document)
+            batch.append(document)
+            if len(batch) == batch_size:
+                elapsed += _timed_insert(collection, batch)
+                batch = []
+        if batch:
+            elapsed += _timed_insert(collection, batch)
+        latencies = []
+        generator = random.Random(1)
+        window = timedelta(minutes=range_minutes)
+        for _ in range(queries):
+            since = start + (last - window - start) * generator.random()
+            # The filter the exporter, the rollup backfill and the statistics
+            # replay run on this layout
+            query = date_query(timeseries, gte=since, lt=since + window)
+            query_started_at = time.perf_counter()
+            list(collection.find(query, {"bet_profit": 1, "_id": 0}))
+            latencies.append((time.perf_counter() - query_started_at) * 1000)
+        latencies.sort()
+        result = StorageBenchmarkResult(
+            layout=layout,
+            spins=spins,
+            inserts_per_second=spins / elapsed if elapsed else 0,
+            median_range_query_ms=statistics.median(latencies),
+            p95_range_query_ms=latencies[int(len(latencies) * 0.95) - 1],
+            **_storage_sizes(database, name),
+        )
+        logger.info(
+            f"{layout}: {result.storage_bytes / 2**20:.1f} MiB data, "
+            f"{result.index_bytes / 2**20:.1f} MiB indexes, "
+            f"{result.inserts_per_second:.0f} inserts/s, range query "
+            f"p50 {result.median_range_query_ms:.1f} ms, "
+            f"p95 {result.p95_range_query_ms:.1f} ms"
+        )
+        results.append(result)
+        database.drop_collection(name)
+    return results
+
+
+def _timed_insert(collection: Collection, batch: List[Dict]) -> float:
+    started_at = time.perf_counter()
+    collection.insert_many(batch, ordered=False)
+    return time.perf_counter() - started_at
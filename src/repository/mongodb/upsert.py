@@ -0,0 +1,95 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Union
+
+from pydantic import BaseModel
+from pymongo import InsertOne, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY_ERROR = 11000
+SPIN_KEY_FIELD = "spin_key"
+
+
+class RecentKeys:
+    """
+    The last capacity natural keys written, least recently seen dropped first.
+    Unlike a Bloom filter it has no false positives, so a spin is never dropped
+    for a key it does not have.
+    """
+
+    _capacity: int
+    _keys: "OrderedDict[str, None]"
+
+    def __init__(self, capacity: int = 100_000):
+        self._capacity = capacity
+        self._keys = OrderedDict()
+
+    def __contains__(self, key: Optional[str]) -> bool:
+        if key is None or key not in self._keys:
+            return False
+        self._keys.move_to_end(key)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: Optional[str]) -> None:
+        if key is None or self._capacity <= 0:
+            return
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        while len(self._keys) > self._capacity:
+            self._keys.popitem(last=False)
+
+
+class UpsertResult(BaseModel):
+    # Indexes in the batch of the documents that were written
+    written: List[int]
+    duplicates: int
+    # The write errors other than duplicate keys
+    errors: List[Dict]
+
+
+def upsert_operation(document: Dict, key_field: str) -> Union[UpdateOne, InsertOne]:
+    """
+    Insert the document unless one with the same natural key is stored.
+    Documents without a key are inserted as they are.
+    """
+    key = document.get(key_field)
+    if key is None:
+        return InsertOne(document)
+    return UpdateOne({key_field: key}, {"$setOnInsert": document}, upsert=True)
+
+
+def bulk_upsert(
+    collection: Collection, documents: List[Dict], key_field: str = SPIN_KEY_FIELD
+) -> UpsertResult:
+    """
+    Write the documents with one unordered bulk_write of upserts on their
+    natural key, so writing a document again is a no-op instead of a copy.
+    Connection errors are raised for the caller to retry the batch, which is
+    safe for the same reason.
+    """
+    if not documents:
+        return UpsertResult(written=[], duplicates=0, errors=[])
+    operations = [upsert_operation(document, key_field) for document in documents]
+    try:
+        result = collection.bulk_write(operations, ordered=False)
+        upserted: Set[int] = set(result.upserted_ids or {})
+        write_errors: List[Dict] = []
+    except BulkWriteError as e:
+        upserted = {upsert["index"] for upsert in e.details.get("upserted", [])}
+        write_errors = e.details.get("writeErrors", [])
+    failed = {error["index"] for error in write_errors}
+    inserts = {
+        index
+        for index, operation in enumerate(operations)
+        if isinstance(operation, InsertOne)
+    }
+    written = sorted(upserted | (inserts - failed))
+    errors = [error for error in write_errors if error["code"] != DUPLICATE_KEY_ERROR]
+    return UpsertResult(
+        written=written,
+        duplicates=len(documents) - len(written) - len(errors),
+        errors=errors,
+    )
@@ -0,0 +1,93 @@
+import os
+from datetime import datetime
+from logging import Logger, getLogger
+from typing import Iterator, List, Optional
+
+import orjson
+
+from model.data import FortuneTigerData
+from model.spin_record import SpinRecord
+from monitoring import PipelineMetrics, pipeline_metrics
+from repository.fortune_tiger_interface import FortuneTigerRepository
+from repository.segment_log.segment import (
+    SegmentLogConfig,
+    SegmentReader,
+    SegmentWriter,
+)
+
+
+class SegmentLogRepository(FortuneTigerRepository):
+    """
+    Appends the spins to local segment files, so capturing needs no database
+    and never waits on one. The IDs are the offsets of the records in the log.
+    Closed segments are loaded into MongoDB by a SegmentShipper.
+    """
+
+    _config: SegmentLogConfig
+    _metrics: PipelineMetrics
+    _writer: SegmentWriter
+
+    def __init__(
+        self,
+        config: SegmentLogConfig = SegmentLogConfig(),
+        logger: Logger = getLogger(__name__),
+        metrics: PipelineMetrics = pipeline_metrics,
+    ):
+        self._config = config
+        self._metrics = metrics
+        self._writer = SegmentWriter(config, logger=logger)
+
+    def save_data(self, data: FortuneTigerData) -> str:
+        return self.save_batch([data])[0]
+
+    def save_batch(self, batch: List[FortuneTigerData]) -> List[str]:
+        with self._metrics.stage("segment_encode"):
+            records = [orjson.dumps(data.to_document()) for data in batch]
+        with self._metrics.stage("segment_append"):
+            offsets = self._writer.append(records)
+        return [str(offset) for offset in offsets]
+
+    def iter_data(
+        self, from_offset: int = 0, limit: int = 0
+    ) -> Iterator[FortuneTigerData]:
+        """
+        Read the spins back in the order they were saved, the ones of the open
+        segment included once their block is written.
+        """
+        self._writer.flush()
+        reader = SegmentReader(self._config.directory)
+        for read, (_, record) in enumerate(reader.read(from_offset), 1):
+            yield FortuneTigerData.model_validate_json(record)
+            if read == limit:
+                return
+
+    def iter_records_since(self, since: Optional[datetime]) -> Iterator[SpinRecord]:
+        """
+        Read back as SpinRecord the spins with a response date from since on,
+        the ones at since included, or all of them when since is None.
+        """
+        for data in self.iter_data():
+            if since is None or data.response.date >= since:
+                yield SpinRecord.from_data(data)
+
+    def ping(self) -> bool:
+        """
+        Check that the segment directory can be written.
+        """
+        directory = self._config.directory
+        if not os.path.isdir(directory):
+            directory = os.path.dirname(os.path.abspath(directory))
+        return os.access(directory, os.W_OK)
+
+    def create_collection(self) -> bool:
+        """
+        Create the segment directory if needed and open the log, closing a
+        segment a crash left open.
+        :return: True if the directory was created.
+        """
+        created = not os.path.isdir(self._config.directory)
+        self._writer.open()
+        return created
+
+    def close(self) -> None:
+        self._writer.close()
@@ -0,0 +1,414 @@
+import bisect
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from logging import Logger, getLogger
+from typing import IO, Iterator, List, Literal, Optional, Tuple
+
+import zstandard
+from pydantic import BaseModel, Field
+
+# A block is a zstd frame holding consecutive records, each prefixed with its
+# length; its header holds the offset of its first record, its record count,
+# the compressed length and the crc32 of the compressed bytes
+BLOCK_HEADER = struct.Struct(">QIII")
+RECORD_HEADER = struct.Struct(">I")
+# One entry per block: the offset of its first record and its file position
+INDEX_ENTRY = struct.Struct(">QQ")
+
+OPEN_SUFFIX = ".open"
+LOG_SUFFIX = ".log"
+INDEX_SUFFIX = ".index"
+# Offset up to which the records were shipped, which also keeps the offsets
+# growing once every shipped segment was deleted
+SHIPPED_STATE_FILE = "_shipped.json"
+
+
+class SegmentLogConfig(BaseModel):
+    directory: str = "segments"
+    # A segment is closed, and can be shipped, once it reaches either limit
+    segment_bytes: int = Field(default=64 * 1024 * 1024, gt=0)
+    segment_seconds: float = Field(default=3600, gt=0)
+    # Records are compressed together until the block reaches a limit
+    block_records: int = Field(default=100, gt=0)
+    block_bytes: int = Field(default=256 * 1024, gt=0)
+    flush_interval_seconds: float = Field(default=1, gt=0)
+    # "always" writes and fsyncs every append before returning, "interval"
+    # fsyncs at most every fsync_interval_seconds and "never" leaves it to the
+    # OS; closed segments are always fsynced
+    fsync: Literal["always", "interval", "never"] = "interval"
+    fsync_interval_seconds: float = Field(default=1, gt=0)
+    compression_level: int = 3
+
+
+class SegmentInfo(BaseModel):
+    base_offset: int
+    path: str
+    index_path: str
+    closed: bool
+
+
+def _segment_name(base_offset: int) -> str:
+    return f"{base_offset:020d}"
+
+
+def list_segments(directory: str) -> List[SegmentInfo]:
+    """
+    :return: The segments in the directory, oldest first.
+    """
+    if not os.path.isdir(directory):
+        return []
+    segments = []
+    for name in os.listdir(directory):
+        stem, suffix = os.path.splitext(name)
+        if suffix not in (LOG_SUFFIX, OPEN_SUFFIX) or not stem.isdigit():
+            continue
+        segments.append(
+            SegmentInfo(
+                base_offset=int(stem),
+                path=os.path.join(directory, name),
+                index_path=os.path.join(directory, stem + INDEX_SUFFIX),
+                closed=suffix == LOG_SUFFIX,
+            )
+        )
+    return sorted(segments, key=lambda segment: segment.base_offset)
+
+
+def read_shipped_offset(directory: str) -> int:
+    """
+    :return: The offset of the first record not shipped yet.
+    """
+    path = os.path.join(directory, SHIPPED_STATE_FILE)
+    if not os.path.exists(path):
+        return 0
+    with open(path) as state_file:
+        return json.load(state_file)["shipped_offset"]
+
+
+def save_shipped_offset(directory: str, offset: int) -> None:
+    path = os.path.join(directory, SHIPPED_STATE_FILE)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as state_file:
+        json.dump({"shipped_offset": offset}, state_file)
+    os.replace(temporary_path, path)
+
+
+def read_index(index_path: str) -> List[Tuple[int, int]]:
+    if not os.path.exists(index_path):
+        return []
+    with open(index_path, "rb") as index_file:
+        content = index_file.read()
+    # A torn entry at the end of an open segment index is left out
+    end = len(content) - len(content) % INDEX_ENTRY.size
+    return list(INDEX_ENTRY.iter_unpack(content[:end]))
+
+
+def iter_blocks(path: str, position: int = 0) -> Iterator[Tuple[int, int, int, bytes]]:
+    """
+    Read the blocks of a segment from a file position, stopping at the first
+    incomplete or corrupt one, which is where an open segment being written
+    or a crash left it.
+    :return: The file position, first record offset, record count and
+        compressed bytes of each block.
+    """
+    with open(path, "rb", buffering=1024 * 1024) as segment_file:
+        segment_file.seek(position)
+        while True:
+            header = segment_file.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                return
+            first_offset, records, length, crc = BLOCK_HEADER.unpack(header)
+            compressed = segment_file.read(length)
+            if len(compressed) < length or zlib.crc32(compressed) != crc:
+                return
+            yield position, first_offset, records, compressed
+            position += BLOCK_HEADER.size + length
+
+
+def iter_block_records(block: bytes) -> Iterator[bytes]:
+    position = 0
+    while position < len(block):
+        (length,) = RECORD_HEADER.unpack_from(block, position)
+        position += RECORD_HEADER.size
+        yield block[position : position + length]
+        position += length
+
+
+class SegmentReader:
+    """
+    Reads records back in offset order, across segments. The sparse index of
+    each segment is used to skip straight to the block holding from_offset.
+    """
+
+    _directory: str
+    _decompressor: zstandard.ZstdDecompressor
+
+    def __init__(self, directory: str):
+        self._directory = directory
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def read(
+        self, from_offset: int = 0, segments: Optional[List[SegmentInfo]] = None
+    ) -> Iterator[Tuple[int, bytes]]:
+        """
+        :param segments: The segments to read, all of them by default.
+        :return: The offset and bytes of each record.
+        """
+        if segments is None:
+            segments = list_segments(self._directory)
+        for index, segment in enumerate(segments):
+            following = segments[index + 1 :]
+            if following and following[0].base_offset <= from_offset:
+                continue
+            yield from self._read_segment(segment, from_offset)
+
+    def _read_segment(
+        self, segment: SegmentInfo, from_offset: int
+    ) -> Iterator[Tuple[int, bytes]]:
+        position = 0
+        entries = read_index(segment.index_path)
+        if entries and from_offset > segment.base_offset:
+            found = bisect.bisect_right(entries, (from_offset, float("inf"))) - 1
+            if found >= 0:
+                position = entries[found][1]
+        for _, first_offset, records, compressed in iter_blocks(segment.path, position):
+            if first_offset + records <= from_offset:
+                continue
+            block = self._decompressor.decompress(compressed)
+            for offset, record in enumerate(iter_block_records(block), first_offset):
+                if offset >= from_offset:
+                    yield offset, record
+
+
+class SegmentWriter:
+    """
+    Appends records to the open segment of the directory, compressed in
+    blocks, and closes it into a read-only .log segment when it grows past
+    segment_bytes or segment_seconds. Records get consecutive offsets across
+    segments, and each segment is named after the offset of its first record.
+
+    A segment left open by a crash is cut at its last complete block and
+    closed when the writer is opened again.
+    """
+
+    _config: SegmentLogConfig
+    _logger: Logger
+    _lock: threading.RLock
+    _compressor: zstandard.ZstdCompressor
+    _segment: Optional[SegmentInfo]
+    _segment_file: Optional[IO[bytes]]
+    _index_file: Optional[IO[bytes]]
+    _segment_opened_at: float
+    _block: List[bytes]
+    _block_bytes: int
+    _block_started_at: float
+    _last_fsync: float
+    _opened: bool
+    next_offset: int
+
+    def __init__(
+        self,
+        config: SegmentLogConfig = SegmentLogConfig(),
+        logger: Logger = getLogger(__name__),
+    ):
+        self._config = config
+        self._logger = logger
+        self._lock = threading.RLock()
+        self._compressor = zstandard.ZstdCompressor(level=config.compression_level)
+        self._segment = None
+        self._segment_file = None
+        self._index_file = None
+        self._segment_opened_at = 0
+        self._block = []
+        self._block_bytes = 0
+        self._block_started_at = 0
+        self._last_fsync = 0
+        self._opened = False
+        self.next_offset = 0
+
+    def open(self) -> "SegmentWriter":
+        """
+        Continue after the last record of the directory. Opening again closes
+        the open segment first.
+        """
+        os.makedirs(self._config.directory, exist_ok=True)
+        with self._lock:
+            self._close_segment()
+            for segment in list_segments(self._config.directory):
+                if not segment.closed:
+                    self._recover(segment)
+            self.next_offset = self._end_offset()
+            self._opened = True
+        return self
+
+    def append(self, records: List[bytes]) -> List[int]:
+        """
+        :return: The offsets of the records.
+        """
+        with self._lock:
+            if not self._opened:
+                self.open()
+            if self._segment is None:
+                self._open_segment()
+            offsets = list(range(self.next_offset, self.next_offset + len(records)))
+            for record in records:
+                if not self._block:
+                    self._block_started_at = time.monotonic()
+                self._block.append(RECORD_HEADER.pack(len(record)) + record)
+                self._block_bytes += RECORD_HEADER.size + len(record)
+                self.next_offset += 1
+                if (
+                    len(self._block) >= self._config.block_records
+                    or self._block_bytes >= self._config.block_bytes
+                ):
+                    self._write_block()
+            if self._config.fsync == "always" or (
+                self._block
+                and time.monotonic() - self._block_started_at
+                >= self._config.flush_interval_seconds
+            ):
+                self._write_block()
+            self._sync()
+            if self._segment_is_full():
+                self._close_segment()
+            return offsets
+
+    def flush(self) -> None:
+        """
+        Write the pending block and fsync the open segment.
+        """
+        with self._lock:
+            self._write_block()
+            if self._segment_file is not None:
+                self._fsync()
+
+    def rotate(self) -> None:
+        """
+        Close the open segment, so it can be shipped, even if it is not full.
+        """
+        with self._lock:
+            self._close_segment()
+
+    def close(self) -> None:
+        self.rotate()
+
+    def _open_segment(self) -> None:
+        name = _segment_name(self.next_offset)
+        directory = self._config.directory
+        self._segment = SegmentInfo(
+            base_offset=self.next_offset,
+            path=os.path.join(directory, name + OPEN_SUFFIX),
+            index_path=os.path.join(directory, name + INDEX_SUFFIX),
+            closed=False,
+        )
+        self._segment_file = open(self._segment.path, "ab")
+        self._index_file = open(self._segment.index_path, "ab")
+        self._segment_opened_at = time.monotonic()
+
+    def _write_block(self) -> None:
+        if not self._block:
+            return
+        compressed = self._compressor.compress(b"".join(self._block))
+        first_offset = self.next_offset - len(self._block)
+        position = self._segment_file.tell()
+        self._segment_file.write(
+            BLOCK_HEADER.pack(
+                first_offset, len(self._block), len(compressed), zlib.crc32(compressed)
+            )
+        )
+        self._segment_file.write(compressed)
+        self._index_file.write(INDEX_ENTRY.pack(first_offset, position))
+        self._block = []
+        self._block_bytes = 0
+
+    def _sync(self) -> None:
+        policy = self._config.fsync
+        if policy == "always" or (
+            policy == "interval"
+            and time.monotonic() - self._last_fsync
+            >= self._config.fsync_interval_seconds
+        ):
+            self._fsync()
+
+    def _fsync(self) -> None:
+        for file in (self._segment_file, self._index_file):
+            file.flush()
+            os.fsync(file.fileno())
+        self._last_fsync = time.monotonic()
+
+    def _segment_is_full(self) -> bool:
+        return (
+            self._segment_file.tell() >= self._config.segment_bytes
+            or time.monotonic() - self._segment_opened_at
+            >= self._config.segment_seconds
+        )
+
+    def _close_segment(self) -> None:
+        if self._segment is None:
+            return
+        self._write_block()
+        self._fsync()
+        self._segment_file.close()
+        self._index_file.close()
+        empty = os.path.getsize(self._segment.path) == 0
+        if empty:
+            os.remove(self._segment.path)
+            os.remove(self._segment.index_path)
+        else:
+            self._seal(self._segment)
+        self._segment = None
+        self._segment_file = None
+        self._index_file = None
+
+    def _seal(self, segment: SegmentInfo) -> None:
+        stem = os.path.splitext(segment.path)[0]
+        os.replace(segment.path, stem + LOG_SUFFIX)
+        directory = os.open(self._config.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    def _recover(self, segment: SegmentInfo) -> None:
+        """
+        Cut an open segment after its last complete block, rebuild its index
+        and close it.
+        """
+        end = 0
+        entries = []
+        for position, first_offset, _, compressed in iter_blocks(segment.path):
+            entries.append(INDEX_ENTRY.pack(first_offset, position))
+            end = position + BLOCK_HEADER.size + len(compressed)
+        size = os.path.getsize(segment.path)
+        if not entries:
+            os.remove(segment.path)
+            if os.path.exists(segment.index_path):
+                os.remove(segment.index_path)
+            return
+        if end < size:
+            self._logger.warning(
+                f"cutting {size - end} bytes of incomplete blocks from {segment.path}"
+            )
+        with open(segment.path, "r+b") as segment_file:
+            segment_file.truncate(end)
+            os.fsync(segment_file.fileno())
+        with open(segment.index_path, "wb") as index_file:
+            index_file.write(b"".join(entries))
+            os.fsync(index_file.fileno())
+        self._seal(segment)
+
+    def _end_offset(self) -> int:
+        shipped = read_shipped_offset(self._config.directory)
+        segments = list_segments(self._config.directory)
+        if not segments:
+            return shipped
+        last = segments[-1]
+        entries = read_index(last.index_path)
+        position = entries[-1][1] if entries else 0
+        end = last.base_offset
+        for _, first_offset, records, _ in iter_blocks(last.path, position):
+            end = first_offset + records
+        return max(end, shipped)
@@ -0,0 +1,120 @@
+import os
+import threading
+from logging import Logger, getLogger
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from model.data import FortuneTigerData
+from repository.fortune_tiger_interface import FortuneTigerRepository
+from repository.segment_log.segment import (
+    SegmentInfo,
+    SegmentReader,
+    list_segments,
+    read_shipped_offset,
+    save_shipped_offset,
+)
+
+
+class ShipperConfig(BaseModel):
+    batch_size: int = Field(default=1000, gt=0)
+    # Remove the segments once every record in them is shipped
+    delete_shipped: bool = False
+    poll_interval_seconds: float = Field(default=10, gt=0)
+
+
+class ShipperStats(BaseModel):
+    segments: int = 0
+    records: int = 0
+    written: int = 0
+
+
+class SegmentShipper:
+    """
+    Loads the closed segments of a segment log into a repository in bulk,
+    saving the offset shipped so far after each batch. After a crash the last
+    batch is shipped again, which a deduplicating MongoRepository stores once.
+    The repository must write before save_batch returns, so not in buffered
+    mode, or the offset would get ahead of what was stored.
+    """
+
+    _directory: str
+    _repository: FortuneTigerRepository
+    _config: ShipperConfig
+    _logger: Logger
+    _reader: SegmentReader
+
+    def __init__(
+        self,
+        directory: str,
+        repository: FortuneTigerRepository,
+        config: ShipperConfig = ShipperConfig(),
+        logger: Logger = getLogger(__name__),
+    ):
+        self._directory = directory
+        self._repository = repository
+        self._config = config
+        self._logger = logger
+        self._reader = SegmentReader(directory)
+
+    def ship_closed(self) -> ShipperStats:
+        """
+        Ship every record of the closed segments not shipped yet.
+        """
+        stats = ShipperStats()
+        segments = list_segments(self._directory)
+        shipped_offset = read_shipped_offset(self._directory)
+        for index, segment in enumerate(segments):
+            if not segment.closed:
+                break
+            following = segments[index + 1 :]
+            if not following or following[0].base_offset > shipped_offset:
+                shipped_offset = self._ship_segment(segment, shipped_offset, stats)
+                stats.segments += 1
+            if self._config.delete_shipped:
+                self._delete(segment)
+        return stats
+
+    def run(self, stop: threading.Event) -> ShipperStats:
+        """
+        Ship the segments as they are closed, until stop is set.
+        """
+        total = ShipperStats()
+        while True:
+            stats = self.ship_closed()
+            total.segments += stats.segments
+            total.records += stats.records
+            total.written += stats.written
+            if stats.records:
+                self._logger.info(
+                    f"shipped {stats.records} records of {stats.segments} segments"
+                )
+            if stop.wait(self._config.poll_interval_seconds):
+                return total
+
+    def _ship_segment(
+        self, segment: SegmentInfo, shipped_offset: int, stats: ShipperStats
+    ) -> int:
+        """
+        :return: The offset shipped up to.
+        """
+        batch: List[FortuneTigerData] = []
+        for offset, record in self._reader.read(shipped_offset, [segment]):
+            batch.append(FortuneTigerData.model_validate_json(record))
+            if len(batch) == self._config.batch_size:
+                stats.written += len(self._repository.save_batch(batch))
+                stats.records += len(batch)
+                batch = []
+                save_shipped_offset(self._directory, offset + 1)
+            shipped_offset = offset + 1
+        if batch:
+            stats.written += len(self._repository.save_batch(batch))
+            stats.records += len(batch)
+            save_shipped_offset(self._directory, shipped_offset)
+        return shipped_offset
+
+    def _delete(self, segment: SegmentInfo) -> None:
+        os.remove(segment.path)
+        if os.path.exists(segment.index_path):
+            os.remove(segment.index_path)
+        self._logger.info(f"deleted shipped segment {segment.path}")
@@ -0,0 +1,189 @@
+import base64
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Iterator, List, Optional, TextIO, Union
+
+from pydantic import BaseModel, ConfigDict
+from seleniumwire.request import Request, Response
+
+from scraper.image_recognizer import Screenshot
+
+EVENTS_FILE_NAME = "events.jsonl"
+SCREENSHOTS_DIR_NAME = "screenshots"
+
+
+class SpinEvent(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    offset_seconds: float
+    request: Request
+    response: Response
+
+
+class ScreenshotEvent(BaseModel):
+    offset_seconds: float
+    screenshot: Screenshot
+
+
+ArchiveEvent = Union[SpinEvent, ScreenshotEvent]
+
+
+def _encode_headers(headers) -> List[List[str]]:
+    return [[name, value] for name, value in headers.items()]
+
+
+def _encode_body(body: bytes) -> str:
+    return base64.b64encode(body).decode()
+
+
+class TrafficArchive:
+    """
+    A directory holding the Spin exchanges and canvas screenshots of a scraping
+    session, in the order they happened and with their offsets from the start of
+    the recording. Exchanges keep their raw, still encoded, bodies so a replay
+    goes through the same decoding as the live scraper.
+
+    Recording is thread safe: exchanges come from the proxy threads while the
+    screenshots come from the scraper thread.
+    """
+
+    path: str
+    _lock: threading.Lock
+    _events_file: Optional[TextIO]
+    _started_at: float
+    _screenshots: int
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._events_file = None
+        self._started_at = 0
+        self._screenshots = 0
+
+    @property
+    def events_path(self) -> str:
+        return os.path.join(self.path, EVENTS_FILE_NAME)
+
+    def open_for_recording(self) -> "TrafficArchive":
+        os.makedirs(os.path.join(self.path, SCREENSHOTS_DIR_NAME), exist_ok=True)
+        self._events_file = open(self.events_path, "w", encoding="utf-8")
+        self._started_at = time.monotonic()
+        self._screenshots = 0
+        return self
+
+    def close(self) -> None:
+        with self._lock:
+            if self._events_file is not None:
+                self._events_file.close()
+                self._events_file = None
+
+    def record_exchange(self, request: Request, response: Response) -> None:
+        event = {
+            "type": "spin",
+            "request": {
+                "method": request.method,
+                "url": request.url,
+                "headers": _encode_headers(request.headers),
+                "body": _encode_body(request.body),
+            },
+            "response": {
+                "status_code": response.status_code,
+                "reason": response.reason,
+                "headers": _encode_headers(response.headers),
+                "body": _encode_body(response.body),
+                "date": response.date.isoformat(),
+            },
+        }
+        self._write_event(event)
+
+    def record_screenshot(self, screenshot: Screenshot) -> None:
+        with self._lock:
+            self._screenshots += 1
+            file_name = f"{self._screenshots:06d}.{screenshot.extension}"
+        with open(os.path.join(self.path, SCREENSHOTS_DIR_NAME, file_name), "wb") as f:
+            f.write(screenshot.image_bytes)
+        event = {
+            "type": "screenshot",
+            "file": file_name,
+            "width": screenshot.width,
+            "height": screenshot.height,
+            "extension": screenshot.extension,
+        }
+        self._write_event(event)
+
+    def events(self) -> Iterator[ArchiveEvent]:
+        with open(self.events_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield self._read_event(json.loads(line))
+
+    def _write_event(self, event: dict) -> None:
+        with self._lock:
+            if self._events_file is None:
+                raise RuntimeError("archive is not open for recording")
+            event["offset_seconds"] = time.monotonic() - self._started_at
+            self._events_file.write(json.dumps(event) + "\n")
+            self._events_file.flush()
+
+    def _read_event(self, event: dict) -> ArchiveEvent:
+        if event["type"] == "screenshot":
+            with open(
+                os.path.join(self.path, SCREENSHOTS_DIR_NAME, event["file"]), "rb"
+            ) as f:
+                image_bytes = f.read()
+            return ScreenshotEvent(
+                offset_seconds=event["offset_seconds"],
+                screenshot=Screenshot(
+                    image_bytes=image_bytes,
+                    width=event["width"],
+                    height=event["height"],
+                    extension=event["extension"],
+                ),
+            )
+        recorded_request = event["request"]
+        recorded_response = event["response"]
+        request = Request(
+            method=recorded_request["method"],
+            url=recorded_request["url"],
+            headers=recorded_request["headers"],
+            body=base64.b64decode(recorded_request["body"]),
+        )
+        response = Response(
+            status_code=recorded_response["status_code"],
+            reason=recorded_response["reason"],
+            headers=recorded_response["headers"],
+            body=base64.b64decode(recorded_response["body"]),
+        )
+        response.date = datetime.fromisoformat(recorded_response["date"])
+        request.response = response
+        return SpinEvent(
+            offset_seconds=event["offset_seconds"], request=request, response=response
+        )
+
+
+class ReplayDriver:
+    """
+    Stands in for the selenium-wire driver during a replay, holding the replayed
+    exchanges the same way the proxy storage holds the intercepted ones.
+    """
+
+    _requests: List[Request]
+
+    def __init__(self):
+        self._requests = []
+
+    def add(self, request: Request) -> None:
+        self._requests.append(request)
+
+    def iter_requests(self) -> Iterator[Request]:
+        return iter(list(self._requests))
+
+    @property
+    def requests(self) -> List[Request]:
+        return list(self._requests)
+
+    @requests.deleter
+    def requests(self) -> None:
+        self._requests = []
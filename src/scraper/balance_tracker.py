@@ -0,0 +1,130 @@
+import threading
+from datetime import datetime
+from enum import Enum
+from logging import Logger, getLogger
+from typing import Optional
+
+from model.data import FortuneTigerData
+from scraper.subscriber.interface import FortuneTigerSubscriber
+
+
+class BalanceState(str, Enum):
+    # No spin seen yet, the balance can only come from OCR
+    UNKNOWN = "unknown"
+    TRACKING = "tracking"
+    # The last OCR check disagreed with the spins, so every batch is checked
+    # until they agree again
+    DIVERGED = "diverged"
+
+
+def spin_balance(data: FortuneTigerData) -> Optional[float]:
+    """
+    :return: The raw dt.si.bl of the spin, None when it is missing.
+    """
+    try:
+        return float(data.response.body["dt"]["si"]["bl"])
+    except Exception:
+        return None
+
+
+class BalanceTracker(FortuneTigerSubscriber):
+    """
+    Follows the balance reported by each spin response, so the scraper does not
+    have to read it from the screen after every batch. Registered as one more
+    subscriber, it sees the same spins as the repository, in batch or streaming
+    mode; spins are ordered by their response date, so a late one does not roll
+    the balance back.
+    """
+
+    _balance_to_cents: float
+    _tolerance_cents: int
+    _logger: Logger
+    _lock: threading.Lock
+    _state: BalanceState
+    _balance_in_cents: Optional[int]
+    _last_spin_date: Optional[datetime]
+    _spins: int
+    _checks: int
+    _discrepancies: int
+
+    def __init__(
+        self,
+        balance_to_cents: float = 100,
+        tolerance_cents: int = 0,
+        logger: Logger = getLogger(__name__),
+    ):
+        """
+        :param balance_to_cents: Factor from the dt.si.bl unit to cents.
+        :param tolerance_cents: Largest OCR difference that is not a discrepancy.
+        """
+        self._balance_to_cents = balance_to_cents
+        self._tolerance_cents = tolerance_cents
+        self._logger = logger
+        self._lock = threading.Lock()
+        self._state = BalanceState.UNKNOWN
+        self._balance_in_cents = None
+        self._last_spin_date = None
+        self._spins = 0
+        self._checks = 0
+        self._discrepancies = 0
+
+    @property
+    def state(self) -> BalanceState:
+        with self._lock:
+            return self._state
+
+    @property
+    def balance_in_cents(self) -> Optional[int]:
+        with self._lock:
+            return self._balance_in_cents
+
+    @property
+    def spins(self) -> int:
+        with self._lock:
+            return self._spins
+
+    @property
+    def discrepancies(self) -> int:
+        with self._lock:
+            return self._discrepancies
+
+    def process_data(self, data: FortuneTigerData):
+        balance = spin_balance(data)
+        with self._lock:
+            self._spins += 1
+            if balance is None:
+                return
+            date = data.response.date
+            if self._last_spin_date is not None and date < self._last_spin_date:
+                return
+            self._last_spin_date = date
+            self._balance_in_cents = round(balance * self._balance_to_cents)
+            if self._state == BalanceState.UNKNOWN:
+                self._state = BalanceState.TRACKING
+
+    def check(self, ocr_balance_in_cents: int) -> bool:
+        """
+        Compare the tracked balance with the one read from the screen, alerting
+        when they differ.
+        :return: False if they differ by more than the tolerance.
+        """
+        with self._lock:
+            self._checks += 1
+            tracked = self._balance_in_cents
+            if tracked is None:
+                return True
+            difference = abs(tracked - ocr_balance_in_cents)
+            agrees = difference <= self._tolerance_cents
+            if agrees:
+                self._state = BalanceState.TRACKING
+            else:
+                self._state = BalanceState.DIVERGED
+                self._discrepancies += 1
+        if agrees:
+            self._logger.debug(f"balance check passed at {tracked} cents")
+        else:
+            self._logger.error(
+                f"balance discrepancy: spins report {tracked} cents, "
+                f"the screen shows {ocr_balance_in_cents} cents"
+            )
+        return agrees
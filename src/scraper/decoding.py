@@ -0,0 +1,76 @@
+import zlib
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+import brotli
+import orjson
+import zstandard
+
+
+class UnsupportedEncoding(ValueError):
+    pass
+
+
+def _gunzip(body: bytes) -> bytes:
+    # 16 + MAX_WBITS only accepts the gzip wrapper, skipping the gzip module
+    return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+
+
+def _inflate(body: bytes) -> bytes:
+    # Servers send deflate both with and without the zlib wrapper
+    try:
+        return zlib.decompress(body)
+    except zlib.error:
+        return zlib.decompress(body, -zlib.MAX_WBITS)
+
+
+def _unzstd(body: bytes) -> bytes:
+    # A streamed response has no content size in its frame header, which
+    # ZstdDecompressor.decompress requires
+    return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+
+
+DECODERS: Dict[str, Callable[[bytes], bytes]] = {
+    "identity": lambda body: body,
+    "gzip": _gunzip,
+    "x-gzip": _gunzip,
+    "deflate": _inflate,
+    "br": brotli.decompress,
+    "zstd": _unzstd,
+}
+
+
+def content_codings(content_encoding: Optional[str]) -> List[str]:
+    """
+    :return: The codings of a Content-Encoding header in the order they were
+        applied; an empty list when the header is missing.
+    """
+    if not content_encoding:
+        return []
+    codings = (part.strip().lower() for part in content_encoding.split(","))
+    return [coding for coding in codings if coding]
+
+
+def decode_body(body: bytes, content_encoding: Optional[str]) -> bytes:
+    """
+    Undo the Content-Encoding of a body, last applied coding first.
+    :raise UnsupportedEncoding: For a coding there is no decoder for.
+    """
+    for coding in reversed(content_codings(content_encoding)):
+        decoder = DECODERS.get(coding)
+        if decoder is None:
+            raise UnsupportedEncoding(f"unsupported content encoding {coding}")
+        body = decoder(body)
+    return body
+
+
+def parse_json(body: bytes):
+    return orjson.loads(body)
+
+
+def parse_form(body: bytes) -> Dict[str, List[str]]:
+    """
+    Parse an application/x-www-form-urlencoded body into the same mapping as
+    urllib.parse.parse_qs.
+    """
+    return parse_qs(body.decode())
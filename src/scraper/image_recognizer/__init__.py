@@ -1,2 +1,8 @@
-from scraper.image_recognizer.interface import ScraperImageRecognizer, Screenshot
+from scraper.image_recognizer.frame import Frame, FrameCounter
+from scraper.image_recognizer.interface import (
+    FrameReading,
+    ScraperImageRecognizer,
+    Screenshot,
+)
+from scraper.image_recognizer.template_recognizer import TemplateImageRecognizer
 from scraper.image_recognizer.tika_recognizer import TikaImageRecognizer
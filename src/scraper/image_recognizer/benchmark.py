@@ -0,0 +1,130 @@
+import time
+from typing import Dict, List
+
+import numpy as np
+from pydantic import BaseModel, computed_field
+
+from monitoring import PipelineMetrics
+from scraper.image_recognizer.calibration import LabelledScreenshot
+from scraper.image_recognizer.frame import Frame
+from scraper.image_recognizer.interface import ScraperImageRecognizer
+from scraper.image_recognizer.preprocessing import OcrPreprocessing
+from scraper.image_recognizer.regions import balance_region, bet_region
+from scraper.image_recognizer.tika_recognizer import TikaImageRecognizer
+
+SWEEP_STAGES = ("ocr_threshold", "ocr_scale", "ocr_encode", "tika_ocr")
+
+
+class RecognizerBenchmark(BaseModel):
+    recognizer: str
+    calls: int
+    correct: int
+    mean_latency_ms: float
+    p95_latency_ms: float
+
+    @computed_field
+    @property
+    def accuracy(self) -> float:
+        return self.correct / self.calls if self.calls else 0.0
+
+
+def benchmark_recognizer(
+    name: str,
+    recognizer: ScraperImageRecognizer,
+    samples: List[LabelledScreenshot],
+) -> RecognizerBenchmark:
+    """
+    Read the balance and the bet of every sample, timing each call.
+    """
+    latencies = []
+    correct = 0
+    for sample in samples:
+        frame = Frame(sample.screenshot)
+        checks = [
+            (recognizer.get_balance_in_cents, sample.expected_balance_in_cents),
+            (recognizer.get_bet_value, sample.expected_bet_value),
+        ]
+        for read, expected in checks:
+            start = time.perf_counter()
+            value = read(frame=frame)
+            latencies.append(time.perf_counter() - start)
+            correct += value == expected
+    latencies_ms = np.array(latencies or [0.0]) * 1000
+    return RecognizerBenchmark(
+        recognizer=name,
+        calls=len(latencies),
+        correct=correct,
+        mean_latency_ms=float(latencies_ms.mean()),
+        p95_latency_ms=float(np.percentile(latencies_ms, 95)),
+    )
+
+
+class PreprocessingSweepResult(BaseModel):
+    preprocessing: OcrPreprocessing
+    benchmark: RecognizerBenchmark
+    mean_payload_bytes: float
+    # Mean milliseconds of each preprocessing stage and of the OCR call
+    stage_latency_ms: Dict[str, float]
+
+
+def sweep_preprocessing(
+    address: str,
+    samples: List[LabelledScreenshot],
+    settings: List[OcrPreprocessing],
+    timeout_seconds: float = 10,
+) -> List[PreprocessingSweepResult]:
+    """
+    Benchmark a Tika recognizer with each preprocessing setting over the same
+    labelled screenshots, to choose the cheapest one that keeps the accuracy.
+    """
+    results = []
+    for preprocessing in settings:
+        metrics = PipelineMetrics()
+        recognizer = TikaImageRecognizer(
+            address,
+            metrics=metrics,
+            timeout_seconds=timeout_seconds,
+            preprocessing=preprocessing,
+        )
+        try:
+            benchmark = benchmark_recognizer(preprocessing.label, recognizer, samples)
+        finally:
+            recognizer.close()
+        # Measured apart, so the recognizer's stage latencies are not recorded twice
+        size_metrics = PipelineMetrics()
+        payload_sizes = [
+            len(
+                preprocessing.prepare(
+                    Frame(sample.screenshot).crop(region), size_metrics
+                )
+            )
+            for sample in samples
+            for region in (balance_region, bet_region)
+        ]
+        stages = metrics.snapshot()
+        results.append(
+            PreprocessingSweepResult(
+                preprocessing=preprocessing,
+                benchmark=benchmark,
+                mean_payload_bytes=float(np.mean(payload_sizes or [0])),
+                stage_latency_ms={
+                    stage: stages[stage].mean_seconds * 1000
+                    for stage in SWEEP_STAGES
+                    if stage in stages
+                },
+            )
+        )
+    return results
+
+
+def pick_preprocessing(
+    results: List[PreprocessingSweepResult],
+) -> PreprocessingSweepResult:
+    """
+    :return: The fastest setting among the most accurate ones.
+    """
+    best_accuracy = max(result.benchmark.accuracy for result in results)
+    return min(
+        (result for result in results if result.benchmark.accuracy == best_accuracy),
+        key=lambda result: result.benchmark.mean_latency_ms,
+    )
@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+from io import BytesIO
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+from pydantic import BaseModel, Field
+
+from scraper.image_recognizer.frame import Frame, Screenshot
+from scraper.image_recognizer.glyph_atlas import GlyphAtlas, segment_glyphs
+from scraper.image_recognizer.regions import Region, balance_region, bet_region
+
+LABELS_FILE_NAME = "labels.json"
+
+
+class LabelledScreenshot(BaseModel):
+    name: str
+    screenshot: Screenshot
+    balance_text: str = Field()
+    bet_text: str = Field()
+
+    @property
+    def expected_balance_in_cents(self) -> int:
+        return int("".join(char for char in self.balance_text if char.isdigit()))
+
+    @property
+    def expected_bet_value(self) -> int:
+        return int("".join(char for char in self.bet_text if char.isdigit()))
+
+
+def load_labelled_screenshots(directory: str) -> List[LabelledScreenshot]:
+    """
+    Load the screenshots listed in the directory's labels.json, which maps each
+    file name to the text rendered in its balance and bet regions, e.g.
+    {"0001.png": {"balance": "R$1.234,56", "bet": "45,00"}}.
+    """
+    with open(os.path.join(directory, LABELS_FILE_NAME), encoding="utf-8") as f:
+        labels: Dict[str, Dict[str, str]] = json.load(f)
+    samples = []
+    for file_name, label in sorted(labels.items()):
+        with open(os.path.join(directory, file_name), "rb") as f:
+            image_bytes = f.read()
+        with Image.open(BytesIO(image_bytes)) as image:
+            width, height = image.size
+        samples.append(
+            LabelledScreenshot(
+                name=file_name,
+                screenshot=Screenshot(
+                    image_bytes=image_bytes,
+                    width=width,
+                    height=height,
+                    extension=os.path.splitext(file_name)[1].lstrip(".") or "png",
+                ),
+                balance_text=label["balance"],
+                bet_text=label["bet"],
+            )
+        )
+    return samples
+
+
+def calibrate_atlas(
+    samples: List[LabelledScreenshot],
+    logger: logging.Logger = logging.getLogger(__name__),
+) -> GlyphAtlas:
+    """
+    Build a glyph atlas by pairing the segmented glyphs of every labelled region
+    with the characters of its label. Regions whose glyph count does not match
+    the label length are skipped.
+    """
+    glyph_samples: Dict[str, List[np.ndarray]] = {}
+    for sample in samples:
+        frame = Frame(sample.screenshot)
+        regions: List[Tuple[Callable[[int, int], Region], str]] = [
+            (balance_region, sample.balance_text),
+            (bet_region, sample.bet_text),
+        ]
+        for region, text in regions:
+            chars = "".join(text.split())
+            glyphs = segment_glyphs(frame.gray_crop(region))
+            if len(glyphs) != len(chars):
+                logger.warning(
+                    f"skipping {sample.name} region '{text}': "
+                    f"found {len(glyphs)} glyphs for {len(chars)} chars"
+                )
+                continue
+            for char, glyph in zip(chars, glyphs):
+                glyph_samples.setdefault(char, []).append(glyph)
+    if not glyph_samples:
+        raise ValueError("no labelled region could be segmented")
+    logger.info(f"calibrated glyphs: {''.join(sorted(glyph_samples))}")
+    return GlyphAtlas.from_samples(glyph_samples)
@@ -0,0 +1,46 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from scraper.image_recognizer.interface import ScraperImageRecognizer
+from scraper.image_recognizer.ocr_cache import OcrCache
+from scraper.image_recognizer.preprocessing import OcrPreprocessing
+from scraper.image_recognizer.process_pool import ProcessPoolRecognizer
+from scraper.image_recognizer.template_recognizer import (
+    DEFAULT_ATLAS_PATH,
+    TemplateImageRecognizer,
+)
+from scraper.image_recognizer.tika_recognizer import TikaImageRecognizer
+
+
+class RecognizerOptions(BaseModel):
+    """
+    Everything needed to build a recognizer, so another process can build the
+    same one.
+    """
+
+    kind: Literal["tika", "template"] = "tika"
+    tika_address: str = "http://localhost:9998"
+    atlas_path: str = DEFAULT_ATLAS_PATH
+    ocr_cache: Literal["off", "exact", "perceptual"] = "exact"
+    ocr_cache_file: Optional[str] = None
+    preprocessing: OcrPreprocessing = OcrPreprocessing()
+    # Recognize in this many worker processes instead of the calling one
+    processes: int = Field(default=0, ge=0)
+
+
+def create_image_recognizer(options: RecognizerOptions) -> ScraperImageRecognizer:
+    if options.processes:
+        return ProcessPoolRecognizer(
+            options.model_copy(update={"processes": 0}), workers=options.processes
+        )
+    if options.kind == "template":
+        return TemplateImageRecognizer.from_file(options.atlas_path)
+    cache = None
+    if options.ocr_cache != "off":
+        cache = OcrCache(hash_mode=options.ocr_cache, disk_path=options.ocr_cache_file)
+    return TikaImageRecognizer(
+        address=options.tika_address,
+        ocr_cache=cache,
+        preprocessing=options.preprocessing,
+    )
@@ -0,0 +1,106 @@
+from io import BytesIO
+from typing import Callable, Optional
+
+import numpy as np
+from PIL import Image
+from pydantic import BaseModel, Field
+
+from monitoring import PipelineMetrics
+from scraper.image_recognizer.regions import Region
+
+# ITU-R 601-2 luma, the same transform PIL uses for convert("L")
+_LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+class Screenshot(BaseModel):
+    image_bytes: bytes = Field()
+    width: int = Field(gt=1)
+    height: int = Field(gt=1)
+    extension: str = Field(min_length=1)
+
+
+class FrameCounter:
+    """
+    Counts the screenshots taken and decoded, so the scraper can report how many
+    of each a spin costs.
+    """
+
+    screenshots: int
+    decodes: int
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.screenshots = 0
+        self.decodes = 0
+
+
+class Frame:
+    """
+    A single canvas screenshot, decoded lazily and at most once into an RGB
+    array. Every recognizer question about the frame reads crop views of that
+    same buffer.
+    """
+
+    screenshot: Screenshot
+    _counter: Optional[FrameCounter]
+    _metrics: Optional[PipelineMetrics]
+    _pixels: Optional[np.ndarray]
+
+    def __init__(
+        self,
+        screenshot: Screenshot,
+        counter: Optional[FrameCounter] = None,
+        metrics: Optional[PipelineMetrics] = None,
+    ):
+        self.screenshot = screenshot
+        self._counter = counter
+        self._metrics = metrics
+        self._pixels = None
+
+    @property
+    def pixels(self) -> np.ndarray:
+        if self._pixels is None:
+            if self._metrics is not None:
+                with self._metrics.stage("frame_decode"):
+                    self._pixels = self._decode()
+            else:
+                self._pixels = self._decode()
+            if self._counter is not None:
+                self._counter.decodes += 1
+        return self._pixels
+
+    @property
+    def width(self) -> int:
+        return self.pixels.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.pixels.shape[0]
+
+    def crop(self, region: Callable[[int, int], Region]) -> np.ndarray:
+        """
+        :param region: One of the functions in scraper.image_recognizer.regions.
+        :return: A read-only view of the region, sharing the frame buffer.
+        """
+        pl, pu, pr, pd = region(self.width, self.height)
+        return self.pixels[pu:pd, pl:pr]
+
+    def _decode(self) -> np.ndarray:
+        with Image.open(BytesIO(self.screenshot.image_bytes)) as image:
+            return np.asarray(image.convert("RGB"))
+
+    def gray_crop(self, region: Callable[[int, int], Region]) -> np.ndarray:
+        return to_gray(self.crop(region))
+
+
+def to_gray(pixels: np.ndarray) -> np.ndarray:
+    return (pixels @ _LUMA_WEIGHTS).astype(np.uint8)
+
+
+def mean_difference(pixels: np.ndarray, other: np.ndarray) -> float:
+    """
+    :return: The mean absolute difference of two same sized crops, in levels.
+    """
+    return float(np.abs(pixels.astype(np.int16) - other.astype(np.int16)).mean())
@@ -0,0 +1,118 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+GLYPH_HEIGHT = 24
+GLYPH_WIDTH = 14
+MAX_MATCH_DISTANCE = 0.12
+
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    """
+    Split a grayscale crop into text and background using Otsu's threshold.
+    :param gray: 2D uint8 array.
+    :return: A boolean mask where True marks text pixels.
+    """
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    below_count = np.cumsum(hist)
+    below_sum = np.cumsum(hist * levels)
+    above_count = gray.size - below_count
+    below_mean = below_sum / np.maximum(below_count, 1)
+    above_mean = (below_sum[-1] - below_sum) / np.maximum(above_count, 1)
+    between_variance = below_count * above_count * (below_mean - above_mean) ** 2
+    threshold = int(np.argmax(between_variance))
+    mask = gray > threshold
+    # The text is always the minority of the crop, whatever its color
+    if mask.mean() > 0.5:
+        mask = ~mask
+    return mask
+
+
+def segment_glyphs(gray: np.ndarray, min_pixels: int = 2) -> List[np.ndarray]:
+    """
+    Cut a crop of a single text line into normalized glyph bitmaps.
+    :param gray: 2D uint8 array of the crop.
+    :param min_pixels: Glyphs with fewer text pixels are treated as noise.
+    :return: A list of GLYPH_HEIGHT x GLYPH_WIDTH float32 arrays, left to right.
+    """
+    mask = binarize(gray)
+    # Glyphs keep the crop's full height: the regions are fixed on the canvas, so
+    # every glyph sits at the same baseline and '.' stays apart from ','
+    columns = np.concatenate(([False], mask.any(axis=0), [False]))
+    edges = np.flatnonzero(columns[1:] != columns[:-1])
+    glyphs = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        glyph = mask[:, start:end]
+        if glyph.sum() < min_pixels:
+            continue
+        glyphs.append(_normalize_glyph(glyph))
+    return glyphs
+
+
+def _normalize_glyph(glyph: np.ndarray) -> np.ndarray:
+    image = Image.fromarray(glyph.astype(np.uint8) * 255)
+    image = image.resize((GLYPH_WIDTH, GLYPH_HEIGHT), Image.Resampling.BILINEAR)
+    return np.asarray(image, dtype=np.float32) / 255
+
+
+class GlyphAtlas:
+    """
+    Reference bitmaps for every character of the game's fixed font, stacked in a
+    single array so a whole line is matched with one vectorized distance.
+    """
+
+    labels: List[str]
+    templates: np.ndarray
+
+    def __init__(self, labels: List[str], templates: np.ndarray):
+        if len(labels) != templates.shape[0]:
+            raise ValueError("each template needs exactly one label")
+        self.labels = labels
+        self.templates = templates.reshape(len(labels), -1).astype(np.float32)
+
+    @classmethod
+    def from_samples(cls, samples: Dict[str, List[np.ndarray]]) -> "GlyphAtlas":
+        labels = sorted(samples.keys())
+        templates = np.stack([np.mean(samples[label], axis=0) for label in labels])
+        return cls(labels=labels, templates=templates)
+
+    @classmethod
+    def load(cls, path: str) -> "GlyphAtlas":
+        with np.load(path) as atlas_file:
+            return cls(
+                labels=[str(label) for label in atlas_file["labels"]],
+                templates=atlas_file["templates"],
+            )
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            labels=np.array(self.labels),
+            templates=self.templates.reshape(-1, GLYPH_HEIGHT, GLYPH_WIDTH),
+        )
+
+    def match(
+        self, glyphs: List[np.ndarray], max_distance: float = MAX_MATCH_DISTANCE
+    ) -> List[Tuple[str, float]]:
+        """
+        Find the closest template for each glyph.
+        :param glyphs: Normalized glyphs as returned by segment_glyphs.
+        :param max_distance: Glyphs farther than this from every template are dropped.
+        :return: A list of (label, distance) pairs, one per accepted glyph.
+        """
+        if not glyphs:
+            return []
+        flat = np.stack(glyphs).reshape(len(glyphs), -1)
+        distances = ((flat[:, None, :] - self.templates[None, :, :]) ** 2).mean(axis=2)
+        best = distances.argmin(axis=1)
+        best_distances = distances[np.arange(len(glyphs)), best]
+        return [
+            (self.labels[index], float(distance))
+            for index, distance in zip(best, best_distances)
+            if distance <= max_distance
+        ]
+
+    def read_text(self, gray: np.ndarray) -> str:
+        return "".join(label for label, _ in self.match(segment_glyphs(gray)))
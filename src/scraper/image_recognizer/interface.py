@@ -1,38 +1,67 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel
 
+from scraper.image_recognizer.frame import Frame, Screenshot
 
-class Screenshot(BaseModel):
-    image_bytes: bytes = Field()
-    width: int = Field(gt=1)
-    height: int = Field(gt=1)
-    extension: str = Field(min_length=1)
+
+class FrameReading(BaseModel):
+    is_enabled_to_play: Optional[bool] = None
+    balance_in_cents: Optional[int] = None
+    bet_value: Optional[int] = None
 
 
 class ScraperImageRecognizer(ABC):
     @abstractmethod
-    def get_bet_value(screenshot: Screenshot) -> int:
+    def get_bet_value(self, frame: Frame) -> int:
         """
-        Get the value of the bet given the screenshot
-        :param Screenshot: Game screenshot in PNG format.
+        Get the value of the bet given the frame
+        :param Frame: Game screenshot frame.
         :return: The bet amount in brazilian cents (centavos).
         """
         pass
 
     @abstractmethod
-    def get_balance_in_cents(self, screenshot: Screenshot) -> int:
+    def get_balance_in_cents(self, frame: Frame) -> int:
         """
-        Get the value of  given the screenshot
-        :param Screenshot: Game screenshot in PNG format.
+        Get the value of  given the frame
+        :param Frame: Game screenshot frame.
         :return: The current balance in brazilian cents (centavos).
         """
         pass
 
     @abstractmethod
-    def check_if_is_enabled_to_play(self, screenshot: Screenshot) -> bool:
+    def check_if_is_enabled_to_play(self, frame: Frame) -> bool:
         """
-        Get the value of  given the screenshot
-        :param Screenshot: Game screenshot in PNG format.
+        Get the value of  given the frame
+        :param Frame: Game screenshot frame.
         :return: A bool indicating wheter the game is enabled or not to play.
         """
+
+    def read_frame(
+        self,
+        frame: Frame,
+        enabled_to_play: bool = False,
+        balance: bool = False,
+        bet: bool = False,
+    ) -> FrameReading:
+        """
+        Ask several questions of the same frame, decoding it only once.
+        :param Frame: Game screenshot frame.
+        :return: The answers to the requested questions, None for the others.
+        """
+        reading = FrameReading()
+        if enabled_to_play:
+            reading.is_enabled_to_play = self.check_if_is_enabled_to_play(frame)
+        if balance:
+            reading.balance_in_cents = self.get_balance_in_cents(frame)
+        if bet:
+            reading.bet_value = self.get_bet_value(frame)
+        return reading
+
+    def close(self) -> None:
+        """
+        Release the connections, threads or caches the recognizer holds.
+        """
+        pass
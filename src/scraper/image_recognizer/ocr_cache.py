@@ -0,0 +1,194 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Literal, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from scraper.image_recognizer.frame import to_gray
+
+HashMode = Literal["exact", "perceptual"]
+# Size in pixels, as (rows, columns), of the cells the perceptual hash averages
+# the crop into. Small enough that readings one cent apart get different keys
+PERCEPTUAL_CELL = (4, 2)
+
+
+def exact_hash(pixels: np.ndarray) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(pixels.shape).encode())
+    digest.update(np.ascontiguousarray(pixels).data)
+    return digest.hexdigest()
+
+
+def perceptual_hash(pixels: np.ndarray) -> str:
+    """
+    Split the gray crop at the midpoint between its darkest and brightest
+    pixels, then keep which of its PERCEPTUAL_CELL sized cells are mostly
+    bright. Compression noise or a slightly different background shade keep the
+    same key, while a different digit changes several cells.
+    """
+    gray = to_gray(pixels) if pixels.ndim == 3 else pixels
+    height, width = gray.shape
+    rows = height // PERCEPTUAL_CELL[0]
+    columns = width // PERCEPTUAL_CELL[1]
+    if not rows or not columns:
+        return exact_hash(pixels)
+    midpoint = (int(gray.min()) + int(gray.max())) / 2
+    bright = (gray > midpoint).astype(np.float32)
+    row_edges = np.linspace(0, height, rows + 1).astype(int)
+    column_edges = np.linspace(0, width, columns + 1).astype(int)
+    cells = np.add.reduceat(
+        np.add.reduceat(bright, row_edges[:-1], axis=0), column_edges[:-1], axis=1
+    )
+    cells /= np.outer(np.diff(row_edges), np.diff(column_edges))
+    bits = np.packbits(cells > 0.5)
+    return hashlib.blake2b(bits.tobytes(), digest_size=16).hexdigest()
+
+
+class OcrCacheStats(BaseModel):
+    hits: int
+    disk_hits: int
+    misses: int
+    evictions: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+
+class OcrCache:
+    """
+    Bounded LRU of OCR results keyed by a hash of the cropped pixels, so a crop
+    already read is not sent to OCR again. With a disk_path, results are also
+    kept in a sqlite file and survive restarts; entries evicted from memory are
+    still found there. The file keeps the max_disk_entries results written
+    last, and is committed every commit_every writes and on close().
+
+    "exact" only matches identical pixels. "perceptual" also matches crops that
+    differ by noise, at the risk of two close readings sharing a key.
+    """
+
+    _max_entries: int
+    _hash_mode: HashMode
+    _max_disk_entries: int
+    _commit_every: int
+    _lock: threading.Lock
+    _entries: "OrderedDict[str, str]"
+    _database: Optional[sqlite3.Connection]
+    _uncommitted: int
+    _hits: int
+    _disk_hits: int
+    _misses: int
+    _evictions: int
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        hash_mode: HashMode = "exact",
+        disk_path: Optional[str] = None,
+        max_disk_entries: int = 100_000,
+        commit_every: int = 64,
+    ):
+        self._max_entries = max_entries
+        self._hash_mode = hash_mode
+        self._max_disk_entries = max_disk_entries
+        self._commit_every = commit_every
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._database = None
+        self._uncommitted = 0
+        if disk_path is not None:
+            self._database = sqlite3.connect(disk_path, check_same_thread=False)
+            self._database.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_results "
+                "(key TEXT PRIMARY KEY, text TEXT NOT NULL)"
+            )
+            self._database.commit()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def key(self, pixels: np.ndarray, variant: str = "") -> str:
+        """
+        :param variant: Tells apart the results of the same pixels read in
+            different ways, such as with another preprocessing.
+        """
+        if self._hash_mode == "perceptual":
+            key = f"p:{perceptual_hash(pixels)}"
+        else:
+            key = f"e:{exact_hash(pixels)}"
+        return f"{key}:{variant}" if variant else key
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return text
+            if self._database is not None:
+                row = self._database.execute(
+                    "SELECT text FROM ocr_results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._remember(key, row[0])
+                    self._hits += 1
+                    self._disk_hits += 1
+                    return row[0]
+            self._misses += 1
+            return None
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._remember(key, text)
+            if self._database is not None:
+                # A replaced row gets a new rowid, so rowids follow the writes
+                self._database.execute(
+                    "INSERT OR REPLACE INTO ocr_results (key, text) VALUES (?, ?)",
+                    (key, text),
+                )
+                self._uncommitted += 1
+                if self._uncommitted >= self._commit_every:
+                    self._commit()
+
+    def stats(self) -> OcrCacheStats:
+        with self._lock:
+            return OcrCacheStats(
+                hits=self._hits,
+                disk_hits=self._disk_hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._entries),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._database is not None:
+                self._commit()
+                self._database.close()
+                self._database = None
+
+    def _commit(self) -> None:
+        """
+        Commit the pending writes, dropping the oldest rows over
+        max_disk_entries.
+        """
+        self._database.execute(
+            "DELETE FROM ocr_results WHERE rowid <= "
+            "(SELECT MAX(rowid) FROM ocr_results) - ?",
+            (self._max_disk_entries,),
+        )
+        self._database.commit()
+        self._uncommitted = 0
+
+    def _remember(self, key: str, text: str) -> None:
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
@@ -0,0 +1,118 @@
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http import HTTPStatus
+from logging import Logger, getLogger
+from typing import Dict, Optional
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from monitoring import PipelineMetrics, pipeline_metrics
+
+TIKA_HEADERS = {
+    "Accept": "text/plain",
+    "X-Tika-PDFOcrStrategy": "ocr_only",
+}
+
+
+class TikaOcrClient:
+    """
+    Sends images to Tika for OCR from a small thread pool, over a keep-alive
+    session so the connections are reused between calls. A crop that is
+    identical to one still being recognized is not sent again: both callers
+    get the same future.
+    """
+
+    _url: str
+    _timeout_seconds: float
+    _logger: Logger
+    _metrics: PipelineMetrics
+    _session: Optional[requests.Session]
+    _executor: ThreadPoolExecutor
+    _lock: threading.Lock
+    _in_flight: Dict[str, "Future[str]"]
+    _coalesced: int
+
+    def __init__(
+        self,
+        address: str,
+        timeout_seconds: float = 10,
+        max_workers: int = 4,
+        pooled: bool = True,
+        logger: Logger = getLogger(__name__),
+        metrics: PipelineMetrics = pipeline_metrics,
+    ):
+        """
+        :param pooled: False opens a new connection for every call, as the
+            recognizer used to. Only meant for comparing both in benchmarks.
+        """
+        self._url = urljoin(address, "/tika")
+        self._timeout_seconds = timeout_seconds
+        self._logger = logger
+        self._metrics = metrics
+        self._session = None
+        if pooled:
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tika-ocr"
+        )
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._coalesced = 0
+
+    @property
+    def coalesced(self) -> int:
+        """
+        How many calls were answered by a request already in flight.
+        """
+        with self._lock:
+            return self._coalesced
+
+    def submit(
+        self, image_bytes: bytes, content_type: str = "image/png"
+    ) -> "Future[str]":
+        """
+        :return: A future with the text Tika extracted from the image.
+        """
+        key = hashlib.sha1(image_bytes).hexdigest()
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._coalesced += 1
+                return future
+            future = self._executor.submit(
+                self._extract_text, image_bytes, content_type
+            )
+            self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def extract_text(self, image_bytes: bytes, content_type: str = "image/png") -> str:
+        return self.submit(image_bytes, content_type).result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        if self._session is not None:
+            self._session.close()
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def _extract_text(self, image_bytes: bytes, content_type: str) -> str:
+        send = self._session.put if self._session is not None else requests.put
+        with self._metrics.stage("tika_ocr"):
+            response = send(
+                self._url,
+                headers={**TIKA_HEADERS, "Content-Type": content_type},
+                data=image_bytes,
+                timeout=self._timeout_seconds,
+            )
+        if response.status_code != HTTPStatus.OK:
+            raise Exception(f"tika returned a {response.status_code} status code")
+        return response.text
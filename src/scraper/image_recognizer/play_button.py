@@ -0,0 +1,91 @@
+import os
+from typing import Dict, Tuple
+
+import numpy as np
+from PIL import Image
+from pydantic import BaseModel
+
+ASSETS_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "assets")
+ENABLED_BUTTON_PATH = os.path.join(ASSETS_PATH, "enabled_button.png")
+DISABLED_BUTTON_PATH = os.path.join(ASSETS_PATH, "disabled_button.png")
+
+
+class PlayButtonState(BaseModel):
+    enabled: bool
+    confidence: float
+    mean_difference: float
+
+
+class PlayButtonDetector:
+    """
+    Compares the play button region against the enabled and disabled button
+    assets. The assets are loaded once, downsampled into arrays, and every call
+    reuses preallocated buffers, so a check costs a few vectorized operations
+    over roughly a thousand pixels. Not thread safe: use one detector per thread.
+    """
+
+    _enabled: np.ndarray
+    _disabled: np.ndarray
+    _scratch: np.ndarray
+    _threshold: float
+    _sample_indexes: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]]
+
+    def __init__(self, step: int = 2, threshold: float = 8):
+        with Image.open(ENABLED_BUTTON_PATH) as enabled_image:
+            enabled = np.asarray(enabled_image.convert("RGB"))
+        with Image.open(DISABLED_BUTTON_PATH) as disabled_image:
+            disabled = np.asarray(
+                disabled_image.convert("RGB").resize(
+                    (enabled.shape[1], enabled.shape[0])
+                )
+            )
+        self._enabled = enabled[::step, ::step].astype(np.int16)
+        self._disabled = disabled[::step, ::step].astype(np.int16)
+        self._scratch = np.empty_like(self._enabled)
+        self._threshold = threshold
+        self._sample_indexes = {}
+
+    def detect(self, crop: np.ndarray) -> PlayButtonState:
+        """
+        :param crop: RGB view of the play button region of a frame.
+        :return: Whether the button is enabled, with the confidence of that verdict.
+        """
+        sample = crop[self._indexes_for(crop.shape[0], crop.shape[1])]
+        enabled_difference = self._mean_difference(sample, self._enabled)
+        disabled_difference = self._mean_difference(sample, self._disabled)
+        # The disabled button is close to the enabled one, so the nearest asset
+        # decides, and the threshold rejects screens showing neither of them
+        enabled = (
+            enabled_difference < disabled_difference
+            and enabled_difference < self._threshold
+        )
+        total_difference = enabled_difference + disabled_difference
+        enabled_score = (
+            disabled_difference / total_difference if total_difference else 1.0
+        )
+        return PlayButtonState(
+            enabled=enabled,
+            confidence=enabled_score if enabled else 1 - enabled_score,
+            mean_difference=enabled_difference,
+        )
+
+    def is_enabled(self, crop: np.ndarray) -> bool:
+        return self.detect(crop).enabled
+
+    def _indexes_for(self, height: int, width: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Nearest neighbour sampling grid from the crop to the reference, cached
+        # because the crop size only changes when the canvas is resized
+        key = (height, width)
+        if key not in self._sample_indexes:
+            reference_height, reference_width = self._enabled.shape[:2]
+            rows = (np.arange(reference_height) + 0.5) * height / reference_height
+            columns = (np.arange(reference_width) + 0.5) * width / reference_width
+            self._sample_indexes[key] = np.ix_(
+                rows.astype(np.intp), columns.astype(np.intp)
+            )
+        return self._sample_indexes[key]
+
+    def _mean_difference(self, sample: np.ndarray, reference: np.ndarray) -> float:
+        np.subtract(sample, reference, out=self._scratch, dtype=np.int16)
+        np.abs(self._scratch, out=self._scratch)
+        return float(self._scratch.mean())
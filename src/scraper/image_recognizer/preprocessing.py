@@ -0,0 +1,94 @@
+from io import BytesIO
+from typing import List, Literal, Tuple
+
+import numpy as np
+from PIL import Image
+from pydantic import BaseModel, Field
+
+from monitoring import PipelineMetrics
+from scraper.image_recognizer.frame import to_gray
+from scraper.image_recognizer.glyph_atlas import binarize
+
+IMAGE_CONTENT_TYPES = {"png": "image/png", "bmp": "image/bmp"}
+RESAMPLING = {
+    "nearest": Image.Resampling.NEAREST,
+    "bilinear": Image.Resampling.BILINEAR,
+    "bicubic": Image.Resampling.BICUBIC,
+}
+
+
+class OcrPreprocessing(BaseModel):
+    """
+    How a crop is turned into the image uploaded for OCR. The defaults are the
+    original pipeline: the RGB crop upscaled 4x and saved as a regular PNG.
+    """
+
+    # Black text on a white background, which is what Tesseract reads best
+    binarize: bool = False
+    scale: int = Field(default=4, ge=1)
+    resample: Literal["nearest", "bilinear", "bicubic"] = "bicubic"
+    # bmp is uncompressed; png_compress_level 1 compresses fast
+    image_format: Literal["png", "bmp"] = "png"
+    png_compress_level: int = Field(default=6, ge=0, le=9)
+
+    @property
+    def content_type(self) -> str:
+        return IMAGE_CONTENT_TYPES[self.image_format]
+
+    @property
+    def label(self) -> str:
+        image_format = self.image_format
+        if image_format == "png":
+            image_format = f"png{self.png_compress_level}"
+        threshold = "binary" if self.binarize else "rgb"
+        return f"{threshold} x{self.scale} {self.resample} {image_format}"
+
+    def prepare(self, crop: np.ndarray, metrics: PipelineMetrics) -> bytes:
+        """
+        :param crop: RGB crop of the frame.
+        :return: The encoded image, of type content_type.
+        """
+        with metrics.stage("ocr_threshold"):
+            if self.binarize:
+                text = binarize(to_gray(crop))
+                # 1 bit per pixel, so even the uncompressed formats stay small
+                image = Image.fromarray(~text).convert("1")
+            else:
+                image = Image.fromarray(crop)
+        with metrics.stage("ocr_scale"):
+            if self.scale != 1:
+                image = image.resize(
+                    (image.width * self.scale, image.height * self.scale),
+                    RESAMPLING[self.resample],
+                )
+        with metrics.stage("ocr_encode"):
+            output = BytesIO()
+            if self.image_format == "png":
+                image.save(output, format="PNG", compress_level=self.png_compress_level)
+            else:
+                image.save(output, format="BMP")
+            image.close()
+            return output.getvalue()
+
+
+def preprocessing_grid(
+    scales: Tuple[int, ...] = (1, 2, 3, 4),
+    image_formats: Tuple[str, ...] = ("png", "bmp"),
+) -> List[OcrPreprocessing]:
+    """
+    The settings a sweep compares: every scale, with and without binarization,
+    in every format. PNG is tried with the fast compression level, and binary
+    crops are scaled with nearest neighbour so they stay binary.
+    """
+    return [
+        OcrPreprocessing(
+            binarize=binarized,
+            scale=scale,
+            resample="nearest" if binarized else "bicubic",
+            image_format=image_format,
+            png_compress_level=1,
+        )
+        for binarized in (False, True)
+        for scale in scales
+        for image_format in image_formats
+    ]
@@ -0,0 +1,74 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Optional
+
+from scraper.image_recognizer.frame import Frame, Screenshot
+from scraper.image_recognizer.interface import FrameReading, ScraperImageRecognizer
+
+if TYPE_CHECKING:
+    from scraper.image_recognizer.factory import RecognizerOptions
+
+# The recognizer each worker process builds once, at start up
+_worker_recognizer: Optional[ScraperImageRecognizer] = None
+
+
+def _start_worker(options: "RecognizerOptions") -> None:
+    from scraper.image_recognizer.factory import create_image_recognizer
+
+    global _worker_recognizer
+    _worker_recognizer = create_image_recognizer(options)
+
+
+def _read_screenshot(
+    screenshot: Screenshot, enabled_to_play: bool, balance: bool, bet: bool
+) -> FrameReading:
+    return _worker_recognizer.read_frame(
+        Frame(screenshot), enabled_to_play=enabled_to_play, balance=balance, bet=bet
+    )
+
+
+class ProcessPoolRecognizer(ScraperImageRecognizer):
+    """
+    Runs another recognizer in a pool of worker processes, so decoding frames
+    and matching glyphs do not hold the GIL the WebDriver and proxy threads of
+    the scraper need. Only the screenshot bytes cross the process boundary.
+    """
+
+    _executor: ProcessPoolExecutor
+
+    def __init__(
+        self,
+        options: "RecognizerOptions",
+        workers: int = 2,
+        start_method: str = "spawn",
+    ):
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_start_worker,
+            initargs=(options,),
+        )
+        super().__init__()
+
+    def get_bet_value(self, frame: Frame) -> int:
+        return self.read_frame(frame, bet=True).bet_value
+
+    def get_balance_in_cents(self, frame: Frame) -> int:
+        return self.read_frame(frame, balance=True).balance_in_cents
+
+    def check_if_is_enabled_to_play(self, frame: Frame) -> bool:
+        return self.read_frame(frame, enabled_to_play=True).is_enabled_to_play
+
+    def read_frame(
+        self,
+        frame: Frame,
+        enabled_to_play: bool = False,
+        balance: bool = False,
+        bet: bool = False,
+    ) -> FrameReading:
+        return self._executor.submit(
+            _read_screenshot, frame.screenshot, enabled_to_play, balance, bet
+        ).result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,36 @@
+from typing import Tuple
+
+Region = Tuple[int, int, int, int]
+
+
+def bet_region(width: int, height: int) -> Region:
+    pl = int((width / 2) - (width / 6))
+    pr = int((width / 2) + (width / 6))
+    pu = int(height * 0.78)
+    pd = int(height * 0.83)
+    return (pl, pu, pr, pd)
+
+
+def balance_region(width: int, height: int) -> Region:
+    pl = 0
+    pr = int(width / 3) + 20  # 20 is an offset
+    pu = int(height * 0.78)
+    pd = int(height * 0.83)
+    return (pl, pu, pr, pd)
+
+
+def play_button_region(width: int, height: int) -> Region:
+    pl = int(width / 100 * 80)
+    pr = int(width / 100 * 95)
+    pu = int(height / 100 * 85)
+    pd = int(height / 100 * 93)
+    return (pl, pu, pr, pd)
+
+
+def controls_region(width: int, height: int) -> Region:
+    # The bottom bar with the bet, auto and turbo controls, below the reels
+    pl = 0
+    pr = width
+    pu = int(height * 0.75)
+    pd = int(height * 0.95)
+    return (pl, pu, pr, pd)
@@ -0,0 +1,84 @@
+import logging
+import os
+from typing import Callable
+
+from monitoring import PipelineMetrics, pipeline_metrics
+from scraper.image_recognizer.frame import Frame
+from scraper.image_recognizer.glyph_atlas import GlyphAtlas
+from scraper.image_recognizer.interface import ScraperImageRecognizer
+from scraper.image_recognizer.play_button import PlayButtonDetector
+from scraper.image_recognizer.regions import (
+    Region,
+    balance_region,
+    bet_region,
+    play_button_region,
+)
+
+DEFAULT_ATLAS_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "assets/glyph_atlas.npz"
+)
+
+
+class TemplateImageRecognizer(ScraperImageRecognizer):
+    """
+    Reads the balance and bet digits in-process by matching each glyph of the
+    crop against a GlyphAtlas built by the calibrate command.
+    """
+
+    _atlas: GlyphAtlas
+    _logger: logging.Logger
+    _play_button_detector: PlayButtonDetector
+    _metrics: PipelineMetrics
+
+    def __init__(
+        self,
+        atlas: GlyphAtlas,
+        logger: logging.Logger = logging.getLogger(__name__),
+        metrics: PipelineMetrics = pipeline_metrics,
+    ):
+        self._atlas = atlas
+        self._logger = logger
+        self._metrics = metrics
+        self._play_button_detector = PlayButtonDetector()
+        super().__init__()
+
+    @classmethod
+    def from_file(
+        cls,
+        path: str = DEFAULT_ATLAS_PATH,
+        logger: logging.Logger = logging.getLogger(__name__),
+        metrics: PipelineMetrics = pipeline_metrics,
+    ) -> "TemplateImageRecognizer":
+        return cls(atlas=GlyphAtlas.load(path), logger=logger, metrics=metrics)
+
+    def get_bet_value(self, frame: Frame) -> int:
+        try:
+            return self._read_number(frame, bet_region)
+        except Exception as e:
+            self._logger.error(f"getting bet value: {e}")
+            return 0
+
+    def get_balance_in_cents(self, frame: Frame) -> int:
+        try:
+            return self._read_number(frame, balance_region)
+        except Exception as e:
+            self._logger.error(f"getting balance: {e}")
+            return 0
+
+    def check_if_is_enabled_to_play(self, frame: Frame) -> bool:
+        try:
+            state = self._play_button_detector.detect(frame.crop(play_button_region))
+            self._logger.debug(
+                f"play button enabled: {state.enabled} "
+                f"(confidence {state.confidence:.2f})"
+            )
+            return state.enabled
+        except Exception as e:
+            self._logger.error(f"checking game is enabled to play: {e}")
+            return False
+
+    def _read_number(self, frame: Frame, region: Callable[[int, int], Region]) -> int:
+        gray = frame.gray_crop(region)
+        with self._metrics.stage("template_ocr"):
+            text = self._atlas.read_text(gray)
+        return int("".join(char for char in text if char.isdigit()))
@@ -1,115 +1,162 @@
+import hashlib
 import logging
-import os
 import re
-from http import HTTPStatus
-from io import BytesIO
-from urllib.parse import urljoin
+from concurrent.futures import Future
+from typing import Callable, Optional
 
-import requests
-from PIL import Image, ImageChops, ImageStat
+import numpy as np
 
-from scraper.image_recognizer.interface import ScraperImageRecognizer, Screenshot
+from monitoring import PipelineMetrics, pipeline_metrics
+from scraper.image_recognizer.frame import Frame
+from scraper.image_recognizer.interface import FrameReading, ScraperImageRecognizer
+from scraper.image_recognizer.ocr_cache import OcrCache
+from scraper.image_recognizer.ocr_client import TikaOcrClient
+from scraper.image_recognizer.play_button import PlayButtonDetector
+from scraper.image_recognizer.preprocessing import OcrPreprocessing
+from scraper.image_recognizer.regions import (
+    Region,
+    balance_region,
+    bet_region,
+    play_button_region,
+)
 
 
 class TikaImageRecognizer(ScraperImageRecognizer):
     _address: str
     _logger: logging.Logger
+    _play_button_detector: PlayButtonDetector
+    _metrics: PipelineMetrics
+    _ocr_client: TikaOcrClient
+    # Only a client created here is closed with the recognizer
+    _owns_client: bool
+    _ocr_cache: Optional[OcrCache]
+    _preprocessing: OcrPreprocessing
+    # Part of the cache keys, so results read with other settings are not used
+    _preprocessing_key: str
 
     def __init__(
-        self, address: str, logger: logging.Logger = logging.getLogger(__name__)
+        self,
+        address: str,
+        logger: logging.Logger = logging.getLogger(__name__),
+        metrics: PipelineMetrics = pipeline_metrics,
+        timeout_seconds: float = 10,
+        ocr_client: Optional[TikaOcrClient] = None,
+        ocr_cache: Optional[OcrCache] = None,
+        preprocessing: OcrPreprocessing = OcrPreprocessing(),
     ):
+        """
+        :param ocr_client: A client shared with other users, which close()
+            leaves open.
+        :param ocr_cache: Reuse the text read from identical crops instead of
+            sending them to Tika again.
+        :param preprocessing: How crops are turned into the uploaded images.
+        """
         self._address = address
         self._logger = logger
+        self._metrics = metrics
+        self._play_button_detector = PlayButtonDetector()
+        self._owns_client = ocr_client is None
+        self._ocr_client = ocr_client or TikaOcrClient(
+            address, timeout_seconds=timeout_seconds, logger=logger, metrics=metrics
+        )
+        self._ocr_cache = ocr_cache
+        self._preprocessing = preprocessing
+        self._preprocessing_key = hashlib.blake2b(
+            preprocessing.model_dump_json().encode(), digest_size=8
+        ).hexdigest()
         super().__init__()
 
-    def get_bet_value(self, screenshot: Screenshot) -> int:
-        image = Image.open(BytesIO(screenshot.image_bytes))
-        pl = int((image.width / 2) - (image.width / 6))
-        pr = int((image.width / 2) + (image.width / 6))
-        pu = int(image.height * 0.78)
-        pd = int(image.height * 0.83)
-        crop_rectangle = (pl, pu, pr, pd)
-        cropped_image = image.crop(crop_rectangle)
-        # Have to resize the image because the original is small
-        cropped_image = cropped_image.resize(
-            (cropped_image.width * 4, cropped_image.height * 4)
-        )
-        img_byte_arr = BytesIO()
-        cropped_image.save(img_byte_arr, format="PNG")
-        cropped_image_bytes = img_byte_arr.getvalue()
-        res = self._get_text_from_tika(payload=cropped_image_bytes)
-        cropped_image.close()
+    def get_bet_value(self, frame: Frame) -> int:
+        return self._read_number(self._submit_crop(frame, bet_region), "bet value")
+
+    def get_balance_in_cents(self, frame: Frame) -> int:
+        return self._read_number(self._submit_crop(frame, balance_region), "balance")
+
+    def check_if_is_enabled_to_play(self, frame: Frame) -> bool:
         try:
-            bet = int(res)
-            return bet
+            state = self._play_button_detector.detect(frame.crop(play_button_region))
+            self._logger.debug(
+                f"play button enabled: {state.enabled} "
+                f"(confidence {state.confidence:.2f})"
+            )
+            return state.enabled
         except Exception as e:
-            self._logger.error(f"getting bet value: {e}")
-            return 0
+            self._logger.error(f"checking game is enabled to play: {e}")
+            return False
 
-    def get_balance_in_cents(self, screenshot: Screenshot) -> int:
-        try:
-            image = Image.open(BytesIO(screenshot.image_bytes))
-            pl = 0
-            pr = int(image.width / 3) + 20  # 20 is an offset
-            pu = int(image.height * 0.78)
-            pd = int(image.height * 0.83)
-            crop_rectangle = (pl, pu, pr, pd)
-            cropped_image = image.crop(crop_rectangle)
-            # Have to resize the image because the original is small
-            cropped_image = cropped_image.resize(
-                (cropped_image.width * 4, cropped_image.height * 4)
+    def read_frame(
+        self,
+        frame: Frame,
+        enabled_to_play: bool = False,
+        balance: bool = False,
+        bet: bool = False,
+    ) -> FrameReading:
+        """
+        Like ScraperImageRecognizer.read_frame, but the balance and bet crops
+        are sent to Tika at the same time.
+        """
+        balance_text = self._submit_crop(frame, balance_region) if balance else None
+        bet_text = self._submit_crop(frame, bet_region) if bet else None
+        reading = FrameReading()
+        if enabled_to_play:
+            reading.is_enabled_to_play = self.check_if_is_enabled_to_play(frame)
+        if balance_text is not None:
+            reading.balance_in_cents = self._read_number(balance_text, "balance")
+        if bet_text is not None:
+            reading.bet_value = self._read_number(bet_text, "bet value")
+        return reading
+
+    def close(self) -> None:
+        if self._owns_client:
+            self._ocr_client.close()
+        if self._ocr_cache is not None:
+            stats = self._ocr_cache.stats()
+            self._logger.info(
+                f"ocr cache: {stats.hits} hits ({stats.disk_hits} from disk), "
+                f"{stats.misses} misses, {stats.evictions} evictions"
             )
-            img_byte_arr = BytesIO()
-            cropped_image.save(img_byte_arr, format="PNG")
-            cropped_image_bytes = img_byte_arr.getvalue()
-            res = self._get_text_from_tika(payload=cropped_image_bytes)
-            cropped_image.close()
-            balance = int(res)
-            return balance
+            self._ocr_cache.close()
+
+    def _submit_crop(
+        self, frame: Frame, region: Callable[[int, int], Region]
+    ) -> "Future[str]":
+        try:
+            crop = frame.crop(region)
+            if self._ocr_cache is None:
+                return self._submit_image(crop)
+            key = self._ocr_cache.key(crop, variant=self._preprocessing_key)
+            text = self._ocr_cache.get(key)
+            if text is not None:
+                cached: "Future[str]" = Future()
+                cached.set_result(text)
+                return cached
+            future = self._submit_image(crop)
+            future.add_done_callback(lambda done: self._cache_text(key, done))
+            return future
         except Exception as e:
-            self._logger.error(f"getting balance: {e}")
-            return 0
+            failed: "Future[str]" = Future()
+            failed.set_exception(e)
+            return failed
 
-    def check_if_is_enabled_to_play(self, screenshot: Screenshot) -> bool:
+    def _cache_text(self, key: str, future: "Future[str]") -> None:
+        """
+        Keep the text only when it reads as a number, so an empty or garbled
+        result is asked to OCR again next time instead of being reused.
+        """
+        if future.exception() is None and self._clean_chars(future.result()):
+            self._ocr_cache.put(key, future.result())
+
+    def _read_number(self, text: "Future[str]", name: str) -> int:
         try:
-            image = Image.open(BytesIO(screenshot.image_bytes))
-            pl = int(image.width / 100 * 80)
-            pr = int(image.width / 100 * 95)
-            pu = int(image.height / 100 * 85)
-            pd = int(image.height / 100 * 93)
-            crop_rectangle = (pl, pu, pr, pd)
-            cropped_image = image.crop(crop_rectangle)
-            enabled_button_path = os.path.join(
-                os.path.dirname(os.path.realpath(__file__)), "assets/enabled_button.png"
-            )
-            enabled_button_image = Image.open(enabled_button_path)
-            cropped_image = cropped_image.resize(
-                (enabled_button_image.width, enabled_button_image.height)
-            )
-            diff = ImageChops.difference(cropped_image, enabled_button_image)
-            stat = ImageStat.Stat(diff)
-            mean_diff = sum(stat.mean) / len(stat.mean)
-            comparsing_threshold = 8
-            is_similar = mean_diff < comparsing_threshold
-            cropped_image.close()
-            enabled_button_image.close()
-            return is_similar
+            return int(self._clean_chars(text.result()))
         except Exception as e:
-            self._logger.error(f"checking game is enabled to play: {e}")
-            return False
+            self._logger.error(f"getting {name}: {e}")
+            return 0
 
-    def _get_text_from_tika(self, payload: bytes) -> str:
-        url = urljoin(self._address, "/tika")
-        headers = {
-            "Accept": "text/plain",
-            "Content-Type": "image/png",
-            "X-Tika-PDFOcrStrategy": "ocr_only",
-        }
-        response = requests.request("PUT", url, headers=headers, data=payload)
-        if response.status_code != HTTPStatus.OK:
-            raise Exception(f"tika returned a {response.status_code} status code")
-        cleaned_text = self._clean_chars(response.text)
-        return cleaned_text
+    def _submit_image(self, crop: np.ndarray) -> "Future[str]":
+        with self._metrics.stage("ocr_preprocess"):
+            image_bytes = self._preprocessing.prepare(crop, self._metrics)
+        return self._ocr_client.submit(image_bytes, self._preprocessing.content_type)
 
     def _clean_chars(self, extracted_text: str) -> str:
         only_digits_regex = r"[^\d]"
@@ -1,32 +1,48 @@
-import gzip
-import json
+import os
 import time
-from http import HTTPStatus
+from contextlib import nullcontext
 from logging import Logger, getLogger
 from random import randrange
-from typing import List
-from urllib.parse import parse_qs
+from typing import Callable, List, Literal, Optional
 
 import seleniumwire.undetected_chromedriver as uc
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from seleniumwire import webdriver
+from seleniumwire.request import Request, Response
 
-from model.data import FortuneTigerData, FortuneTigerRequest, FortuneTigerResponse
+from monitoring import PipelineMetrics, SamplingProfiler, pipeline_metrics
+from scraper.archive import ReplayDriver, ScreenshotEvent, TrafficArchive
 from scraper.balance_printer import BalancePrinter
+from scraper.balance_tracker import BalanceState, BalanceTracker
 from scraper.exceptions import GameFroze, GameIsBlocked
-from scraper.image_recognizer import ScraperImageRecognizer, Screenshot
+from scraper.image_recognizer import (
+    Frame,
+    FrameCounter,
+    ScraperImageRecognizer,
+    Screenshot,
+)
+from scraper.image_recognizer.frame import mean_difference
+from scraper.image_recognizer.regions import controls_region
+from scraper.spin_stream import SpinStream
+from scraper.spin_tracker import SpinTracker
+from scraper.startup import StartupTimings
+from scraper.subscriber.dispatcher import DispatcherConfig, SubscriberDispatcher
 from scraper.subscriber.interface import FortuneTigerSubscriber
+from scraper.traffic import SPIN_PATH_MARKER, is_spin_exchange, to_fortune_tiger_data
 
 
 class FortuneTigerGame(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
     game_canvas: WebElement
     action_chains: ActionChains
+    frame_counter: FrameCounter = Field(default_factory=FrameCounter)
+    archive: Optional[TrafficArchive] = None
+    metrics: Optional[PipelineMetrics] = None
 
     @property
     def game_canvas_width(self) -> int:
@@ -44,10 +60,96 @@ class FortuneTigerGame(BaseModel):
             extension="png",
         )
 
+    def capture_frame(self, record: bool = True) -> Frame:
+        """
+        :param record: Save the screenshot to the archive, if there is one.
+        """
+        self.frame_counter.screenshots += 1
+        if self.metrics is not None:
+            with self.metrics.stage("screenshot"):
+                screenshot = self.take_screenshot()
+        else:
+            screenshot = self.take_screenshot()
+        if record and self.archive is not None:
+            self.archive.record_screenshot(screenshot)
+        return Frame(screenshot, counter=self.frame_counter, metrics=self.metrics)
+
+
+class ScraperConfig(BaseModel):
+    # Hand each Spin response to the subscribers as soon as it is intercepted,
+    # instead of scanning the stored traffic at the end of every batch
+    streaming: bool = False
+    stream_queue_size: int = Field(default=1000, gt=0)
+    # Only capture the Spin endpoint, so selenium-wire stores nothing else
+    capture_only_spins: bool = True
+    request_storage_max_size: int = Field(default=200, gt=0)
+    # Save the Spin exchanges and screenshots here, so the session can be
+    # replayed offline with FortuneTigerScraper.replay_data
+    record_dir: Optional[str] = None
+    # Run cProfile on one of every profile_every_batches batches
+    profile_every_batches: Optional[int] = Field(default=None, gt=0)
+    profile_dir: str = "profiles"
+    # "traffic" follows the balance from the spin responses and only reads it
+    # from the screen every ocr_balance_check_every_batches batches as a check
+    balance_source: Literal["traffic", "ocr"] = "traffic"
+    ocr_balance_check_every_batches: int = Field(default=10, gt=0)
+    balance_tolerance_cents: int = Field(default=0, ge=0)
+    # Batches in a row that may end with neither a tracked nor a readable
+    # balance before the session is stopped
+    max_unknown_balance_batches: int = Field(default=3, gt=0)
+    # dt.si.bl is reported in currency units
+    traffic_balance_to_cents: float = Field(default=100, gt=0)
+    # Chrome profile and disk cache kept between sessions, so the game assets
+    # are loaded from disk instead of downloaded again
+    browser_profile_dir: Optional[str] = None
+    browser_cache_dir: Optional[str] = None
+    # Keep the browser open after scrape_data returns or fails, for the next
+    # call to reuse; close() quits it
+    keep_browser: bool = False
+    # Hosts reached without the selenium-wire proxy. Responses that went
+    # through its certificate are never cached by Chrome, and nothing from
+    # these hosts is captured anyway
+    proxy_bypass_hosts: List[str] = ["static.pgsoft-games.com", "m.pgsoft-games.com"]
+    # The start button is waited for explicitly, so the page load does not
+    # have to wait for every subresource
+    page_load_strategy: Literal["normal", "eager"] = "eager"
+    # Longest wait for the bet to show the raised value
+    bet_ready_timeout_seconds: float = Field(default=2, gt=0)
+    # Give each subscriber its own queue and thread, so a slow one does not
+    # hold back the batch loop or the other subscribers
+    dispatch_subscribers: bool = False
+    dispatcher: DispatcherConfig = DispatcherConfig()
+
+
+class ReplayStats(BaseModel):
+    spins: int
+    screenshots: int
+    batches: int
+    recorded_seconds: float
+    elapsed_seconds: float
+
 
 class FortuneTigerScraper:
+    spins_per_batch: int = 10
+    batch_timeout_seconds: float = 30
+    # How often the screen is checked while the batch spins are not all in
+    screen_check_interval_seconds: float = 1
+    game_api_scope: str = ".*api.pg-demo.com/game-api/fortune-tiger/v2/"
     _image_recognizer: ScraperImageRecognizer
     _logger: Logger
+    _config: ScraperConfig
+    _spin_tracker: SpinTracker
+    _spin_stream: Optional[SpinStream]
+    _dispatcher: Optional[SubscriberDispatcher]
+    _archive: Optional[TrafficArchive]
+    _metrics: PipelineMetrics
+    _profiler: Optional[SamplingProfiler]
+    _balance_tracker: Optional[BalanceTracker]
+    _batches_since_balance_check: int
+    _unknown_balance_batches: int
+    _heartbeat: Optional[Callable[[], None]]
+    _driver: Optional[webdriver.Remote]
+    last_startup: Optional[StartupTimings]
     game_url: str = (
         "https://m.pgsoft-games.com/126/index.html?l=pt&ot=ca7094186b309ee149c55c8822e7ecf2&btt=2&from=https://pgdemo.asia/&language=pt-BR&__refer=m.pg-redirect.net&or=static.pgsoft-games.com"
     )
@@ -56,73 +158,475 @@ class FortuneTigerScraper:
         self,
         image_recognizer: ScraperImageRecognizer,
         logger: Logger = getLogger(__name__),
+        config: ScraperConfig = ScraperConfig(),
+        metrics: PipelineMetrics = pipeline_metrics,
+        heartbeat: Optional[Callable[[], None]] = None,
     ):
+        """
+        :param heartbeat: Called whenever the scraper makes progress, so a
+            supervisor can tell a stuck scraper from a slow one.
+        """
         self._image_recognizer = image_recognizer
         self._logger = logger
+        self._config = config
+        self._spin_tracker = SpinTracker()
+        self._spin_stream = None
+        self._dispatcher = None
+        self._archive = None
+        self._metrics = metrics
+        self._profiler = None
+        self._balance_tracker = None
+        self._batches_since_balance_check = 0
+        self._unknown_balance_batches = 0
+        self._heartbeat = heartbeat
+        self._driver = None
+        self.last_startup = None
+        if config.profile_every_batches is not None:
+            self._profiler = SamplingProfiler(
+                config.profile_every_batches,
+                output_dir=config.profile_dir,
+                logger=logger,
+            )
 
     def scrape_data(
         self,
         subscribers: List[FortuneTigerSubscriber],
         headless: bool = True,
     ) -> None:
+        subscribers = self._start_dispatcher(self._track_balance(subscribers))
+        self._start_spin_stream(subscribers)
+        if self._config.record_dir is not None:
+            self._archive = TrafficArchive(self._config.record_dir)
+            self._archive.open_for_recording()
+            self._logger.info(f"recording session at {self._config.record_dir}")
         try:
-            driver = self._create_webdriver(headless)
-            is_game_blocked = True
-            while is_game_blocked:
-                self._logger.info(f"accessing game url")
+            game = self.open_game(headless)
+            driver = self._driver
+            have_balance = True
+            while have_balance:
+                game.frame_counter.reset()
+                self._beat()
+                with self._sample_profile():
+                    batch_started_at = time.monotonic()
+                    spins_target = self._spin_tracker.expect(self.spins_per_batch)
+                    self._start_automate_bet(game)
+                    with self._metrics.stage("batch_wait"):
+                        frame = self._wait_for_batch(game, spins_target)
+                    self._logger.info(
+                        f"batch finished in {time.monotonic() - batch_started_at:.1f}s"
+                    )
+                    balance_in_cents = self._finish_batch(driver, subscribers, frame)
+                self._log_frame_usage(game.frame_counter)
+                have_balance = balance_in_cents is None or balance_in_cents > 0
+        except Exception as e:
+            self._logger.error(f"error at scraper execution: {e}", exc_info=True)
+            raise e
+        finally:
+            if not self._config.keep_browser:
+                self.close()
+            self._stop_spin_stream()
+            self._stop_dispatcher()
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
+
+    def open_game(self, headless: bool = True) -> FortuneTigerGame:
+        """
+        Get a game ready to play, in the browser kept from the last session when
+        there is one, timing each phase in last_startup.
+        """
+        timings = StartupTimings()
+        self.last_startup = timings
+        with timings.phase("webdriver", self._metrics):
+            timings.warm_browser = self._reuse_driver()
+            if not timings.warm_browser:
+                self._driver = self._create_webdriver(headless)
+        driver = self._driver
+        is_game_blocked = True
+        while is_game_blocked:
+            self._beat()
+            self._logger.info(f"accessing game url")
+            with timings.phase("page_load", self._metrics):
                 driver.get(self.game_url)
+            with timings.phase("start_button", self._metrics):
                 self._click_start_button(driver)
+            with timings.phase("game_canvas", self._metrics):
                 game_canvas = self._find_game_canvas(driver)
-                actions = ActionChains(driver)
-                game = FortuneTigerGame(
-                    game_canvas=game_canvas,
-                    action_chains=actions,
-                )
+            actions = ActionChains(driver)
+            game = FortuneTigerGame(
+                game_canvas=game_canvas,
+                action_chains=actions,
+                archive=self._archive,
+                metrics=self._metrics,
+            )
+            with timings.phase("raise_bet", self._metrics):
                 self._raise_bet(game)
+            with timings.phase("bet_check", self._metrics):
                 is_game_blocked = self._check_if_game_is_blocked(game)
-                if is_game_blocked:
-                    raise GameIsBlocked("game is blocked")
+            if is_game_blocked:
+                raise GameIsBlocked("game is blocked")
+        with timings.phase("turbo", self._metrics):
             self._click_turbo_button(game)
-            have_balance = True
-            while have_balance:
-                self._start_automate_bet(game)
-                is_able_to_play = False
-                quantity_of_tries = 0
-                max_quantity_of_tries = 30
-                while not is_able_to_play:
-                    is_able_to_play = (
-                        self._image_recognizer.check_if_is_enabled_to_play(
-                            screenshot=game.take_screenshot()
-                        )
-                    )
-                    if not is_able_to_play:
-                        self._logger.info(f"waiting the game to play again")
-                        max_quantity_of_tries += 1
-                        time.sleep(1)
-                    if quantity_of_tries >= max_quantity_of_tries:
-                        raise GameFroze("game has froze")
+        self._logger.info(timings.describe())
+        return game
+
+    def close(self) -> None:
+        """
+        Quit the browser, also the one keep_browser keeps between sessions.
+        """
+        driver = self._driver
+        self._driver = None
+        if driver is None:
+            return
+        try:
+            driver.close()
+        except Exception as e:
+            self._logger.debug(f"error at closing the browser window: {e}")
+        driver.quit()
+
+    def replay_data(
+        self,
+        archive: TrafficArchive,
+        subscribers: List[FortuneTigerSubscriber],
+        speed: Optional[float] = None,
+    ) -> ReplayStats:
+        """
+        Run a recorded session through the same interception, recognition and
+        notification steps as scrape_data, without a browser. A batch ends at
+        the first screenshot read as enabled to play after some spins arrived,
+        as it does live.
+        :param speed: None replays as fast as possible, 1 at the recorded pace,
+            2 twice as fast and so on.
+        """
+        driver = ReplayDriver()
+        frame_counter = FrameCounter()
+        spins = screenshots = batches = pending_spins = 0
+        offset_seconds = 0.0
+        started_at = time.monotonic()
+        subscribers = self._start_dispatcher(self._track_balance(subscribers))
+        self._start_spin_stream(subscribers)
+        try:
+            for event in archive.events():
+                offset_seconds = event.offset_seconds
+                if speed is not None:
+                    delay = offset_seconds / speed - (time.monotonic() - started_at)
+                    if delay > 0:
+                        time.sleep(delay)
+                if not isinstance(event, ScreenshotEvent):
+                    spins += 1
+                    pending_spins += 1
+                    driver.add(event.request)
+                    self._intercept_response(event.request, event.response)
+                    continue
+                screenshots += 1
+                frame_counter.screenshots += 1
+                frame = Frame(
+                    event.screenshot, counter=frame_counter, metrics=self._metrics
+                )
+                reading = self._image_recognizer.read_frame(frame, enabled_to_play=True)
+                if not pending_spins or not reading.is_enabled_to_play:
+                    continue
+                batches += 1
+                pending_spins = 0
+                with self._sample_profile():
+                    self._finish_batch(driver, subscribers, frame)
+            # Spins of a batch the recording stopped in the middle of
+            if pending_spins and self._spin_stream is None:
                 self._notify_subscribers(driver, subscribers)
-                balance_in_cents = self._image_recognizer.get_balance_in_cents(
-                    screenshot=game.take_screenshot()
+        finally:
+            self._stop_spin_stream()
+            self._stop_dispatcher()
+        return ReplayStats(
+            spins=spins,
+            screenshots=screenshots,
+            batches=batches,
+            recorded_seconds=offset_seconds,
+            elapsed_seconds=time.monotonic() - started_at,
+        )
+
+    def _finish_batch(
+        self,
+        driver: webdriver.Remote,
+        subscribers: List[FortuneTigerSubscriber],
+        frame: Frame,
+    ) -> Optional[int]:
+        """
+        Hand the batch spins to the subscribers and read the balance left.
+        :param frame: The frame where the batch was seen finished.
+        :return: None if the balance is not known yet.
+        """
+        if self._spin_stream is not None:
+            self._log_stream_metrics(driver)
+        else:
+            self._notify_subscribers(driver, subscribers)
+        balance_in_cents = self._read_balance(frame)
+        if balance_in_cents is not None:
+            BalancePrinter.print_balance(self._logger, balance_in_cents)
+        return balance_in_cents
+
+    def _track_balance(
+        self, subscribers: List[FortuneTigerSubscriber]
+    ) -> List[FortuneTigerSubscriber]:
+        """
+        Start following the balance of a new session.
+        :return: The subscribers plus the balance tracker.
+        """
+        self._balance_tracker = BalanceTracker(
+            balance_to_cents=self._config.traffic_balance_to_cents,
+            tolerance_cents=self._config.balance_tolerance_cents,
+            logger=self._logger,
+        )
+        self._batches_since_balance_check = 0
+        self._unknown_balance_batches = 0
+        return [*subscribers, self._balance_tracker]
+
+    def _read_balance(self, frame: Frame) -> Optional[int]:
+        """
+        Take the balance from the spins once they are being tracked, and from
+        the screen before that. The screen is otherwise only read as a
+        consistency check, which raises an alert when it disagrees but never
+        replaces the tracked balance. A reading of 0 is also what a failed OCR
+        call gives, so it is never taken as a balance.
+        :return: None while the balance is not known yet.
+        """
+        tracker = self._balance_tracker
+        if self._config.balance_source == "ocr":
+            return self._image_recognizer.read_frame(
+                frame, balance=True
+            ).balance_in_cents
+        self._wait_for_delivered_spins(timeout=1)
+        if tracker.state == BalanceState.UNKNOWN:
+            return self._read_unknown_balance(frame)
+        self._unknown_balance_batches = 0
+        balance_in_cents = tracker.balance_in_cents
+        self._batches_since_balance_check += 1
+        check_is_due = (
+            self._batches_since_balance_check
+            >= self._config.ocr_balance_check_every_batches
+        )
+        if check_is_due or tracker.state == BalanceState.DIVERGED:
+            self._batches_since_balance_check = 0
+            reading = self._image_recognizer.read_frame(frame, balance=True)
+            if reading.balance_in_cents:
+                tracker.check(reading.balance_in_cents)
+            else:
+                self._logger.warning("balance check skipped, the screen was unreadable")
+        return balance_in_cents
+
+    def _read_unknown_balance(self, frame: Frame) -> Optional[int]:
+        """
+        Read the balance from the screen while no spin reported it.
+        :return: None if it could not be read, 0 once that happened
+            max_unknown_balance_batches times in a row, to stop the session.
+        """
+        reading = self._image_recognizer.read_frame(frame, balance=True)
+        if reading.balance_in_cents:
+            self._unknown_balance_batches = 0
+            return reading.balance_in_cents
+        self._unknown_balance_batches += 1
+        if self._unknown_balance_batches >= self._config.max_unknown_balance_batches:
+            self._logger.error(
+                f"no balance for {self._unknown_balance_batches} batches in a row, "
+                "neither from the spins nor from the screen"
+            )
+            return 0
+        self._logger.warning("balance unknown, the screen was unreadable")
+        return None
+
+    def _wait_for_delivered_spins(self, timeout: float) -> None:
+        """
+        Wait for the spins handed off to the stream or the dispatcher threads to
+        reach the balance tracker; the other subscribers are not waited for.
+        Spins that failed to decode or were dropped never get there, so they
+        are not waited for either.
+        """
+        deadline = time.monotonic() + timeout
+        if self._spin_stream is not None:
+            self._spin_stream.wait_until_drained(timeout)
+        if self._dispatcher is not None:
+            self._dispatcher.wait_until_idle(
+                max(0, deadline - time.monotonic()),
+                subscriber=self._balance_tracker,
+            )
+
+    def _beat(self) -> None:
+        if self._heartbeat is not None:
+            self._heartbeat()
+
+    def _sample_profile(self):
+        if self._profiler is None:
+            return nullcontext()
+        return self._profiler.sample()
+
+    def _start_spin_stream(self, subscribers: List[FortuneTigerSubscriber]) -> None:
+        if not self._config.streaming:
+            return
+        self._spin_stream = SpinStream(
+            subscribers,
+            max_size=self._config.stream_queue_size,
+            logger=self._logger,
+            metrics=self._metrics,
+        )
+        self._spin_stream.start()
+
+    def _stop_spin_stream(self) -> None:
+        if self._spin_stream is not None:
+            self._spin_stream.stop()
+            self._spin_stream = None
+
+    def _start_dispatcher(
+        self, subscribers: List[FortuneTigerSubscriber]
+    ) -> List[FortuneTigerSubscriber]:
+        """
+        :return: The subscribers to notify, the dispatcher in their place when
+            dispatch_subscribers is set.
+        """
+        if not self._config.dispatch_subscribers:
+            return subscribers
+        self._dispatcher = SubscriberDispatcher(
+            subscribers,
+            config=self._config.dispatcher,
+            logger=self._logger,
+            metrics=self._metrics,
+        )
+        self._dispatcher.start()
+        return [self._dispatcher]
+
+    def _stop_dispatcher(self) -> None:
+        if self._dispatcher is None:
+            return
+        self._dispatcher.stop()
+        for stats in self._dispatcher.stats():
+            self._logger.info(
+                f"subscriber {stats.name}: {stats.delivered} delivered, "
+                f"{stats.failed} failed, {stats.dropped} dropped, "
+                f"{stats.spilled} spilled, max queue depth {stats.max_queue_depth}"
+            )
+        self._dispatcher = None
+
+    def _wait_for_batch(self, game: FortuneTigerGame, spins_target: int) -> Frame:
+        """
+        Wait for the autoplay batch to end, driven by the intercepted Spin
+        responses. Once they all arrived, the screen only has to finish the last
+        animation, so it is polled quickly. Until then the screen is still
+        checked every screen_check_interval_seconds, so a batch whose spins are
+        not intercepted ends when the game shows it; the whole wait shares one
+        batch_timeout_seconds deadline.
+        :return: The frame where the game was seen enabled to play again.
+        """
+        deadline = time.monotonic() + self.batch_timeout_seconds
+        while True:
+            timeout = min(
+                self.screen_check_interval_seconds, deadline - time.monotonic()
+            )
+            if self._spin_tracker.wait_for(spins_target, timeout=max(timeout, 0)):
+                return self._wait_until_enabled_to_play(
+                    game, poll_interval=0.1, deadline=deadline
+                )
+            self._beat()
+            frame = game.capture_frame()
+            reading = self._image_recognizer.read_frame(frame, enabled_to_play=True)
+            if reading.is_enabled_to_play:
+                intercepted = self._spin_tracker.spins - (
+                    spins_target - self.spins_per_batch
+                )
+                self._logger.warning(
+                    f"only {intercepted} of {self.spins_per_batch} spins "
+                    "intercepted before the game was enabled to play"
                 )
-                BalancePrinter.print_balance(self._logger, balance_in_cents)
-                have_balance = balance_in_cents > 0
+                return frame
+            if time.monotonic() >= deadline:
+                raise GameFroze("game has froze")
+
+    def _wait_until_enabled_to_play(
+        self, game: FortuneTigerGame, poll_interval: float, deadline: float
+    ) -> Frame:
+        """
+        Poll the canvas until the play button is enabled again.
+        :param deadline: time.monotonic() value after which the game froze.
+        :return: The frame where the game was seen enabled, so later questions
+            about the same game state reuse it instead of taking a new screenshot.
+        """
+        while True:
+            self._beat()
+            frame = game.capture_frame()
+            reading = self._image_recognizer.read_frame(frame, enabled_to_play=True)
+            if reading.is_enabled_to_play:
+                return frame
+            if time.monotonic() >= deadline:
+                raise GameFroze("game has froze")
+            self._logger.debug(f"waiting the game to play again")
+            time.sleep(poll_interval)
+
+    def _log_frame_usage(self, frame_counter: FrameCounter) -> None:
+        self._logger.info(
+            f"frames per spin: "
+            f"{frame_counter.screenshots / self.spins_per_batch:.2f} screenshots, "
+            f"{frame_counter.decodes / self.spins_per_batch:.2f} decodes"
+        )
+
+    def _log_stream_metrics(self, driver: webdriver.Remote) -> None:
+        # The records were already streamed, the stored copies are only garbage
+        del driver.requests
+        metrics = self._spin_stream.metrics()
+        self._logger.info(
+            f"spin stream: {metrics.processed} processed, "
+            f"{metrics.queue_depth} queued (max {metrics.max_queue_depth}), "
+            f"{metrics.dropped} dropped, {metrics.failed} failed"
+        )
+
+    def _intercept_response(self, request: Request, response: Response) -> None:
+        self._spin_tracker.response_interceptor(request, response)
+        if self._spin_stream is not None:
+            self._spin_stream.response_interceptor(request, response)
+        if self._archive is not None and is_spin_exchange(request, response):
+            self._archive.record_exchange(request, response)
+
+    def _reuse_driver(self) -> bool:
+        """
+        :return: True if the browser kept from the last session still responds
+            and can be used again.
+        """
+        if self._driver is None:
+            return False
+        try:
+            # Any command fails once the browser or its window is gone
+            self._driver.current_url
         except Exception as e:
-            self._logger.error(f"error at scraper execution: {e}", exc_info=True)
-            raise e
-        finally:
-            if driver is not None:
-                driver.close()
-                driver.quit()
+            self._logger.warning(f"kept browser is not usable, replacing it: {e}")
+            self.close()
+            return False
+        # Spins captured by the last session were already handled
+        del self._driver.requests
+        self._logger.info("reusing the browser of the last session")
+        return True
 
     def _create_webdriver(self, headless: bool) -> webdriver.Remote:
         chrome_options = uc.ChromeOptions()
+        chrome_options.page_load_strategy = self._config.page_load_strategy
         if headless:
             chrome_options.add_argument("--headless")
+        if self._config.browser_profile_dir is not None:
+            profile_dir = os.path.abspath(self._config.browser_profile_dir)
+            chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+        if self._config.browser_cache_dir is not None:
+            cache_dir = os.path.abspath(self._config.browser_cache_dir)
+            chrome_options.add_argument(f"--disk-cache-dir={cache_dir}")
+        seleniumwire_options = {
+            "request_storage": "memory",
+            "request_storage_max_size": self._config.request_storage_max_size,
+        }
+        if self._config.proxy_bypass_hosts:
+            seleniumwire_options["exclude_hosts"] = self._config.proxy_bypass_hosts
         driver = webdriver.Chrome(
             options=chrome_options,
+            seleniumwire_options=seleniumwire_options,
         )
-        driver.scopes = [".*api.pg-demo.com/game-api/fortune-tiger/v2/.*"]
+        if self._config.capture_only_spins:
+            driver.scopes = [f"{self.game_api_scope}{SPIN_PATH_MARKER}.*"]
+        else:
+            driver.scopes = [f"{self.game_api_scope}.*"]
+        driver.response_interceptor = self._intercept_response
         driver.set_window_size(1920, 1080)
         self._logger.info("creating a new webdriver")
         return driver
@@ -155,7 +659,6 @@ class FortuneTigerScraper:
                 randrange(int((y / 100) * 40), int((y / 100) * 45)),
             ).click().perform()
         self._logger.info("bet raised")
-        time.sleep(0.5)
 
     def _click_turbo_button(self, game: FortuneTigerGame) -> None:
         x = game.game_canvas_width
@@ -166,7 +669,7 @@ class FortuneTigerScraper:
             randrange(int((y / 100) * 36), int((y / 100) * 39)),
         ).click().perform()
         self._logger.info("clicked turbo button")
-        time.sleep(1)
+        self._wait_for_canvas_to_settle(game, timeout=1)
 
     def _start_automate_bet(self, game: FortuneTigerGame) -> None:
         x = game.game_canvas_width
@@ -177,14 +680,14 @@ class FortuneTigerScraper:
             randrange(int((y / 100) * 36), int((y / 100) * 39)),
         ).click().perform()
         self._logger.info("clicked auto button")
-        time.sleep(1)
+        self._wait_for_canvas_to_settle(game, timeout=1)
         game.action_chains.move_to_element_with_offset(
             game.game_canvas,
             randrange(int((x / 100) * 30), int((x / 100) * 35)) * -1,
             randrange(int((y / 100) * 27), int((y / 100) * 30)),
         ).click().perform()
         self._logger.info("clicked 10")
-        time.sleep(1)
+        self._wait_for_canvas_to_settle(game, timeout=1)
         game.action_chains.move_to_element_with_offset(
             game.game_canvas,
             randrange(int((x / 100) * 0), int((x / 100) * 5)),
@@ -205,38 +708,45 @@ class FortuneTigerScraper:
     def _notify_subscribers(
         self, driver: webdriver.Remote, subscribers: List[FortuneTigerSubscriber]
     ) -> None:
+        """
+        Decode the spins of the batch and hand them to each subscriber in one
+        process_batch call. A spin that fails to decode is left out and counted
+        as a spin_decode error, and a subscriber that fails does not keep the
+        others from getting the batch.
+        """
         try:
             self._logger.info("notifying subscribers")
-
-            for request in driver.iter_requests():
-                response = request.response
-                if response.status_code != HTTPStatus.OK or "Spin" not in request.path:
-                    continue
-                if "gzip" not in response.headers.get("content-encoding"):
-                    continue
-                uncompressed_body = gzip.decompress(response.body)
-                response_data = json.loads(uncompressed_body)
-                fortune_tiger_request = FortuneTigerRequest(
-                    body=parse_qs(request.body.decode()),
-                    headers=dict(request.headers),
-                    host=request.host,
-                    method=request.method,
-                    path=request.path,
-                    url=request.url,
-                    query_string=request.querystring,
-                )
-                fortune_tiger_response = FortuneTigerResponse(
-                    headers=dict(response.headers),
-                    status_code=response.status_code,
-                    body=response_data,
-                    date=response.date,
-                )
-                fortune_tiger_data = FortuneTigerData(
-                    request=fortune_tiger_request,
-                    response=fortune_tiger_response,
-                )
-                for subscriber in subscribers:
-                    subscriber.process_data(data=fortune_tiger_data)
+            with self._metrics.stage("notify_subscribers"):
+                batch = []
+                failed = 0
+                for request in driver.iter_requests():
+                    response = request.response
+                    if not is_spin_exchange(request, response):
+                        continue
+                    try:
+                        with self._metrics.stage("spin_decode"):
+                            fortune_tiger_data = to_fortune_tiger_data(
+                                request, response
+                            )
+                    except Exception as e:
+                        self._logger.error(f"error at parsing spin response: {e}")
+                        failed += 1
+                        continue
+                    if fortune_tiger_data is not None:
+                        batch.append(fortune_tiger_data)
+                if failed:
+                    self._logger.warning(
+                        f"{failed} spins of the batch could not be decoded"
+                    )
+                if batch:
+                    for subscriber in subscribers:
+                        try:
+                            with self._metrics.stage("subscriber"):
+                                subscriber.process_batch(batch)
+                        except Exception as e:
+                            self._logger.error(
+                                f"error at notifying {type(subscriber).__name__}: {e}"
+                            )
             self._logger.info("all subscribers notified")
         except Exception as e:
             self._logger.error(f"error at notifying subscribers: {e}")
@@ -244,13 +754,52 @@ class FortuneTigerScraper:
             del driver.requests
             self._logger.info("cleaning driver requests")
 
+    def _wait_for_canvas_to_settle(
+        self,
+        game: FortuneTigerGame,
+        timeout: float,
+        interval: float = 0.1,
+        max_mean_difference: float = 2,
+    ) -> None:
+        """
+        Wait until the controls bar looks the same in two screenshots in a row,
+        within max_mean_difference gray levels on average, so the animation the
+        last click started there is over, or at most timeout seconds, the fixed
+        pause it used to be. The reels above it animate all the time, so they
+        are left out. The screenshots are counted, but kept out of the archive,
+        whose replay reads every screenshot as a play check.
+        """
+        deadline = time.monotonic() + timeout
+        # Give the click time to start its animation
+        time.sleep(interval)
+        previous = game.capture_frame(record=False).gray_crop(controls_region)
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            current = game.capture_frame(record=False).gray_crop(controls_region)
+            if (
+                current.shape == previous.shape
+                and mean_difference(current, previous) <= max_mean_difference
+            ):
+                return
+            previous = current
+
     def _check_if_game_is_blocked(self, game: FortuneTigerGame) -> bool:
-        try:
-            bet_value = self._image_recognizer.get_bet_value(
-                screenshot=game.take_screenshot()
-            )
-            expected_value = 4500
-            return bet_value != expected_value
-        except Exception as e:
-            self._logger.error(f"error at checking if the game is blocked: {e}")
-            return True
+        """
+        The game is blocked when the bet does not show the raised value. The
+        value is polled, since the clicks take a moment to show on screen.
+        """
+        expected_value = 4500
+        deadline = time.monotonic() + self._config.bet_ready_timeout_seconds
+        while True:
+            try:
+                bet_value = self._image_recognizer.get_bet_value(
+                    frame=game.capture_frame()
+                )
+                if bet_value == expected_value:
+                    return False
+            except Exception as e:
+                self._logger.error(f"error at checking if the game is blocked: {e}")
+                return True
+            if time.monotonic() >= deadline:
+                return True
+            time.sleep(0.1)
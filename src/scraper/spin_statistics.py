@@ -0,0 +1,272 @@
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from model.data import FortuneTigerData
+from model.spin_record import SpinRecord
+
+# Upper bounds of the win multiplier bins, the last bin takes everything above;
+# 0 counts the spins that won nothing
+MULTIPLIER_BOUNDS = [0, 0.5, 1, 2, 5, 10, 25, 50, 100, 250]
+
+
+class RunningMoments(BaseModel):
+    """
+    Mean and variance of a stream in constant memory, with Welford's update,
+    which does not lose precision as a sum of squares does.
+    """
+
+    count: int = 0
+    mean: float = 0
+    m2: float = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        if self.count < 2:
+            return 0
+        return self.m2 / (self.count - 1)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class FixedHistogram(BaseModel):
+    upper_bounds: List[float]
+    # One count per bound, plus the overflow bin
+    counts: List[int] = []
+
+    def model_post_init(self, __context) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.upper_bounds) + 1)
+
+    def add(self, value: float) -> None:
+        for index, bound in enumerate(self.upper_bounds):
+            if value <= bound:
+                self.counts[index] += 1
+                return
+        self.counts[-1] += 1
+
+    def labelled(self) -> Dict[str, int]:
+        labels = [f"<={bound:g}" for bound in self.upper_bounds]
+        labels.append(f">{self.upper_bounds[-1]:g}")
+        return dict(zip(labels, self.counts))
+
+
+class Drawdown(BaseModel):
+    """
+    Drop of a running total from its highest point so far.
+    """
+
+    total: float = 0
+    peak: float = 0
+    max_drawdown: float = 0
+
+    def add(self, change: float) -> None:
+        self.total += change
+        self.peak = max(self.peak, self.total)
+        self.max_drawdown = max(self.max_drawdown, self.peak - self.total)
+
+    @property
+    def current(self) -> float:
+        return self.peak - self.total
+
+
+class WindowBucket(BaseModel):
+    spins: int = 0
+    wins: int = 0
+    bet: int = 0
+    win: int = 0
+
+
+class SlidingWindow(BaseModel):
+    """
+    Spin counters over the last window_seconds, kept in buckets of
+    window_seconds / buckets, so the memory does not grow with the spins.
+    The window ends at the latest spin date, not at the current time, so
+    replaying the same spins gives the same result.
+    """
+
+    window_seconds: int = Field(gt=0)
+    buckets: int = Field(default=60, gt=0)
+    by_bucket: Dict[int, WindowBucket] = {}
+    latest_bucket: Optional[int] = None
+
+    @property
+    def bucket_seconds(self) -> float:
+        return self.window_seconds / self.buckets
+
+    def add(self, timestamp: float, won: bool, bet: int, win: int) -> None:
+        index = int(timestamp // self.bucket_seconds)
+        if self.latest_bucket is not None and index <= self.latest_bucket - (
+            self.buckets
+        ):
+            # Older than the whole window
+            return
+        bucket = self.by_bucket.setdefault(index, WindowBucket())
+        bucket.spins += 1
+        bucket.wins += won
+        bucket.bet += bet
+        bucket.win += win
+        if self.latest_bucket is None or index > self.latest_bucket:
+            self.latest_bucket = index
+            oldest = index - self.buckets + 1
+            for stale in [key for key in self.by_bucket if key < oldest]:
+                del self.by_bucket[stale]
+
+    def total(self) -> WindowBucket:
+        total = WindowBucket()
+        for bucket in self.by_bucket.values():
+            total.spins += bucket.spins
+            total.wins += bucket.wins
+            total.bet += bucket.bet
+            total.win += bucket.win
+        return total
+
+
+def _ratio(numerator: float, denominator: float) -> Optional[float]:
+    return numerator / denominator if denominator else None
+
+
+class WindowSnapshot(BaseModel):
+    window_seconds: int
+    spins: int
+    rtp: Optional[float]
+    hit_rate: Optional[float]
+
+
+class StatisticsSnapshot(BaseModel):
+    spins: int
+    total_bet: int
+    total_win: int
+    rtp: Optional[float]
+    hit_rate: Optional[float]
+    mean_multiplier: float
+    std_multiplier: float
+    mean_profit: float
+    std_profit: float
+    multiplier_histogram: Dict[str, int]
+    max_drawdown: float
+    current_drawdown: float
+    windows: List[WindowSnapshot]
+    last_date: Optional[datetime]
+
+
+class SpinStatistics(BaseModel):
+    """
+    RTP, hit rate, win multiplier distribution and drawdown of a spin stream,
+    each updated in constant time and memory. The model itself is the
+    checkpoint: dumped to JSON and validated back, it continues where it was.
+    The drawdown follows the summed bet profit instead of the balance, so it
+    carries over from one game session to the next.
+    """
+
+    spins: int = 0
+    wins: int = 0
+    total_bet: int = 0
+    total_win: int = 0
+    multiplier: RunningMoments = Field(default_factory=RunningMoments)
+    profit: RunningMoments = Field(default_factory=RunningMoments)
+    multiplier_histogram: FixedHistogram = Field(
+        default_factory=lambda: FixedHistogram(upper_bounds=MULTIPLIER_BOUNDS)
+    )
+    drawdown: Drawdown = Field(default_factory=Drawdown)
+    windows: List[SlidingWindow] = Field(
+        default_factory=lambda: [
+            SlidingWindow(window_seconds=300),
+            SlidingWindow(window_seconds=3600),
+        ]
+    )
+    # Latest response date seen, the point to replay from after a restart
+    last_date: Optional[datetime] = None
+    # Keys of the spins counted at last_date: the replay starts at last_date
+    # for the spins of that instant stored but not counted, and skips these
+    last_date_keys: List[str] = []
+
+    def add(self, data: FortuneTigerData) -> None:
+        self._add(
+            data.bet_amount,
+            data.win_amount,
+            data.bet_profit,
+            data.response.date,
+            data.spin_key,
+        )
+
+    def add_record(self, record: SpinRecord) -> None:
+        self._add(
+            record.bet_amount,
+            record.win_amount,
+            record.bet_profit,
+            record.date,
+            record.key,
+        )
+
+    def is_counted(self, record: SpinRecord) -> bool:
+        """
+        :return: True if the spin is older than the latest one counted, or one
+            of the spins counted at its date.
+        """
+        if self.last_date is None:
+            return False
+        if record.date == self.last_date:
+            return record.key in self.last_date_keys
+        return record.date < self.last_date
+
+    def _add(
+        self, bet: int, win: int, profit: int, date: datetime, key: Optional[str]
+    ) -> None:
+        won = win > 0
+        self.spins += 1
+        self.wins += won
+        self.total_bet += bet
+        self.total_win += win
+        self.profit.add(profit)
+        self.drawdown.add(profit)
+        if bet > 0:
+            multiplier = win / bet
+            self.multiplier.add(multiplier)
+            self.multiplier_histogram.add(multiplier)
+        for window in self.windows:
+            window.add(date.timestamp(), won, bet, win)
+        if self.last_date is None or date > self.last_date:
+            self.last_date = date
+            self.last_date_keys = []
+        if date == self.last_date and key is not None:
+            self.last_date_keys.append(key)
+
+    def snapshot(self) -> StatisticsSnapshot:
+        windows = []
+        for window in self.windows:
+            total = window.total()
+            windows.append(
+                WindowSnapshot(
+                    window_seconds=window.window_seconds,
+                    spins=total.spins,
+                    rtp=_ratio(total.win, total.bet),
+                    hit_rate=_ratio(total.wins, total.spins),
+                )
+            )
+        return StatisticsSnapshot(
+            spins=self.spins,
+            total_bet=self.total_bet,
+            total_win=self.total_win,
+            rtp=_ratio(self.total_win, self.total_bet),
+            hit_rate=_ratio(self.wins, self.spins),
+            mean_multiplier=self.multiplier.mean,
+            std_multiplier=self.multiplier.std,
+            mean_profit=self.profit.mean,
+            std_profit=self.profit.std,
+            multiplier_histogram=self.multiplier_histogram.labelled(),
+            max_drawdown=self.drawdown.max_drawdown,
+            current_drawdown=self.drawdown.current,
+            windows=windows,
+            last_date=self.last_date,
+        )
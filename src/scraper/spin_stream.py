@@ -0,0 +1,162 @@
+import queue
+import threading
+import time
+from logging import Logger, getLogger
+from typing import List, Optional
+
+from pydantic import BaseModel
+from seleniumwire.request import Request, Response
+
+from model.data import FortuneTigerData
+from monitoring import PipelineMetrics, pipeline_metrics
+from scraper.subscriber.interface import FortuneTigerSubscriber
+from scraper.traffic import is_spin_exchange, to_fortune_tiger_data
+
+
+class SpinStreamMetrics(BaseModel):
+    enqueued: int
+    processed: int
+    dropped: int
+    failed: int
+    queue_depth: int
+    max_queue_depth: int
+
+
+class SpinStream:
+    """
+    Streams Spin responses to the subscribers as they arrive. The response
+    interceptor converts each one on the proxy thread and puts it on a bounded
+    queue, drained by a background consumer. The proxy thread never blocks: when
+    the queue is full the record is dropped and counted.
+    """
+
+    _subscribers: List[FortuneTigerSubscriber]
+    _queue: "queue.Queue[Optional[FortuneTigerData]]"
+    _consumer: Optional[threading.Thread]
+    _stopped: threading.Event
+    _lock: threading.Lock
+    _drained: threading.Condition
+    _logger: Logger
+    _metrics: PipelineMetrics
+    _enqueued: int
+    _processed: int
+    _dropped: int
+    _failed: int
+    _max_queue_depth: int
+
+    def __init__(
+        self,
+        subscribers: List[FortuneTigerSubscriber],
+        max_size: int = 1000,
+        logger: Logger = getLogger(__name__),
+        metrics: PipelineMetrics = pipeline_metrics,
+    ):
+        self._subscribers = subscribers
+        self._queue = queue.Queue(maxsize=max_size)
+        self._consumer = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._logger = logger
+        self._metrics = metrics
+        self._enqueued = 0
+        self._processed = 0
+        self._dropped = 0
+        self._failed = 0
+        self._max_queue_depth = 0
+
+    def start(self) -> None:
+        self._consumer = threading.Thread(
+            target=self._consume, name="spin-stream", daemon=True
+        )
+        self._consumer.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        """
+        Deliver the records already queued, then stop the consumer. A consumer
+        stuck on a subscriber for longer than timeout is told to stop after
+        its current record and left behind, with the rest undelivered.
+        """
+        if self._consumer is None:
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._consumer.join(max(deadline - time.monotonic(), 0))
+        if self._consumer.is_alive():
+            self._stopped.set()
+            self._logger.warning(
+                f"spin stream consumer did not stop in {timeout}s, "
+                f"{self._queue.qsize()} records left undelivered"
+            )
+        self._consumer = None
+
+    def response_interceptor(self, request: Request, response: Response) -> None:
+        if not is_spin_exchange(request, response):
+            return
+        try:
+            with self._metrics.stage("spin_decode"):
+                data = to_fortune_tiger_data(request, response)
+        except Exception as e:
+            self._logger.error(f"error at parsing spin response: {e}")
+            with self._lock:
+                self._failed += 1
+            return
+        if data is not None:
+            self.publish(data)
+
+    def publish(self, data: FortuneTigerData) -> bool:
+        """
+        :return: False if the queue was full and the record was dropped.
+        """
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+        with self._lock:
+            self._enqueued += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+        return True
+
+    def wait_until_drained(self, timeout: float) -> bool:
+        """
+        Wait until every record queued so far was handed to the subscribers,
+        whether they processed it or failed.
+        :return: False if the timeout expired first.
+        """
+        with self._drained:
+            return self._drained.wait_for(
+                lambda: self._processed >= self._enqueued, timeout
+            )
+
+    def metrics(self) -> SpinStreamMetrics:
+        with self._lock:
+            return SpinStreamMetrics(
+                enqueued=self._enqueued,
+                processed=self._processed,
+                dropped=self._dropped,
+                failed=self._failed,
+                queue_depth=self._queue.qsize(),
+                max_queue_depth=self._max_queue_depth,
+            )
+
+    def _consume(self) -> None:
+        while not self._stopped.is_set():
+            data = self._queue.get()
+            if data is None or self._stopped.is_set():
+                return
+            for subscriber in self._subscribers:
+                try:
+                    with self._metrics.stage("subscriber"):
+                        subscriber.process_data(data=data)
+                except Exception as e:
+                    self._logger.error(f"error at notifying subscriber: {e}")
+                    with self._lock:
+                        self._failed += 1
+            with self._lock:
+                self._processed += 1
+                self._drained.notify_all()
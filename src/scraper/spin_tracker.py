@@ -0,0 +1,49 @@
+import threading
+
+from seleniumwire.request import Request, Response
+
+from scraper.traffic import is_spin_exchange
+
+
+class SpinTracker:
+    """
+    Counts the Spin responses seen by the selenium-wire proxy. Installed as the
+    driver's response interceptor, it runs on the proxy threads and lets the
+    scraper thread block until a batch of spins has arrived.
+    """
+
+    _spins: int
+    _condition: threading.Condition
+
+    def __init__(self):
+        self._spins = 0
+        self._condition = threading.Condition()
+
+    @property
+    def spins(self) -> int:
+        with self._condition:
+            return self._spins
+
+    def response_interceptor(self, request: Request, response: Response) -> None:
+        if not is_spin_exchange(request, response):
+            return
+        with self._condition:
+            self._spins += 1
+            self._condition.notify_all()
+
+    def expect(self, quantity: int) -> int:
+        """
+        Call before starting a batch.
+        :param quantity: How many spins the batch will make.
+        :return: The spin count that marks the batch as complete.
+        """
+        with self._condition:
+            return self._spins + quantity
+
+    def wait_for(self, target: int, timeout: float) -> bool:
+        """
+        Block until the spin count reaches the target.
+        :return: False if the timeout expired first.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._spins >= target, timeout)
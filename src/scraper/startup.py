@@ -0,0 +1,102 @@
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List
+
+from pydantic import BaseModel, Field
+
+from monitoring import PipelineMetrics
+
+if TYPE_CHECKING:
+    from scraper.scraper import FortuneTigerScraper
+
+# In the order a session goes through them
+STARTUP_PHASES = (
+    "webdriver",
+    "page_load",
+    "start_button",
+    "game_canvas",
+    "raise_bet",
+    "bet_check",
+    "turbo",
+)
+
+
+class StartupTimings(BaseModel):
+    """
+    How long each phase of getting a session ready to play took.
+    """
+
+    # The browser of a previous session was reused
+    warm_browser: bool = False
+    phases: Dict[str, float] = Field(default_factory=dict)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.phases.values())
+
+    @contextmanager
+    def phase(self, name: str, metrics: PipelineMetrics) -> Iterator[None]:
+        """
+        Time a phase, also recorded as the startup_<name> pipeline stage.
+        """
+        started_at = time.perf_counter()
+        with metrics.stage(f"startup_{name}"):
+            yield
+        self.phases[name] = self.phases.get(name, 0) + (
+            time.perf_counter() - started_at
+        )
+
+    def describe(self) -> str:
+        phases = ", ".join(
+            f"{name} {seconds:.2f}s" for name, seconds in self.phases.items()
+        )
+        browser = "warm" if self.warm_browser else "cold"
+        return f"{browser} startup took {self.total_seconds:.2f}s ({phases})"
+
+
+class StartupBenchmarkResult(BaseModel):
+    runs: int
+    warm_runs: int
+    mean_total_seconds: float
+    mean_phase_seconds: Dict[str, float]
+
+
+def summarize_startups(timings: List[StartupTimings]) -> StartupBenchmarkResult:
+    """
+    Average the phases of several startups. A phase a startup skipped, such as
+    creating the webdriver when the browser was kept, counts as 0 seconds.
+    """
+    runs = len(timings)
+    names = [
+        name
+        for name in STARTUP_PHASES
+        if any(name in timing.phases for timing in timings)
+    ]
+    return StartupBenchmarkResult(
+        runs=runs,
+        warm_runs=sum(timing.warm_browser for timing in timings),
+        mean_total_seconds=sum(timing.total_seconds for timing in timings) / runs,
+        mean_phase_seconds={
+            name: sum(timing.phases.get(name, 0) for timing in timings) / runs
+            for name in names
+        },
+    )
+
+
+def benchmark_startup(
+    scraper: "FortuneTigerScraper", runs: int, headless: bool, keep_browser: bool
+) -> List[StartupTimings]:
+    """
+    Get the game ready to play runs times in a row, closing the browser between
+    runs unless keep_browser, in which case only the first run is cold.
+    """
+    timings = []
+    try:
+        for _ in range(runs):
+            scraper.open_game(headless)
+            timings.append(scraper.last_startup)
+            if not keep_browser:
+                scraper.close()
+    finally:
+        scraper.close()
+    return timings
@@ -1,2 +1,6 @@
 from scraper.subscriber.interface import FortuneTigerSubscriber
 from scraper.subscriber.repository_subscriber import RepositorySubscriber
+from scraper.subscriber.statistics_subscriber import (
+    StatisticsConfig,
+    StatisticsSubscriber,
+)
@@ -0,0 +1,335 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from logging import Logger, getLogger
+from typing import IO, Deque, Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from model.data import FortuneTigerData
+from monitoring import PipelineMetrics, pipeline_metrics
+from scraper.subscriber.interface import FortuneTigerSubscriber
+
+
+class DispatcherConfig(BaseModel):
+    queue_size: int = Field(default=1000, gt=0)
+    # What a full queue does with a new record: "block" waits for room, which
+    # slows the publisher down to the subscriber pace, "drop_oldest" makes room
+    # by dropping the oldest queued record, and "spill" appends it to a file
+    # under spill_dir, delivered once the queue is drained
+    overflow: Literal["block", "drop_oldest", "spill"] = "block"
+    spill_dir: str = "spill"
+    # Records handed to process_batch in one call
+    max_batch_size: int = Field(default=100, gt=0)
+
+
+class SubscriberStats(BaseModel):
+    name: str
+    delivered: int
+    failed: int
+    dropped: int
+    spilled: int
+    queue_depth: int
+    max_queue_depth: int
+
+
+class SpillFile:
+    """
+    Records that did not fit in a subscriber queue, as JSON lines read back in
+    the order they were written. The file is emptied whenever every record in
+    it was read. Records left in it by a run that did not finish are read
+    first.
+    """
+
+    _path: str
+    _file: Optional[IO[bytes]]
+    _read_offset: int
+    pending: int
+
+    def __init__(self, path: str):
+        self._path = path
+        self._file = None
+        self._read_offset = 0
+        self.pending = 0
+        if os.path.exists(path):
+            self._open()
+            self._file.seek(0)
+            content = self._file.read()
+            if content and not content.endswith(b"\n"):
+                # A record cut by a crash; it fails to parse when read
+                self._file.write(b"\n")
+                content += b"\n"
+            self.pending = content.count(b"\n")
+
+    def append(self, data: FortuneTigerData) -> None:
+        if self._file is None:
+            self._open()
+        self._file.write(json.dumps(data.to_document()).encode() + b"\n")
+        self.pending += 1
+
+    def read(self, limit: int) -> Tuple[List[FortuneTigerData], int]:
+        """
+        :return: Up to limit records, and how many lines were read that could
+            not be parsed into one.
+        """
+        if not self.pending:
+            return [], 0
+        self._file.flush()
+        self._file.seek(self._read_offset)
+        batch = []
+        unreadable = 0
+        while len(batch) + unreadable < limit and self.pending:
+            line = self._file.readline()
+            self.pending -= 1
+            try:
+                batch.append(FortuneTigerData.model_validate_json(line))
+            except ValueError:
+                unreadable += 1
+        self._read_offset = self._file.tell()
+        if not self.pending:
+            self._file.truncate(0)
+            self._read_offset = 0
+        return batch, unreadable
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if not self.pending:
+            os.remove(self._path)
+
+    def _open(self) -> None:
+        os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        # Append mode writes at the end whatever was read last, and keeps what a
+        # previous run left
+        self._file = open(self._path, "a+b")
+
+
+class SubscriberWorker:
+    """
+    Delivers the records of one subscriber from its own bounded queue and
+    thread, in batches of whatever is queued, so a slow or failing subscriber
+    does not hold back the others.
+    """
+
+    name: str
+    subscriber: FortuneTigerSubscriber
+    _config: DispatcherConfig
+    _logger: Logger
+    _metrics: PipelineMetrics
+    _condition: threading.Condition
+    _queue: Deque[FortuneTigerData]
+    _spill: Optional[SpillFile]
+    _stopping: bool
+    _busy: bool
+    _thread: Optional[threading.Thread]
+    _stats: Dict[str, int]
+
+    def __init__(
+        self,
+        name: str,
+        subscriber: FortuneTigerSubscriber,
+        config: DispatcherConfig,
+        logger: Logger,
+        metrics: PipelineMetrics,
+    ):
+        self.name = name
+        self.subscriber = subscriber
+        self._config = config
+        self._logger = logger
+        self._metrics = metrics
+        self._condition = threading.Condition()
+        self._queue = deque()
+        self._spill = None
+        if config.overflow == "spill":
+            self._spill = SpillFile(os.path.join(config.spill_dir, f"{name}.jsonl"))
+        self._stopping = False
+        self._busy = False
+        self._thread = None
+        self._stats = {
+            "delivered": 0,
+            "failed": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "max_queue_depth": 0,
+        }
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name=f"subscriber-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 30) -> None:
+        """
+        Deliver what is queued or spilled, then stop the thread.
+        """
+        if self._thread is None:
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        self._thread = None
+        if self._spill is not None:
+            self._spill.close()
+
+    def put(self, data: FortuneTigerData) -> None:
+        with self._condition:
+            if self._spill is not None and self._spill.pending:
+                # Behind records already spilled, to keep the order
+                self._spill_record(data)
+                return
+            if len(self._queue) >= self._config.queue_size:
+                if self._config.overflow == "block":
+                    self._condition.wait_for(
+                        lambda: len(self._queue) < self._config.queue_size
+                        or self._stopping
+                    )
+                elif self._config.overflow == "drop_oldest":
+                    self._queue.popleft()
+                    self._stats["dropped"] += 1
+                else:
+                    self._spill_record(data)
+                    return
+            self._queue.append(data)
+            self._stats["max_queue_depth"] = max(
+                self._stats["max_queue_depth"], len(self._queue)
+            )
+            self._condition.notify_all()
+
+    def wait_until_idle(self, timeout: float) -> bool:
+        """
+        :return: False if records were still queued when the timeout expired.
+        """
+        with self._condition:
+            return self._condition.wait_for(self._is_idle, timeout)
+
+    def stats(self) -> SubscriberStats:
+        with self._condition:
+            return SubscriberStats(
+                name=self.name, queue_depth=len(self._queue), **self._stats
+            )
+
+    def _is_idle(self) -> bool:
+        spilled = self._spill.pending if self._spill is not None else 0
+        return not self._queue and not spilled and not self._busy
+
+    def _spill_record(self, data: FortuneTigerData) -> None:
+        self._spill.append(data)
+        self._stats["spilled"] += 1
+        self._condition.notify_all()
+
+    def _take_batch(self) -> Optional[List[FortuneTigerData]]:
+        """
+        :return: The next records to deliver, None once stopped and drained.
+        """
+        with self._condition:
+            self._busy = False
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: not self._is_idle() or self._stopping)
+            if self._queue:
+                size = min(len(self._queue), self._config.max_batch_size)
+                batch = [self._queue.popleft() for _ in range(size)]
+            elif self._spill is not None and self._spill.pending:
+                batch, unreadable = self._spill.read(self._config.max_batch_size)
+                if unreadable:
+                    self._stats["failed"] += unreadable
+                    self._logger.error(
+                        f"{unreadable} spilled records of subscriber {self.name} "
+                        "could not be read"
+                    )
+            else:
+                return None
+            self._busy = True
+            # Room for a blocked publisher
+            self._condition.notify_all()
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            if not batch:
+                continue
+            started_at = time.perf_counter()
+            failed = False
+            try:
+                self.subscriber.process_batch(batch)
+            except Exception as e:
+                failed = True
+                self._logger.error(
+                    f"error at notifying subscriber {self.name} "
+                    f"of {len(batch)} records: {e}"
+                )
+            self._metrics.observe(
+                f"subscriber_{self.name}", time.perf_counter() - started_at, failed
+            )
+            with self._condition:
+                self._stats["failed" if failed else "delivered"] += len(batch)
+
+
+class SubscriberDispatcher(FortuneTigerSubscriber):
+    """
+    Fans each record out to every subscriber through a SubscriberWorker, so
+    publishing a record only costs queueing it. It is a subscriber itself, so
+    it takes the place of the subscriber list it wraps.
+    """
+
+    _workers: List[SubscriberWorker]
+
+    def __init__(
+        self,
+        subscribers: List[FortuneTigerSubscriber],
+        config: DispatcherConfig = DispatcherConfig(),
+        logger: Logger = getLogger(__name__),
+        metrics: PipelineMetrics = pipeline_metrics,
+    ):
+        self._workers = []
+        names: Dict[str, int] = {}
+        for subscriber in subscribers:
+            name = type(subscriber).__name__
+            names[name] = names.get(name, 0) + 1
+            if names[name] > 1:
+                name = f"{name}_{names[name]}"
+            self._workers.append(
+                SubscriberWorker(name, subscriber, config, logger, metrics)
+            )
+
+    def start(self) -> None:
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self, timeout: float = 30) -> None:
+        for worker in self._workers:
+            worker.stop(timeout)
+
+    def process_data(self, data: FortuneTigerData):
+        for worker in self._workers:
+            worker.put(data)
+
+    def process_batch(self, batch: List[FortuneTigerData]) -> None:
+        for data in batch:
+            self.process_data(data)
+
+    def wait_until_idle(
+        self, timeout: float, subscriber: Optional[FortuneTigerSubscriber] = None
+    ) -> bool:
+        """
+        Wait for every subscriber to process what was published so far.
+        :param subscriber: Only wait for this one.
+        :return: False if the timeout expired first.
+        """
+        deadline = time.monotonic() + timeout
+        return all(
+            worker.wait_until_idle(max(0, deadline - time.monotonic()))
+            for worker in self._workers
+            if subscriber is None or worker.subscriber is subscriber
+        )
+
+    def stats(self) -> List[SubscriberStats]:
+        return [worker.stats() for worker in self._workers]
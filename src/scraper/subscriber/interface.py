@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import List
 
 from model.data import FortuneTigerData
 
@@ -12,3 +13,11 @@ class FortuneTigerSubscriber(ABC):
         :return: The ID of the saved document.
         """
         pass
+
+    def process_batch(self, batch: List[FortuneTigerData]) -> None:
+        """
+        Process several records at once. Subscribers with a per-call overhead,
+        such as a database round trip, override it to pay it once per batch.
+        """
+        for data in batch:
+            self.process_data(data=data)
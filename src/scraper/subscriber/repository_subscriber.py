@@ -1,12 +1,14 @@
 from logging import getLogger
+from typing import List
 
 from model.data import FortuneTigerData
 from repository.fortune_tiger_interface import FortuneTigerRepository
+from scraper.subscriber.interface import FortuneTigerSubscriber
 
 logger = getLogger(__name__)
 
 
-class RepositorySubscriber:
+class RepositorySubscriber(FortuneTigerSubscriber):
 
     repository: FortuneTigerRepository
 
@@ -15,4 +17,8 @@ class RepositorySubscriber:
 
     def process_data(self, data: FortuneTigerData):
         inserted_id = self.repository.save_data(data)
-        logger.info(f"inserted data with id: {inserted_id}")
+        logger.debug(f"inserted data with id: {inserted_id}")
+
+    def process_batch(self, batch: List[FortuneTigerData]):
+        inserted_ids = self.repository.save_batch(batch)
+        logger.debug(f"inserted {len(inserted_ids)} documents")
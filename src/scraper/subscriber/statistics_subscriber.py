@@ -0,0 +1,126 @@
+import os
+import threading
+from logging import Logger, getLogger
+from typing import Iterable, List, Optional
+
+from pydantic import BaseModel, Field
+
+from model.data import FortuneTigerData
+from model.spin_record import SpinRecord
+from scraper.spin_statistics import (
+    MULTIPLIER_BOUNDS,
+    FixedHistogram,
+    SlidingWindow,
+    SpinStatistics,
+    StatisticsSnapshot,
+)
+from scraper.subscriber.interface import FortuneTigerSubscriber
+
+
+class StatisticsConfig(BaseModel):
+    checkpoint_path: Optional[str] = None
+    checkpoint_every_spins: int = Field(default=1000, gt=0)
+    window_seconds: List[int] = [300, 3600]
+    window_buckets: int = Field(default=60, gt=0)
+    multiplier_bounds: List[float] = MULTIPLIER_BOUNDS
+
+
+class StatisticsSubscriber(FortuneTigerSubscriber):
+    """
+    Keeps the spin statistics up to date as spins arrive, so they can be read
+    at any time with snapshot() instead of aggregating the whole collection.
+    The statistics are saved to checkpoint_path every checkpoint_every_spins
+    spins and on close(); after a restart, restore() loads them and catch_up()
+    only needs the spins stored from the checkpoint's last date on.
+    """
+
+    _config: StatisticsConfig
+    _logger: Logger
+    _lock: threading.Lock
+    _statistics: SpinStatistics
+    _since_checkpoint: int
+
+    def __init__(
+        self,
+        config: StatisticsConfig = StatisticsConfig(),
+        logger: Logger = getLogger(__name__),
+    ):
+        self._config = config
+        self._logger = logger
+        self._lock = threading.Lock()
+        self._statistics = SpinStatistics(
+            multiplier_histogram=FixedHistogram(upper_bounds=config.multiplier_bounds),
+            windows=[
+                SlidingWindow(window_seconds=seconds, buckets=config.window_buckets)
+                for seconds in config.window_seconds
+            ],
+        )
+        self._since_checkpoint = 0
+
+    def process_data(self, data: FortuneTigerData):
+        with self._lock:
+            self._statistics.add(data)
+            self._since_checkpoint += 1
+            checkpoint_is_due = (
+                self._since_checkpoint >= self._config.checkpoint_every_spins
+            )
+        if checkpoint_is_due:
+            self.checkpoint()
+
+    def snapshot(self) -> StatisticsSnapshot:
+        with self._lock:
+            return self._statistics.snapshot()
+
+    def checkpoint(self) -> None:
+        if self._config.checkpoint_path is None:
+            return
+        temporary_path = f"{self._config.checkpoint_path}.tmp"
+        with self._lock:
+            with open(temporary_path, "w") as checkpoint_file:
+                checkpoint_file.write(self._statistics.model_dump_json())
+            os.replace(temporary_path, self._config.checkpoint_path)
+            self._since_checkpoint = 0
+
+    def restore(self) -> bool:
+        """
+        Continue from the checkpoint, if there is one. The spins stored since
+        are then added with catch_up.
+        :return: True if a checkpoint was loaded.
+        """
+        path = self._config.checkpoint_path
+        if path is None or not os.path.exists(path):
+            return False
+        with open(path) as checkpoint_file:
+            statistics = SpinStatistics.model_validate_json(checkpoint_file.read())
+        with self._lock:
+            self._statistics = statistics
+            self._since_checkpoint = 0
+        self._logger.info(
+            f"statistics restored at {statistics.spins} spins, "
+            f"up to {statistics.last_date}"
+        )
+        return True
+
+    def catch_up(self, spins: Iterable[SpinRecord]) -> int:
+        """
+        :param spins: The spins stored from the checkpoint's last date on,
+            usually repository.iter_records_since(snapshot().last_date). The
+            ones the statistics already counted are skipped.
+        :return: How many spins were added.
+        """
+        added = 0
+        with self._lock:
+            checkpointed = self._statistics.model_copy(
+                update={"last_date_keys": list(self._statistics.last_date_keys)}
+            )
+            for record in spins:
+                if checkpointed.is_counted(record):
+                    continue
+                self._statistics.add_record(record)
+                added += 1
+        if added:
+            self.checkpoint()
+        return added
+
+    def close(self) -> None:
+        self.checkpoint()
@@ -0,0 +1,58 @@
+from http import HTTPStatus
+from logging import getLogger
+from typing import Optional
+
+from seleniumwire.request import Request, Response
+
+from model.data import FortuneTigerData, FortuneTigerRequest, FortuneTigerResponse
+from scraper.decoding import UnsupportedEncoding, decode_body, parse_form, parse_json
+
+SPIN_PATH_MARKER = "Spin"
+
+logger = getLogger(__name__)
+
+
+def is_spin_exchange(request: Request, response: Optional[Response]) -> bool:
+    return (
+        response is not None
+        and response.status_code == HTTPStatus.OK
+        and SPIN_PATH_MARKER in request.path
+    )
+
+
+def to_fortune_tiger_data(
+    request: Request, response: Response
+) -> Optional[FortuneTigerData]:
+    """
+    Convert an intercepted Spin exchange into the data sent to subscribers.
+    :return: None when the response body is in an encoding there is no
+        decoder for.
+    """
+    content_encoding = response.headers.get("content-encoding")
+    try:
+        body = decode_body(response.body, content_encoding)
+    except UnsupportedEncoding as e:
+        logger.warning(f"skipping spin response: {e}")
+        return None
+    response_data = parse_json(body)
+    # The decoders and the parser reject malformed bodies, so the models skip
+    # validation
+    fortune_tiger_request = FortuneTigerRequest.model_construct(
+        body=parse_form(request.body),
+        headers=dict(request.headers),
+        host=request.host,
+        method=request.method,
+        path=request.path,
+        url=request.url,
+        query_string=request.querystring,
+    )
+    fortune_tiger_response = FortuneTigerResponse.model_construct(
+        headers=dict(response.headers),
+        status_code=response.status_code,
+        body=response_data,
+        date=response.date,
+    )
+    return FortuneTigerData.trusted(
+        request=fortune_tiger_request,
+        response=fortune_tiger_response,
+    )
@@ -0,0 +1,11 @@
+from supervisor.processes import (
+    EXIT_FINISHED,
+    EXIT_GAME_ERROR,
+    EXIT_UNEXPECTED_ERROR,
+    QueueSubscriber,
+    ScraperProcessOptions,
+    drain_records,
+    run_scraper_process,
+    run_writer_process,
+)
+from supervisor.supervisor import ScraperSupervisor, SupervisorConfig, SupervisorStats
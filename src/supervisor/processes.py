@@ -0,0 +1,162 @@
+import logging
+import queue
+import sys
+import time
+from multiprocessing.queues import Queue
+from multiprocessing.sharedctypes import Synchronized
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from model.data import FortuneTigerData
+from repository.fortune_tiger_interface import FortuneTigerRepository
+from repository.mongodb.repository import MongoConfig, MongoRepository
+from scraper.exceptions import GameFroze, GameIsBlocked
+from scraper.image_recognizer.factory import RecognizerOptions, create_image_recognizer
+from scraper.scraper import FortuneTigerScraper, ScraperConfig
+from scraper.subscriber.interface import FortuneTigerSubscriber
+
+# The scraper ran until the balance was over, there is nothing to restart
+EXIT_FINISHED = 0
+# The game froze or was blocked, a fresh browser usually fixes it
+EXIT_GAME_ERROR = 3
+EXIT_UNEXPECTED_ERROR = 4
+
+
+class ScraperProcessOptions(BaseModel):
+    recognizer: RecognizerOptions = RecognizerOptions()
+    scraper: ScraperConfig = ScraperConfig()
+    headless: bool = False
+
+
+class QueueSubscriber(FortuneTigerSubscriber):
+    """
+    Hands each spin to the writer process. The spin crosses the process
+    boundary as its JSON document, which is cheaper to pickle than the model.
+    """
+
+    _records: Queue
+
+    def __init__(self, records: Queue):
+        self._records = records
+
+    def process_data(self, data: FortuneTigerData):
+        self._records.put(data.to_document())
+
+
+def run_scraper_process(
+    options: ScraperProcessOptions, records: Queue, heartbeat: Synchronized
+) -> None:
+    """
+    Entry point of the scraper child process. Exits with EXIT_FINISHED when the
+    balance is over and with one of the error codes otherwise.
+    """
+    logger = logging.getLogger("scraper-process")
+
+    def beat() -> None:
+        heartbeat.value = time.monotonic()
+
+    image_recognizer = create_image_recognizer(options.recognizer)
+    scraper = FortuneTigerScraper(
+        image_recognizer=image_recognizer,
+        logger=logger,
+        config=options.scraper,
+        heartbeat=beat,
+    )
+    exit_code = EXIT_FINISHED
+    try:
+        scraper.scrape_data([QueueSubscriber(records)], headless=options.headless)
+    except (GameFroze, GameIsBlocked) as e:
+        logger.error(f"scraper stopped: {e}")
+        exit_code = EXIT_GAME_ERROR
+    except Exception as e:
+        logger.error(f"scraper crashed: {e}")
+        exit_code = EXIT_UNEXPECTED_ERROR
+    finally:
+        image_recognizer.close()
+    # Let the queue feeder thread flush the last spins before exiting
+    records.close()
+    records.join_thread()
+    sys.exit(exit_code)
+
+
+def drain_records(
+    records: Queue,
+    repository: FortuneTigerRepository,
+    logger: logging.Logger = logging.getLogger(__name__),
+    poll_seconds: float = 1,
+    batch_size: int = 500,
+    batch_seconds: float = 0.1,
+) -> int:
+    """
+    Save the records put on the queue until a None is received. Each batch
+    takes what is queued, up to batch_size records or batch_seconds after its
+    first record, and is saved with one save_batch call. Records are taken off
+    the queue before they are saved, so a crash loses at most the batch in
+    hand.
+    :return: How many records were saved.
+    """
+    saved = 0
+    while True:
+        try:
+            document: Optional[Dict] = records.get(timeout=poll_seconds)
+        except queue.Empty:
+            continue
+        documents: List[Dict] = []
+        deadline = time.monotonic() + batch_seconds
+        while document is not None:
+            documents.append(document)
+            if len(documents) >= batch_size:
+                break
+            try:
+                document = records.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+        saved += _save_documents(documents, repository, logger)
+        if document is None:
+            return saved
+
+
+def _save_documents(
+    documents: List[Dict],
+    repository: FortuneTigerRepository,
+    logger: logging.Logger,
+) -> int:
+    """
+    :return: How many documents were saved, the invalid ones left out.
+    """
+    batch = []
+    for document in documents:
+        try:
+            batch.append(FortuneTigerData.model_validate(document))
+        except Exception as e:
+            logger.error(f"error at reading record: {e}")
+    if not batch:
+        return 0
+    try:
+        repository.save_batch(batch)
+    except Exception as e:
+        logger.error(f"error at saving {len(batch)} records: {e}")
+        return 0
+    return len(batch)
+
+
+def run_writer_process(config: MongoConfig, records: Queue) -> None:
+    """
+    Entry point of the writer process, the only one connected to MongoDB. The
+    repository is never buffered here: the queue already is the buffer, and an
+    in-memory one would be lost whenever the writer is killed.
+    """
+    logger = logging.getLogger("writer-process")
+    repository = MongoRepository(config.model_copy(update={"buffered": False}))
+    try:
+        if not repository.ping():
+            logger.error("repository is not reacheable")
+            sys.exit(1)
+        repository.create_collection()
+        saved = drain_records(
+            records, repository, logger, batch_size=config.flush_batch_size
+        )
+        logger.info(f"writer saved {saved} records")
+    finally:
+        repository.close()
@@ -0,0 +1,326 @@
+import multiprocessing
+import queue
+import time
+from collections import deque
+from logging import Logger, getLogger
+from multiprocessing.context import BaseContext
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import Queue
+from multiprocessing.sharedctypes import Synchronized
+from typing import Callable, Deque, Dict, Optional
+
+from pydantic import BaseModel, Field
+
+from repository.mongodb.repository import MongoConfig
+from supervisor.processes import (
+    EXIT_FINISHED,
+    ScraperProcessOptions,
+    run_scraper_process,
+    run_writer_process,
+)
+
+
+class SupervisorConfig(BaseModel):
+    # Opening the game waits up to a minute for the start button without making
+    # progress, so the timeout has to be longer than that
+    heartbeat_timeout_seconds: float = Field(default=120, gt=0)
+    initial_backoff_seconds: float = Field(default=1, ge=0)
+    max_backoff_seconds: float = Field(default=60, ge=0)
+    # A child that ran this long before failing resets the backoff
+    healthy_run_seconds: float = Field(default=300, gt=0)
+    max_consecutive_failures: int = Field(default=10, gt=0)
+    record_queue_size: int = Field(default=10_000, gt=0)
+    poll_interval_seconds: float = Field(default=1, gt=0)
+    start_method: str = "spawn"
+
+
+class SupervisorStats(BaseModel):
+    scraper_starts: int
+    writer_starts: int
+    hangs: int
+    finished: bool
+
+
+class ScraperSupervisor:
+    """
+    Runs the scraper in a child process and restarts it, with exponential
+    backoff, when it crashes or stops sending heartbeats. The spins it captures
+    are relayed to a single writer process that owns the repository, so a
+    browser crash never loses the connection pool or the spins already
+    captured, and the writer is restarted on its own if it dies.
+
+    Each scraper run gets its own queue, which only the supervisor reads.
+    Killing a process that is using a queue can corrupt it, so a hung scraper
+    is never killed while it shares a queue with the writer.
+    """
+
+    _options: ScraperProcessOptions
+    _mongo_config: MongoConfig
+    _config: SupervisorConfig
+    _logger: Logger
+    _scraper_target: Callable
+    _writer_target: Callable
+    _context: BaseContext
+    _records: Optional[Queue]
+    # Relayed records waiting for room in the writer queue
+    _pending: Deque[Dict]
+    _heartbeat: Optional[Synchronized]
+    _writer: Optional[BaseProcess]
+    _writer_started_at: float
+    _writer_restart_at: Optional[float]
+    _writer_backoff: float
+    _writer_failures: int
+    _stats: SupervisorStats
+
+    def __init__(
+        self,
+        options: ScraperProcessOptions,
+        mongo_config: MongoConfig,
+        config: SupervisorConfig = SupervisorConfig(),
+        logger: Logger = getLogger(__name__),
+        scraper_target: Callable = run_scraper_process,
+        writer_target: Callable = run_writer_process,
+    ):
+        """
+        :param scraper_target: Entry point of the scraper process, called with
+            the options, its own record queue and the heartbeat value.
+        :param writer_target: Entry point of the writer process, called with the
+            mongo config and the record queue.
+        """
+        self._options = options
+        self._mongo_config = mongo_config
+        self._config = config
+        self._logger = logger
+        self._scraper_target = scraper_target
+        self._writer_target = writer_target
+        self._context = multiprocessing.get_context(config.start_method)
+        self._records = None
+        self._pending = deque()
+        self._heartbeat = None
+        self._writer = None
+        self._writer_started_at = 0
+        self._writer_restart_at = None
+        self._writer_backoff = config.initial_backoff_seconds
+        self._writer_failures = 0
+        self._stats = SupervisorStats(
+            scraper_starts=0, writer_starts=0, hangs=0, finished=False
+        )
+
+    def run(self) -> SupervisorStats:
+        """
+        Supervise until the scraper finishes, the scraper or the writer fails
+        max_consecutive_failures times in a row, or the process is interrupted.
+        """
+        self._records = self._context.Queue(self._config.record_queue_size)
+        self._heartbeat = self._context.Value("d", time.monotonic())
+        self._start_writer()
+        backoff = self._config.initial_backoff_seconds
+        failures = 0
+        try:
+            while True:
+                started_at = time.monotonic()
+                exit_code = self._run_scraper_once()
+                if self._writer_failures >= self._config.max_consecutive_failures:
+                    self._logger.error(
+                        f"writer failed {self._writer_failures} times in a row"
+                    )
+                    break
+                if exit_code == EXIT_FINISHED:
+                    self._stats.finished = True
+                    self._logger.info("scraper finished")
+                    break
+                if time.monotonic() - started_at >= self._config.healthy_run_seconds:
+                    backoff = self._config.initial_backoff_seconds
+                    failures = 0
+                failures += 1
+                if failures >= self._config.max_consecutive_failures:
+                    self._logger.error(f"scraper failed {failures} times in a row")
+                    break
+                self._logger.warning(
+                    f"scraper exited with {exit_code}, restarting in {backoff:.0f}s"
+                )
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self._config.max_backoff_seconds)
+        finally:
+            self._stop_writer()
+        return self._stats.model_copy()
+
+    def _run_scraper_once(self) -> Optional[int]:
+        """
+        :return: The scraper exit code, None if it was killed for hanging or
+            because the writer kept failing.
+        """
+        self._heartbeat.value = time.monotonic()
+        records = self._context.Queue(self._config.record_queue_size)
+        scraper = self._context.Process(
+            target=self._scraper_target,
+            args=(self._options, records, self._heartbeat),
+            name="scraper",
+        )
+        scraper.start()
+        self._stats.scraper_starts += 1
+        try:
+            while True:
+                self._relay(records, self._config.poll_interval_seconds)
+                if scraper.exitcode is not None:
+                    # The scraper flushed its queue before exiting
+                    self._take_all(records)
+                    return scraper.exitcode
+                if not self._check_writer():
+                    self._kill(scraper, records)
+                    return None
+                silence = time.monotonic() - self._heartbeat.value
+                if silence > self._config.heartbeat_timeout_seconds:
+                    self._logger.error(
+                        f"no scraper heartbeat for {silence:.0f}s, killing it"
+                    )
+                    self._stats.hangs += 1
+                    self._kill(scraper, records)
+                    return None
+        except BaseException:
+            self._kill(scraper, records)
+            raise
+
+    def _relay(self, records: Queue, timeout: float) -> None:
+        """
+        Move the scraper records to the writer queue for up to timeout seconds.
+        While the writer queue is full nothing more is taken from the scraper
+        queue, so the scraper still blocks once the writer falls behind.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            self._flush_pending()
+            remaining = deadline - time.monotonic()
+            if self._pending:
+                time.sleep(max(remaining, 0))
+                return
+            try:
+                self._pending.append(records.get(timeout=max(remaining, 0)))
+            except queue.Empty:
+                return
+
+    def _take_all(self, records: Queue) -> None:
+        while True:
+            try:
+                self._pending.append(records.get_nowait())
+            except queue.Empty:
+                break
+        records.close()
+        self._flush_pending()
+
+    def _flush_pending(self) -> None:
+        while self._pending:
+            try:
+                self._records.put_nowait(self._pending[0])
+            except queue.Full:
+                return
+            self._pending.popleft()
+
+    def _start_writer(self) -> None:
+        self._writer = self._context.Process(
+            target=self._writer_target,
+            args=(self._mongo_config, self._records),
+            name="writer",
+        )
+        self._writer.start()
+        self._writer_started_at = time.monotonic()
+        self._stats.writer_starts += 1
+
+    def _check_writer(self) -> bool:
+        """
+        Restart a dead writer with the same backoff as the scraper, without
+        blocking the scraper polling meanwhile. Spins keep piling up in the
+        queue until it is back, so none is lost.
+        :return: False once the writer failed max_consecutive_failures times in
+            a row.
+        """
+        if self._writer.is_alive():
+            return True
+        now = time.monotonic()
+        if self._writer_restart_at is None:
+            if now - self._writer_started_at >= self._config.healthy_run_seconds:
+                self._writer_backoff = self._config.initial_backoff_seconds
+                self._writer_failures = 0
+            self._writer_failures += 1
+            if self._writer_failures >= self._config.max_consecutive_failures:
+                return False
+            self._logger.error(
+                f"writer exited with {self._writer.exitcode}, "
+                f"restarting in {self._writer_backoff:.0f}s"
+            )
+            self._writer_restart_at = now + self._writer_backoff
+            self._writer_backoff = min(
+                self._writer_backoff * 2, self._config.max_backoff_seconds
+            )
+        if now >= self._writer_restart_at:
+            self._writer_restart_at = None
+            self._start_writer()
+        return True
+
+    def _stop_writer(self, timeout: float = 60) -> None:
+        """
+        Hand the writer the records still pending and wait for it to save what
+        is queued. A writer that is down, or waiting out its backoff, is started
+        once more for that, so the spins captured are not dropped at shutdown.
+        """
+        if self._writer is None:
+            return
+        deadline = time.monotonic() + timeout
+        if not self._writer.is_alive():
+            self._writer_restart_at = None
+            self._start_writer()
+        while self._pending and self._writer.is_alive():
+            if time.monotonic() >= deadline:
+                break
+            self._flush_pending()
+            if self._pending:
+                time.sleep(self._config.poll_interval_seconds)
+        if not self._pending and self._writer.is_alive():
+            try:
+                self._records.put(None, timeout=max(deadline - time.monotonic(), 0))
+            except queue.Full:
+                pass
+            self._writer.join(max(deadline - time.monotonic(), 0))
+        if self._writer.is_alive():
+            self._logger.error("writer did not finish in time, killing it")
+            self._kill(self._writer)
+        abandoned = len(self._pending) + self._discard_queued()
+        if abandoned:
+            self._logger.error(f"{abandoned} records were abandoned unsaved")
+        self._pending.clear()
+        self._writer = None
+
+    def _discard_queued(self) -> int:
+        """
+        :return: How many records were left in the writer queue.
+        """
+        discarded = 0
+        while True:
+            try:
+                document = self._records.get_nowait()
+            except queue.Empty:
+                return discarded
+            except Exception:
+                # A killed writer may have left half a record behind
+                return discarded
+            if document is not None:
+                discarded += 1
+
+    def _kill(
+        self, process: BaseProcess, records: Optional[Queue] = None, timeout: float = 10
+    ) -> None:
+        """
+        :param records: The queue of a scraper. What it holds is relayed while
+            the scraper is still alive, then the queue is given up, as killing
+            the scraper may have corrupted it.
+        """
+        if records is not None:
+            self._relay(records, 0)
+        process.terminate()
+        process.join(timeout)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        if records is not None:
+            records.close()
+            records.cancel_join_thread()
@@ -0,0 +1,73 @@
+import gzip
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import brotli
+import pytest
+import zstandard
+from seleniumwire.request import Request, Response
+
+ENCODERS = {
+    "gzip": gzip.compress,
+    "deflate": zlib.compress,
+    "br": brotli.compress,
+    "zstd": lambda body: zstandard.ZstdCompressor().compress(body),
+}
+
+SPIN_URL = "https://api.pg-demo.com/game-api/fortune-tiger/v2/Spin?traceId=ABC123"
+
+
+def spin_body(balance: int = 100000, bet: int = 450, win: int = 0) -> Dict:
+    return {
+        "dt": {
+            "si": {
+                "sid": "1",
+                "psid": "1",
+                "bl": balance,
+                "tb": bet,
+                "tw": win,
+                "np": win - bet,
+                "rl": [2, 3, 4, 5, 6, 7, 2, 3, 4],
+            }
+        },
+        "err": None,
+    }
+
+
+def make_spin_exchange(
+    body: Optional[Dict] = None,
+    game_id: str = "token-1",
+    status_code: int = 200,
+    url: str = SPIN_URL,
+    content_encoding: Optional[str] = "gzip",
+):
+    raw_body = json.dumps(body if body is not None else spin_body()).encode()
+    headers = [("content-type", "application/json")]
+    if content_encoding in ENCODERS:
+        raw_body = ENCODERS[content_encoding](raw_body)
+    if content_encoding is not None:
+        headers.append(("content-encoding", content_encoding))
+    request = Request(
+        method="POST",
+        url=url,
+        headers=[("content-type", "application/x-www-form-urlencoded")],
+        body=f"id=1&atk={game_id}&cs=0.3&ml=10&wk=0_C".encode(),
+    )
+    response = Response(
+        status_code=status_code, reason="OK", headers=headers, body=raw_body
+    )
+    response.date = datetime(2024, 12, 1, 12, 0, tzinfo=timezone.utc)
+    request.response = response
+    return request, response
+
+
+@pytest.fixture
+def spin_exchange_factory():
+    return make_spin_exchange
+
+
+@pytest.fixture
+def spin_body_factory():
+    return spin_body
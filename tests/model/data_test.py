@@ -21,6 +21,20 @@ class TestFortuneTigerRequest:
         assert request.query_string_map == {"key1": ["value1"], "key2": ["value2"]}
         assert request.body_format == "Form Value"
 
+    def test_fields_can_be_assigned(self):
+        request = FortuneTigerRequest(
+            headers={},
+            query_string="",
+            body={},
+            method="GET",
+            path="/api/test",
+            host="localhost",
+            url="http://localhost/api/test",
+        )
+        request.method = "POST"
+
+        assert request.method == "POST"
+
     def test_invalid_request_missing_fields(self):
         with pytest.raises(ValidationError):
             FortuneTigerRequest(
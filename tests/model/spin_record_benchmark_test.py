@@ -0,0 +1,183 @@
+import os
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import parse_qs
+
+import pytest
+from pydantic import ValidationError
+
+from model.data import FortuneTigerData, FortuneTigerRequest, FortuneTigerResponse
+from model.spin_record import SpinRecord
+
+RECORDS = 2000
+
+REQUEST_HEADERS = {
+    "accept": "application/json, text/plain, */*",
+    "content-type": "application/x-www-form-urlencoded",
+    "origin": "https://m.pgsoft-games.com",
+    "user-agent": "Mozilla/5.0 (X11; Linux x86_64) Chrome/131.0.0.0",
+}
+RESPONSE_HEADERS = {"content-encoding": "gzip", "content-type": "application/json"}
+REQUEST_BODY = "id=1&atk=token-1&cs=0.3&ml=10&wk=0_C"
+
+
+def _spin_body(index: int) -> Dict:
+    return {
+        "dt": {
+            "si": {
+                "sid": str(index),
+                "bl": 100000 - index,
+                "tb": 450,
+                "tw": 0,
+                "np": -450,
+                "rl": [2, 3, 4, 5, 6, 7, 2, 3, 4],
+            }
+        }
+    }
+
+
+def _request_kwargs() -> Dict:
+    return dict(
+        body=parse_qs(REQUEST_BODY),
+        headers=dict(REQUEST_HEADERS),
+        host="api.pg-demo.com",
+        method="POST",
+        path="/game-api/fortune-tiger/v2/Spin",
+        url="https://api.pg-demo.com/game-api/fortune-tiger/v2/Spin",
+        query_string="traceId=ABC",
+    )
+
+
+def _response_kwargs(index: int) -> Dict:
+    return dict(
+        headers=dict(RESPONSE_HEADERS),
+        status_code=200,
+        body=_spin_body(index),
+        date=datetime(2024, 12, 1, tzinfo=timezone.utc),
+    )
+
+
+def _derived(data) -> Tuple[int, ...]:
+    return (
+        data.bet_profit,
+        data.bet_amount,
+        data.win_amount,
+        data.current_balance,
+    )
+
+
+# Each captured spin is read by a repository and a stats subscriber
+SUBSCRIBERS = 2
+
+
+def validated_pipeline(index: int):
+    # What _notify_subscribers and MongoRepository.save_data used to do
+    data = FortuneTigerData(
+        request=FortuneTigerRequest(**_request_kwargs()),
+        response=FortuneTigerResponse(**_response_kwargs(index)),
+    )
+    for _ in range(SUBSCRIBERS):
+        _derived(data)
+        document = data.model_dump(mode="json")
+    return document
+
+
+def trusted_pipeline(index: int):
+    data = FortuneTigerData.trusted(
+        request=FortuneTigerRequest.model_construct(**_request_kwargs()),
+        response=FortuneTigerResponse.model_construct(**_response_kwargs(index)),
+    )
+    for _ in range(SUBSCRIBERS):
+        _derived(data)
+        document = data.to_document()
+    return document
+
+
+@lru_cache(maxsize=None)
+def _stored() -> List[Dict]:
+    return [validated_pipeline(index) for index in range(RECORDS)]
+
+
+def validated_read(index: int):
+    return _derived(FortuneTigerData.model_validate(_stored()[index]))
+
+
+def record_read(index: int):
+    return _derived(SpinRecord.from_document(_stored()[index]))
+
+
+def _measure(build: Callable[[int], object]) -> Tuple[float, int]:
+    start = time.perf_counter()
+    for index in range(RECORDS):
+        build(index)
+    records_per_second = RECORDS / (time.perf_counter() - start)
+    tracemalloc.start()
+    for index in range(RECORDS):
+        build(index)
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del snapshot
+    return records_per_second, peak
+
+
+class TestSpinRecordPaths:
+    def test_both_paths_agree(self):
+        stored = validated_pipeline(7)
+        assert trusted_pipeline(7) == stored
+        record = SpinRecord.from_document(stored)
+        assert _derived(record) == _derived(FortuneTigerData.model_validate(stored))
+        assert record.date == datetime(2024, 12, 1, tzinfo=timezone.utc)
+
+    def test_changing_a_document_leaves_the_cache_alone(self):
+        data = FortuneTigerData.trusted(
+            request=FortuneTigerRequest.model_construct(**_request_kwargs()),
+            response=FortuneTigerResponse.model_construct(**_response_kwargs(7)),
+        )
+        document = data.to_document()
+        document["response"]["body"]["dt"]["si"]["bl"] = 0
+        document["request"]["headers"].clear()
+
+        assert data.to_document() == validated_pipeline(7)
+
+    def test_copies_do_not_reuse_the_cached_document(self):
+        data = FortuneTigerData.trusted(
+            request=FortuneTigerRequest.model_construct(**_request_kwargs()),
+            response=FortuneTigerResponse.model_construct(**_response_kwargs(7)),
+        )
+        data.to_document()
+        copied = data.model_copy(
+            update={"response": FortuneTigerResponse(**_response_kwargs(8))}
+        )
+
+        assert copied.to_document() == validated_pipeline(8)
+        assert copied.current_balance == 100000 - 8
+        with pytest.raises(ValidationError):
+            data.response = copied.response
+
+
+# Wall-clock comparisons are only meaningful on an idle machine
+@pytest.mark.skipif(
+    not os.environ.get("RUN_BENCHMARKS"),
+    reason="set RUN_BENCHMARKS=1 to run the timing benchmarks",
+)
+class TestSpinRecordBenchmark:
+    def test_trusted_capture_is_faster_than_validation(self):
+        validated, _ = _measure(validated_pipeline)
+        trusted, _ = _measure(trusted_pipeline)
+        print(f"capture: validated {validated:.0f}/s, trusted {trusted:.0f}/s")
+
+        assert trusted > validated
+
+    def test_record_read_is_faster_and_lighter_than_models(self):
+        validated, validated_peak = _measure(validated_read)
+        record, record_peak = _measure(record_read)
+        print(
+            f"read: models {validated:.0f}/s ({validated_peak} B peak), "
+            f"records {record:.0f}/s ({record_peak} B peak)"
+        )
+
+        assert record > validated
@@ -0,0 +1,93 @@
+import os
+import time
+import urllib.request
+
+import pytest
+
+from monitoring import MetricsServer, PipelineMetrics, SamplingProfiler
+
+
+class TestPipelineMetrics:
+    def test_records_latency_and_errors_per_stage(self):
+        metrics = PipelineMetrics()
+        metrics.observe("tika_ocr", 0.2)
+        metrics.observe("tika_ocr", 0.02)
+        with pytest.raises(ValueError):
+            with metrics.stage("tika_ocr"):
+                raise ValueError("tika is down")
+
+        snapshot = metrics.snapshot()["tika_ocr"]
+
+        assert snapshot.count == 3
+        assert snapshot.errors == 1
+        assert snapshot.buckets[-1] == 3
+        assert snapshot.quantile_seconds(0.95) == 0.25
+
+    def test_renders_prometheus_histograms(self):
+        metrics = PipelineMetrics()
+        metrics.observe("mongo_insert", 0.003)
+
+        text = metrics.render_prometheus()
+
+        assert (
+            'fortune_tiger_stage_seconds_bucket{stage="mongo_insert",le="0.0025"} 0'
+            in text
+        )
+        assert (
+            'fortune_tiger_stage_seconds_bucket{stage="mongo_insert",le="0.005"} 1'
+            in text
+        )
+        assert 'fortune_tiger_stage_seconds_count{stage="mongo_insert"} 1' in text
+        assert 'fortune_tiger_stage_errors_total{stage="mongo_insert"} 0' in text
+
+    def test_summary_line(self):
+        metrics = PipelineMetrics()
+        assert metrics.summary() is None
+        metrics.observe("screenshot", 0.04)
+
+        assert metrics.summary() == "screenshot n=1 mean=40.0ms p95<=50ms errors=0.0%"
+
+    def test_stage_overhead_is_a_few_microseconds(self):
+        metrics = PipelineMetrics()
+        calls = 20000
+        started_at = time.perf_counter()
+        for _ in range(calls):
+            with metrics.stage("spin_decode"):
+                pass
+        per_call = (time.perf_counter() - started_at) / calls
+
+        print(f"stage overhead: {per_call * 1e6:.2f} us")
+        assert per_call < 20e-6
+
+
+class TestMetricsServer:
+    def test_serves_metrics(self):
+        metrics = PipelineMetrics()
+        metrics.observe("screenshot", 0.01)
+        server = MetricsServer(metrics, port=0)
+        server.start()
+        try:
+            with urllib.request.urlopen(
+                f"http://127.0.0.1:{server.port}/metrics", timeout=5
+            ) as response:
+                body = response.read().decode()
+        finally:
+            server.stop()
+
+        assert 'fortune_tiger_stage_seconds_count{stage="screenshot"} 1' in body
+
+
+class TestSamplingProfiler:
+    def test_profiles_one_of_every_n_blocks(self, tmp_path):
+        profiler = SamplingProfiler(sample_every=3, output_dir=str(tmp_path))
+
+        sampled = []
+        for _ in range(6):
+            with profiler.sample() as profile:
+                sampled.append(profile is not None)
+
+        assert sampled == [True, False, False, True, False, False]
+        assert sorted(os.listdir(tmp_path)) == [
+            "batch-000001.prof",
+            "batch-000004.prof",
+        ]
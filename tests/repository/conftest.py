@@ -0,0 +1,68 @@
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from model.data import FortuneTigerData, FortuneTigerRequest, FortuneTigerResponse
+
+
+def make_data(
+    index: int = 0, game_id: str = "token-1", balance: int = 100000
+) -> FortuneTigerData:
+    return FortuneTigerData(
+        request=FortuneTigerRequest(
+            headers={"content-type": "application/x-www-form-urlencoded"},
+            query_string="traceId=ABC123",
+            body={"atk": [game_id], "id": [str(index)]},
+            method="POST",
+            path="/game-api/fortune-tiger/v2/Spin",
+            host="api.pg-demo.com",
+            url="https://api.pg-demo.com/game-api/fortune-tiger/v2/Spin",
+        ),
+        response=FortuneTigerResponse(
+            status_code=200,
+            headers={"content-encoding": "gzip"},
+            body={
+                "dt": {
+                    "si": {
+                        "sid": str(1000 + index),
+                        "psid": str(1000 + index),
+                        "bl": balance,
+                        "tb": 450,
+                        "tw": 900 if index % 3 == 0 else 0,
+                        "np": 450 if index % 3 == 0 else -450,
+                        "rl": [2, 3, 4, 5, 6, 7, 2, 3, 4],
+                    }
+                }
+            },
+            date=datetime(2024, 12, 1, 12, 0, index % 60, tzinfo=timezone.utc),
+        ),
+    )
+
+
+@pytest.fixture
+def data_factory():
+    return make_data
+
+
+@pytest.fixture
+def mongo_database():
+    """
+    A scratch database on the mongod given by MONGO_CONNECTION_STRING, for the
+    tests that need a real server.
+    """
+    connection_string = os.environ.get("MONGO_CONNECTION_STRING")
+    if not connection_string:
+        pytest.skip("set MONGO_CONNECTION_STRING to run against a local mongod")
+    client = MongoClient(connection_string, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError as e:
+        pytest.skip(f"mongod is not reachable: {e}")
+    database_name = f"fortune_tiger_test_{uuid.uuid4().hex[:8]}"
+    yield connection_string, database_name
+    client.drop_database(database_name)
+    client.close()
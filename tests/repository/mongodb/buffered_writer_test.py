@@ -0,0 +1,155 @@
+import threading
+import time
+from typing import Dict, List
+
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError
+from pymongo.results import InsertManyResult
+
+from repository.mongodb.buffered_writer import BufferedMongoWriter
+from repository.mongodb.repository import MongoConfig, MongoRepository
+
+
+class FakeCollection:
+    def __init__(self, unavailable_calls: int = 0):
+        self.batches: List[List[Dict]] = []
+        self.unavailable_calls = unavailable_calls
+        self.stored: Dict = {}
+        self.lock = threading.Lock()
+
+    def insert_many(self, documents, ordered=True):
+        with self.lock:
+            if self.unavailable_calls:
+                self.unavailable_calls -= 1
+                raise AutoReconnect("connection refused")
+            self.batches.append(list(documents))
+            duplicates = []
+            for index, document in enumerate(documents):
+                if document["_id"] in self.stored:
+                    duplicates.append({"index": index, "code": 11000, "errmsg": "dup"})
+                self.stored[document["_id"]] = document
+            if duplicates:
+                raise BulkWriteError(
+                    {
+                        "nInserted": len(documents) - len(duplicates),
+                        "writeErrors": duplicates,
+                    }
+                )
+            return InsertManyResult([d["_id"] for d in documents], True)
+
+
+def _document() -> Dict:
+    return {"_id": ObjectId()}
+
+
+class TestBufferedMongoWriter:
+    def test_flushes_when_batch_is_full(self):
+        collection = FakeCollection()
+        writer = BufferedMongoWriter(
+            collection, batch_size=3, flush_interval_seconds=60
+        )
+        for _ in range(3):
+            writer.submit(_document())
+        deadline = time.monotonic() + 5
+        while not collection.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        writer.close()
+
+        assert [len(batch) for batch in collection.batches] == [3]
+
+    def test_flushes_on_interval(self):
+        collection = FakeCollection()
+        writer = BufferedMongoWriter(
+            collection, batch_size=100, flush_interval_seconds=0.05
+        )
+        writer.submit(_document())
+        time.sleep(0.3)
+
+        assert writer.stats().written == 1
+        writer.close()
+
+    def test_close_flushes_pending_documents(self):
+        collection = FakeCollection()
+        writer = BufferedMongoWriter(
+            collection, batch_size=4, flush_interval_seconds=60
+        )
+        for _ in range(10):
+            writer.submit(_document())
+        writer.close()
+
+        assert len(collection.stored) == 10
+        assert writer.stats().pending == 0
+
+    def test_retries_while_unavailable(self):
+        collection = FakeCollection(unavailable_calls=2)
+        writer = BufferedMongoWriter(
+            collection,
+            batch_size=2,
+            flush_interval_seconds=0.01,
+            retry_interval_seconds=0.01,
+        )
+        for _ in range(4):
+            writer.submit(_document())
+        writer.close()
+        stats = writer.stats()
+
+        assert len(collection.stored) == 4
+        assert stats.retries == 2
+        assert stats.dropped == 0
+
+    def test_drops_oldest_when_buffer_is_full(self):
+        collection = FakeCollection(unavailable_calls=1000)
+        writer = BufferedMongoWriter(
+            collection,
+            batch_size=100,
+            flush_interval_seconds=60,
+            max_buffered_documents=5,
+            retry_interval_seconds=0.01,
+        )
+        for _ in range(8):
+            writer.submit(_document())
+        stats = writer.stats()
+
+        assert stats.pending == 5
+        assert stats.dropped == 3
+        writer.close(timeout=0.1)
+
+    def test_duplicates_of_a_retried_batch_are_not_failures(self):
+        collection = FakeCollection()
+        document = _document()
+        collection.stored[document["_id"]] = document
+        writer = BufferedMongoWriter(collection, batch_size=2)
+        writer.submit(document)
+        writer.submit(_document())
+        writer.close()
+
+        assert writer.stats().failed == 0
+        assert writer.stats().written == 1
+
+
+class TestBufferedMongoRepositoryBenchmark:
+    def test_inserts_per_second(self, mongo_database, data_factory):
+        connection_string, database_name = mongo_database
+        documents = 5000
+        results = {}
+        for buffered in (False, True):
+            repository = MongoRepository(
+                MongoConfig(
+                    connection_string=connection_string,
+                    database_name=database_name,
+                    collection_name=f"spins_buffered_{buffered}",
+                    buffered=buffered,
+                )
+            )
+            data = [data_factory(index) for index in range(documents)]
+            start = time.perf_counter()
+            for item in data:
+                repository.save_data(item)
+            repository.close()
+            elapsed = time.perf_counter() - start
+            results[buffered] = documents / elapsed
+        print(
+            f"insert_one: {results[False]:.0f} docs/s, "
+            f"buffered insert_many: {results[True]:.0f} docs/s"
+        )
+        assert results[True] > results[False]
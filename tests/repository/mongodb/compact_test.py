@@ -0,0 +1,100 @@
+import pytest
+
+from model.data import FortuneTigerData
+from model.spin_record import SpinRecord
+
+from repository.mongodb.compact import (
+    bytes_per_spin,
+    from_compact_document,
+    is_compact_document,
+    to_compact_document,
+)
+
+BROWSER_HEADERS = {
+    "accept": "application/json, text/plain, */*",
+    "accept-language": "pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7",
+    "content-type": "application/x-www-form-urlencoded",
+    "origin": "https://m.pgsoft-games.com",
+    "referer": "https://m.pgsoft-games.com/",
+    "sec-ch-ua": '"Chromium";v="131", "Not_A Brand";v="24"',
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": '"Linux"',
+    "user-agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+}
+
+
+@pytest.fixture
+def browser_data(data_factory):
+    def make(index: int):
+        data = data_factory(index)
+        response_headers = {
+            "content-encoding": "gzip",
+            "content-type": "application/json; charset=utf-8",
+            "date": f"Sun, 01 Dec 2024 12:00:{index % 60:02d} GMT",
+            "server": "nginx",
+        }
+        return data.model_copy(
+            update={
+                "request": data.request.model_copy(
+                    update={"headers": dict(BROWSER_HEADERS)}
+                ),
+                "response": data.response.model_copy(
+                    update={"headers": response_headers}
+                ),
+            }
+        )
+
+    return make
+
+
+class TestCompactDocument:
+    @pytest.mark.parametrize("compress_body", [False, True])
+    def test_round_trip(self, browser_data, compress_body):
+        data = browser_data(3)
+        document, session = to_compact_document(data, compress_body=compress_body)
+
+        assert is_compact_document(document)
+        assert document["spin"] == data.response.body["dt"]["si"]
+        assert from_compact_document(document, session) == data
+
+    def test_round_trips_a_null_spin(self, browser_data):
+        fields = browser_data(3).model_dump()
+        fields["response"]["body"]["dt"]["si"] = None
+        data = FortuneTigerData.model_validate(fields)
+        document, session = to_compact_document(data)
+
+        assert document["spin"] is None
+        assert from_compact_document(document, session) == data
+
+    def test_spins_of_a_session_share_the_header_set(self, browser_data):
+        _, first_session = to_compact_document(browser_data(1))
+        second_document, second_session = to_compact_document(browser_data(2))
+
+        assert first_session == second_session
+        assert "date" in second_document["response"]["volatile_headers"]
+
+    def test_keeps_derived_fields_for_queries(self, browser_data):
+        data = browser_data(0)
+        document, _ = to_compact_document(data)
+
+        assert document["game_id"] == data.game_id
+        assert document["bet_profit"] == data.bet_profit
+        assert document["response"]["date"] == "2024-12-01T12:00:00Z"
+
+    @pytest.mark.parametrize("compress_body", [False, True])
+    def test_reads_back_as_a_spin_record(self, browser_data, compress_body):
+        data = browser_data(3)
+        document, _ = to_compact_document(data, compress_body=compress_body)
+        record = SpinRecord.from_document(document)
+
+        assert record.game_id == data.game_id
+        assert record.date == data.response.date
+        assert record.current_balance == data.current_balance
+        assert record.bet_profit == data.bet_profit
+
+    def test_bytes_per_spin_report(self, browser_data):
+        sizes = bytes_per_spin([browser_data(index) for index in range(100)])
+        print(sizes)
+
+        assert sizes["compact"] < sizes["full"] / 2
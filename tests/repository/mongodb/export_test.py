@@ -0,0 +1,152 @@
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+import pytest
+from bson import ObjectId
+
+from repository.mongodb.compact import to_compact_document
+from repository.mongodb.export import ExportConfig, SpinExporter, spin_row
+from repository.mongodb.repository import MongoConfig, MongoRepository
+
+
+@pytest.fixture
+def stored_spins(data_factory):
+    """
+    Stored full documents, sorted by date: three spins on December 1st and two
+    on the 2nd.
+    """
+
+    def make(count_per_day=(3, 2)):
+        documents = []
+        for day, count in enumerate(count_per_day, start=1):
+            for index in range(count):
+                document = data_factory(index).to_document()
+                document["_id"] = ObjectId()
+                document["response"]["date"] = f"2024-12-0{day}T12:00:0{index}"
+                documents.append(document)
+        return documents
+
+    return make
+
+
+class TestSpinRow:
+    def test_full_and_compact_documents_give_the_same_row(self, data_factory):
+        data = data_factory(3)
+        compact, _ = to_compact_document(data)
+
+        full_row = spin_row(data.to_document())
+        compact_row = spin_row(compact)
+
+        assert full_row == compact_row
+        assert full_row["rl"] == [2, 3, 4, 5, 6, 7, 2, 3, 4]
+        assert full_row["orl"] is None
+        assert full_row["bet_profit"] == 450
+        assert full_row["date"] == datetime(2024, 12, 1, 12, 0, 3)
+
+
+class TestSpinExporter:
+    def test_partitions_by_day(self, stored_spins, tmp_path):
+        exporter = SpinExporter(ExportConfig(output_dir=str(tmp_path)))
+
+        stats = exporter.export_documents(stored_spins())
+
+        assert stats.rows == 5
+        assert sorted(path.parent.name for path in tmp_path.rglob("*.parquet")) == [
+            "day=2024-12-01",
+            "day=2024-12-02",
+        ]
+        table = ds.dataset(str(tmp_path), format="parquet", partitioning="hive")
+        per_day = table.to_table(columns=["day", "win_amount"]).group_by("day")
+        counts = per_day.aggregate([("win_amount", "count")]).to_pydict()
+        assert dict(zip(counts["day"], counts["win_amount_count"])) == {
+            "2024-12-01": 3,
+            "2024-12-02": 2,
+        }
+        assert table.to_table(filter=ds.field("game_id") == "token-1").num_rows == 5
+
+    def test_continues_after_the_high_water_mark(self, stored_spins, tmp_path):
+        config = ExportConfig(output_dir=str(tmp_path))
+        SpinExporter(config).export_documents(stored_spins())
+
+        query = SpinExporter(config).query(now=datetime(2024, 12, 3))
+
+        assert query == {
+            "response.date": {
+                "$gt": "2024-12-02T12:00:01",
+                "$lte": "2024-12-02T23:59:00",
+            }
+        }
+        full = ExportConfig(output_dir=str(tmp_path), incremental=False)
+        assert "$gt" not in SpinExporter(full).query()["response.date"]
+
+    def test_queries_the_time_field_of_timeseries(self, stored_spins, tmp_path):
+        config = ExportConfig(output_dir=str(tmp_path))
+        SpinExporter(config).export_documents(stored_spins())
+
+        query = SpinExporter(config).query(now=datetime(2024, 12, 3), timeseries=True)
+
+        assert query == {
+            "date": {
+                "$gt": datetime(2024, 12, 2, 12, 0, 1),
+                "$lte": datetime(2024, 12, 2, 23, 59),
+            }
+        }
+
+    def test_arrow_files_can_be_memory_mapped(self, stored_spins, tmp_path):
+        config = ExportConfig(output_dir=str(tmp_path), file_format="arrow")
+
+        stats = SpinExporter(config).export_documents(stored_spins((4,)))
+
+        with pa.memory_map(stats.files[0]) as source:
+            table = ipc.open_file(source).read_all()
+        assert table.num_rows == 4
+        assert table.column("rl").type == pa.list_(pa.int32())
+
+    def test_failed_day_is_discarded(self, stored_spins, tmp_path):
+        def failing():
+            yield from stored_spins()[:4]
+            raise RuntimeError("cursor lost")
+
+        config = ExportConfig(output_dir=str(tmp_path), row_group_size=1)
+        with pytest.raises(RuntimeError):
+            SpinExporter(config).export_documents(failing())
+
+        # The first day is complete, the second one will be exported again
+        assert [path.parent.name for path in tmp_path.rglob("*.parquet")] == [
+            "day=2024-12-01"
+        ]
+        assert SpinExporter(config).load_high_water_mark() == "2024-12-01T12:00:02"
+
+
+class TestExportFromMongo:
+    def test_exports_both_formats(self, mongo_database, data_factory, tmp_path):
+        connection_string, database_name = mongo_database
+        for document_format in ("full", "compact"):
+            repository = MongoRepository(
+                MongoConfig(
+                    connection_string=connection_string,
+                    database_name=database_name,
+                    collection_name="spins",
+                    document_format=document_format,
+                )
+            )
+            for index in range(3):
+                repository.save_data(data_factory(index))
+            repository.close()
+        repository = MongoRepository(
+            MongoConfig(
+                connection_string=connection_string,
+                database_name=database_name,
+                collection_name="spins",
+            )
+        )
+        config = ExportConfig(output_dir=str(tmp_path), lag_seconds=0)
+
+        stats = SpinExporter(config).export(repository.collection)
+        again = SpinExporter(config).export(repository.collection)
+        repository.close()
+
+        assert stats.rows == 6
+        assert again.rows == 0
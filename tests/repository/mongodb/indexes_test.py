@@ -0,0 +1,130 @@
+import time
+from typing import Dict, List
+
+from pymongo import MongoClient
+
+from repository.mongodb.indexes import (
+    LEGACY_SPIN_INDEX_NAMES,
+    SPIN_INDEXES,
+    IndexSpec,
+    reconcile_indexes,
+)
+from repository.mongodb.repository import MongoConfig, MongoRepository
+
+LEGACY_FIELDS = [
+    "game_id",
+    "bet_profit",
+    "bet_amount",
+    "win_amount",
+    "current_balance",
+    "response.date",
+]
+LEGACY_INDEXES = [
+    IndexSpec(keys=[(field, direction)])
+    for direction in (1, -1)
+    for field in LEGACY_FIELDS
+]
+
+
+class FakeIndexedCollection:
+    def __init__(self, specs: List[IndexSpec]):
+        self.indexes: Dict[str, Dict] = {"_id_": {"key": [("_id", 1)]}}
+        for spec in specs:
+            self.indexes[spec.name] = {"key": [(f, float(d)) for f, d in spec.keys]}
+
+    def index_information(self):
+        return dict(self.indexes)
+
+    def create_indexes(self, models):
+        for model in models:
+            document = model.document
+            self.indexes[document["name"]] = {"key": list(document["key"].items())}
+
+    def drop_index(self, name):
+        del self.indexes[name]
+
+
+class TestReconcileIndexes:
+    def test_replaces_legacy_indexes_with_the_spec(self):
+        collection = FakeIndexedCollection(LEGACY_INDEXES)
+        changes = reconcile_indexes(
+            collection, SPIN_INDEXES, drop_names=LEGACY_SPIN_INDEX_NAMES
+        )
+
+        assert sorted(collection.indexes) == sorted(
+            ["_id_"] + [spec.name for spec in SPIN_INDEXES]
+        )
+        # bet_profit_1 is in both sets and stays untouched
+        assert len(changes["dropped"]) == 11
+        assert len(changes["created"]) == 2
+
+    def test_is_a_no_op_when_up_to_date(self):
+        collection = FakeIndexedCollection(SPIN_INDEXES)
+        changes = reconcile_indexes(collection, SPIN_INDEXES)
+
+        assert changes == {"created": [], "dropped": []}
+
+    def test_keeps_unspecified_indexes_by_default(self):
+        collection = FakeIndexedCollection(LEGACY_INDEXES)
+        reconcile_indexes(collection, SPIN_INDEXES)
+
+        assert len(collection.indexes) == 1 + 12 + 2
+
+    def test_keeps_hand_made_indexes_when_dropping_legacy_ones(self):
+        hand_made = IndexSpec(keys=[("request.host", 1)])
+        collection = FakeIndexedCollection(LEGACY_INDEXES + [hand_made])
+        reconcile_indexes(collection, SPIN_INDEXES, drop_names=LEGACY_SPIN_INDEX_NAMES)
+
+        assert hand_made.name in collection.indexes
+        assert sorted(LEGACY_SPIN_INDEX_NAMES) == sorted(
+            spec.name for spec in LEGACY_INDEXES
+        )
+
+    def test_drops_every_unspecified_index_when_asked(self):
+        collection = FakeIndexedCollection([IndexSpec(keys=[("request.host", 1)])])
+        changes = reconcile_indexes(collection, SPIN_INDEXES, drop_unspecified=True)
+
+        assert changes["dropped"] == ["request.host_1"]
+
+
+class TestIndexLoad:
+    def test_insert_throughput_and_index_size(self, mongo_database, data_factory):
+        connection_string, database_name = mongo_database
+        client = MongoClient(connection_string)
+        documents = [
+            data_factory(index).model_dump(mode="json") for index in range(20000)
+        ]
+        results = {}
+        for name, specs in (("legacy", LEGACY_INDEXES), ("spec", SPIN_INDEXES)):
+            collection = client[database_name][f"spins_{name}"]
+            reconcile_indexes(collection, specs)
+            start = time.perf_counter()
+            collection.insert_many([dict(document) for document in documents])
+            elapsed = time.perf_counter() - start
+            stats = client[database_name].command("collStats", collection.name)
+            results[name] = (len(documents) / elapsed, stats["totalIndexSize"])
+            print(
+                f"{name}: {results[name][0]:.0f} inserts/s, "
+                f"{results[name][1] / 1024:.0f} KiB of indexes"
+            )
+        client.close()
+        assert results["spec"][1] < results["legacy"][1]
+
+    def test_create_collection_reconciles_existing(self, mongo_database):
+        connection_string, database_name = mongo_database
+        client = MongoClient(connection_string)
+        reconcile_indexes(client[database_name]["spins"], LEGACY_INDEXES)
+        repository = MongoRepository(
+            MongoConfig(
+                connection_string=connection_string,
+                database_name=database_name,
+                collection_name="spins",
+            )
+        )
+        assert repository.create_collection() is False
+        names = set(client[database_name]["spins"].index_information())
+        specs = repository.index_specs()
+        repository.close()
+        client.close()
+
+        assert names == {"_id_"} | {spec.name for spec in specs}
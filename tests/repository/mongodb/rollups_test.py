@@ -0,0 +1,255 @@
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from repository.mongodb.repository import MongoConfig, MongoRepository
+from repository.mongodb.rollups import (
+    RollupWriter,
+    aggregate_documents,
+    bucket_start,
+    rollup_collection_name,
+    rollup_totals,
+)
+from repository.mongodb.timeseries import synthetic_documents
+from tests.repository.mongodb.upsert_test import FakeKeyedCollection
+
+
+class FakeRollupCollection:
+    """
+    Applies $inc, $min and $max upserts keyed on start and game_id.
+    """
+
+    def __init__(self):
+        self.documents: Dict = {}
+        self.bulk_writes: List[int] = []
+        self.unavailable = False
+
+    def bulk_write(self, operations, ordered=True):
+        if self.unavailable:
+            raise AutoReconnect("connection reset")
+        self.bulk_writes.append(len(operations))
+        for operation in operations:
+            key = (operation._filter["start"], operation._filter["game_id"])
+            document = self.documents.setdefault(key, dict(operation._filter))
+            update = operation._doc
+            for field, value in update["$inc"].items():
+                document[field] = document.get(field, 0) + value
+            for field, value in update.get("$min", {}).items():
+                document[field] = min(document.get(field, value), value)
+            for field, value in update.get("$max", {}).items():
+                document[field] = max(document.get(field, value), value)
+
+    def delete_many(self, query):
+        bounds = query["start"]
+        self.documents = {
+            key: document
+            for key, document in self.documents.items()
+            if not bounds["$gte"] <= key[0] < bounds["$lt"]
+        }
+
+
+class FakeDatabase(dict):
+    def list_collections(self, filter=None):
+        return []
+
+
+class FakeSpinCollection:
+    """
+    Finds stored spins in a response.date range.
+    """
+
+    name = "spins"
+
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+        self.documents: List[Dict] = []
+
+    def find(self, query, projection=None):
+        bounds = query["response.date"]
+        return [
+            document
+            for document in self.documents
+            if bounds["$gte"] <= document["response"]["date"] < bounds["$lt"]
+        ]
+
+
+class FailingUpsertCollection:
+    """
+    Stores every document of a bulk write but the last, which fails validation.
+    """
+
+    def bulk_write(self, operations, ordered=True):
+        upserted = [{"index": index} for index in range(len(operations) - 1)]
+        error = {"index": len(operations) - 1, "code": 121, "errmsg": "invalid"}
+        raise BulkWriteError({"upserted": upserted, "writeErrors": [error]})
+
+
+def _fake_database() -> FakeDatabase:
+    database = FakeDatabase(
+        {
+            rollup_collection_name("spins", granularity): FakeRollupCollection()
+            for granularity in ("minute", "hour")
+        }
+    )
+    database["spins"] = FakeSpinCollection(database)
+    return database
+
+
+class TestAggregation:
+    def test_bucket_start(self):
+        assert bucket_start("2024-12-01T12:34:56.789", "minute") == datetime(
+            2024, 12, 1, 12, 34
+        )
+        assert bucket_start("2024-12-01T12:34:56+02:00", "hour") == datetime(
+            2024, 12, 1, 10
+        )
+
+    def test_sums_per_bucket_and_game(self, data_factory):
+        documents = [data_factory(index).to_document() for index in range(6)]
+        documents.append(data_factory(0, game_id="token-2", balance=5).to_document())
+
+        buckets = aggregate_documents(documents, "minute")
+
+        bucket = buckets[(datetime(2024, 12, 1, 12, 0), "token-1")]
+        assert bucket.spins == 6
+        assert bucket.wins == 2
+        assert bucket.bet_amount == 6 * 450
+        assert bucket.bet_profit == sum(d["bet_profit"] for d in documents[:6])
+        assert buckets[(datetime(2024, 12, 1, 12, 0), "token-2")].balance_min == 5
+
+
+class TestRollupWriter:
+    def test_batches_are_applied_incrementally(self):
+        database = _fake_database()
+        writer = RollupWriter(database, "spins", ["minute", "hour"])
+        documents = list(synthetic_documents(3000, games=3))
+
+        for start in range(0, len(documents), 500):
+            writer.apply(documents[start : start + 500])
+
+        minutes = database[rollup_collection_name("spins", "minute")].documents
+        hours = database[rollup_collection_name("spins", "hour")].documents
+        expected = aggregate_documents(documents, "minute")
+        assert len(minutes) == len(expected)
+        for key, bucket in expected.items():
+            rollup = minutes[key]
+            assert rollup["spins"] == bucket.spins
+            assert rollup["bet_profit"] == bucket.bet_profit
+            assert rollup["balance_min"] == bucket.balance_min
+            assert rollup["balance_max"] == bucket.balance_max
+        assert sum(rollup["spins"] for rollup in hours.values()) == 3000
+
+    def test_failed_hours_are_rebuilt_from_the_raw_spins(self):
+        database = _fake_database()
+        writer = RollupWriter(database, "spins", ["minute", "hour"])
+        documents = list(synthetic_documents(600, games=3, spin_interval_seconds=60))
+        hours = database[rollup_collection_name("spins", "hour")]
+
+        for start in range(0, len(documents), 100):
+            batch = documents[start : start + 100]
+            database["spins"].documents.extend(batch)
+            hours.unavailable = start == 200
+            if not hours.unavailable:
+                writer.apply(batch)
+                continue
+            with pytest.raises(AutoReconnect):
+                writer.apply(batch)
+            assert writer.stale_hours == [datetime(2024, 1, 1, 1)]
+
+        assert writer.stale_hours == []
+        for granularity in ("minute", "hour"):
+            rollups = database[rollup_collection_name("spins", granularity)]
+            expected = aggregate_documents(documents, granularity)
+            assert {
+                key: rollup["spins"] for key, rollup in rollups.documents.items()
+            } == {key: bucket.spins for key, bucket in expected.items()}
+
+    def test_stored_part_of_a_failed_batch_is_rolled_up(self, data_factory):
+        repository = MongoRepository(
+            MongoConfig(
+                connection_string="mongodb://localhost:1",
+                database_name="test",
+                collection_name="spins",
+                recent_keys=0,
+            )
+        )
+        database = _fake_database()
+        repository.collection = FailingUpsertCollection()
+        repository._rollups = RollupWriter(database, "spins", ["minute", "hour"])
+
+        with pytest.raises(BulkWriteError):
+            repository.save_batch([data_factory(index) for index in range(3)])
+
+        (hour,) = database[rollup_collection_name("spins", "hour")].documents.values()
+        assert hour["spins"] == 2
+
+    def test_repository_rolls_up_only_new_spins(self, data_factory):
+        repository = MongoRepository(
+            MongoConfig(
+                connection_string="mongodb://localhost:1",
+                database_name="test",
+                collection_name="spins",
+                recent_keys=0,
+            )
+        )
+        database = _fake_database()
+        repository.collection = FakeKeyedCollection()
+        repository._rollups = RollupWriter(database, "spins", ["minute", "hour"])
+
+        repository.save_batch([data_factory(index) for index in range(3)])
+        repository.save_batch([data_factory(index) for index in range(2, 5)])
+
+        (hour,) = database[rollup_collection_name("spins", "hour")].documents.values()
+        assert hour["spins"] == 5
+
+
+class TestRollupsOnMongo:
+    def test_rollup_range_query_matches_raw_spins(self, mongo_database):
+        connection_string, database_name = mongo_database
+        repository = MongoRepository(
+            MongoConfig(
+                connection_string=connection_string,
+                database_name=database_name,
+                collection_name="spins",
+            )
+        )
+        repository.create_collection()
+        documents = list(synthetic_documents(200_000))
+        repository.collection.insert_many(documents)
+        assert repository.backfill_rollups() == len(documents)
+        since, until = datetime(2024, 1, 1, 0, 10), datetime(2024, 1, 1, 0, 40)
+
+        start = time.perf_counter()
+        raw = list(
+            repository.collection.aggregate(
+                [
+                    {
+                        "$match": {
+                            "response.date": {
+                                "$gte": since.isoformat(),
+                                "$lt": until.isoformat(),
+                            }
+                        }
+                    },
+                    {"$group": {"_id": None, "bet_profit": {"$sum": "$bet_profit"}}},
+                ]
+            )
+        )
+        raw_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        rolled_up = rollup_totals(
+            repository.database[rollup_collection_name("spins", "minute")],
+            since,
+            until,
+        )
+        rollup_ms = (time.perf_counter() - start) * 1000
+        repository.close()
+        print(
+            f"30 minutes of totals: raw spins {raw_ms:.1f} ms, rollups {rollup_ms:.1f} ms"
+        )
+
+        assert len(rolled_up) == 30
+        assert sum(bucket["bet_profit"] for bucket in rolled_up) == raw[0]["bet_profit"]
@@ -0,0 +1,148 @@
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from pymongo import MongoClient
+
+from model.data import FortuneTigerData
+from repository.mongodb.indexes import SPIN_INDEXES, SPIN_KEY_INDEX
+from repository.mongodb.repository import MongoConfig, MongoRepository
+from repository.mongodb.timeseries import (
+    TIME_FIELD,
+    benchmark_storage,
+    date_query,
+    is_timeseries,
+    migrate_to_timeseries,
+    synthetic_documents,
+    timeseries_indexes,
+    to_timeseries_document,
+)
+
+
+class FakeInsertCollection:
+    def __init__(self):
+        self.batches: List[List[Dict]] = []
+
+    def insert_many(self, documents, ordered=True):
+        self.batches.append(list(documents))
+
+
+def _timeseries_repository(**config) -> MongoRepository:
+    return MongoRepository(
+        MongoConfig(
+            connection_string="mongodb://localhost:1",
+            database_name="test",
+            collection_name="spins",
+            collection_type="timeseries",
+            rollups=[],
+            **config,
+        )
+    )
+
+
+class TestTimeSeriesDocuments:
+    def test_adds_the_time_field(self, data_factory):
+        document = to_timeseries_document(data_factory(5).to_document())
+
+        assert document[TIME_FIELD] == datetime(
+            2024, 12, 1, 12, 0, 5, tzinfo=timezone.utc
+        )
+
+    def test_keeps_naive_dates_naive(self):
+        document = to_timeseries_document({"response": {"date": "2024-12-01T12:00:05"}})
+
+        assert document[TIME_FIELD] == datetime(2024, 12, 1, 12, 0, 5)
+
+    def test_date_query_matches_the_stored_date(self, data_factory):
+        document = to_timeseries_document(data_factory(5).to_document())
+        date = data_factory(5).response.date
+
+        assert date_query(True, gte=date) == {TIME_FIELD: {"$gte": document["date"]}}
+        assert date_query(False, gte=date) == {
+            "response.date": {"$gte": document["response"]["date"]}
+        }
+
+    def test_synthetic_spins_read_back_as_spins(self):
+        documents = list(synthetic_documents(300, games=3))
+        data = FortuneTigerData.model_validate(documents[-1])
+
+        assert data.bet_profit == documents[-1]["bet_profit"]
+        assert data.current_balance == documents[-1]["current_balance"]
+        assert data.spin_key == documents[-1]["spin_key"]
+        assert data.game_id == "token-2"
+        assert len({document["spin_key"] for document in documents}) == 300
+
+
+class TestTimeSeriesRepository:
+    def test_inserts_with_the_time_field_and_recent_keys(self, data_factory):
+        repository = _timeseries_repository()
+        collection = FakeInsertCollection()
+        repository.collection = collection
+
+        repository.save_batch([data_factory(0), data_factory(1)])
+        repository.save_batch([data_factory(1), data_factory(2)])
+
+        assert [len(batch) for batch in collection.batches] == [2, 1]
+        assert collection.batches[0][0][TIME_FIELD] == data_factory(0).response.date
+
+    def test_has_no_unique_index(self):
+        specs = _timeseries_repository().index_specs()
+
+        assert specs == timeseries_indexes("game_id")
+        assert SPIN_KEY_INDEX not in specs
+
+
+class TestTimeSeriesOnMongo:
+    def test_create_and_migrate(self, mongo_database, data_factory):
+        connection_string, database_name = mongo_database
+        client = MongoClient(connection_string)
+        database = client[database_name]
+        plain = MongoRepository(
+            MongoConfig(
+                connection_string=connection_string,
+                database_name=database_name,
+                collection_name="spins",
+            )
+        )
+        plain.create_collection()
+        plain.save_batch([data_factory(index) for index in range(50)])
+        plain.close()
+
+        stats = migrate_to_timeseries(database, "spins", batch_size=20)
+        repository = MongoRepository(
+            MongoConfig(
+                connection_string=connection_string,
+                database_name=database_name,
+                collection_name="spins",
+                collection_type="timeseries",
+            )
+        )
+        repository.create_collection()
+        repository.save_data(data_factory(50))
+        stored = list(repository.iter_data())
+        repository.close()
+
+        assert stats.copied == 50
+        assert is_timeseries(database, "spins")
+        assert not is_timeseries(database, "spins_plain")
+        assert len(stored) == 51
+        client.close()
+
+    def test_storage_benchmark(self, mongo_database):
+        connection_string, database_name = mongo_database
+        client = MongoClient(connection_string)
+
+        results = benchmark_storage(
+            client[database_name],
+            {"plain": SPIN_INDEXES + [SPIN_KEY_INDEX], "timeseries": None},
+            spins=50_000,
+            queries=20,
+        )
+        client.close()
+        by_layout = {result.layout: result for result in results}
+        for result in results:
+            print(result)
+
+        assert (
+            by_layout["timeseries"].storage_bytes + by_layout["timeseries"].index_bytes
+            < by_layout["plain"].storage_bytes + by_layout["plain"].index_bytes
+        )
@@ -0,0 +1,239 @@
+import threading
+import time
+from typing import Dict, List
+
+from pymongo import InsertOne, MongoClient
+from pymongo.errors import BulkWriteError, OperationFailure
+from pymongo.results import BulkWriteResult
+
+from repository.mongodb.buffered_writer import BufferedMongoWriter
+from repository.mongodb.indexes import SPIN_KEY_INDEX
+from repository.mongodb.repository import MongoConfig, MongoRepository
+from repository.mongodb.upsert import SPIN_KEY_FIELD, RecentKeys, bulk_upsert
+
+
+class FakeKeyedCollection:
+    """
+    Applies InsertOne and $setOnInsert upserts like mongod does with a unique
+    index on spin_key.
+    """
+
+    def __init__(self, failing_calls: int = 0):
+        self.stored: Dict = {}
+        self.bulk_writes: List[int] = []
+        self.failing_calls = failing_calls
+        self.lock = threading.Lock()
+
+    def bulk_write(self, operations, ordered=True):
+        with self.lock:
+            if self.failing_calls:
+                self.failing_calls -= 1
+                raise OperationFailure("not authorized")
+            self.bulk_writes.append(len(operations))
+            upserted = []
+            errors = []
+            for index, operation in enumerate(operations):
+                if isinstance(operation, InsertOne):
+                    document = operation._doc
+                    key = document.get(SPIN_KEY_FIELD, document["_id"])
+                    if key in self.stored:
+                        errors.append({"index": index, "code": 11000, "errmsg": "dup"})
+                    else:
+                        self.stored[key] = document
+                    continue
+                key = operation._filter[SPIN_KEY_FIELD]
+                if key not in self.stored:
+                    document = operation._doc["$setOnInsert"]
+                    self.stored[key] = document
+                    upserted.append({"index": index, "_id": document["_id"]})
+            result = {"upserted": upserted, "writeErrors": errors}
+            if errors:
+                raise BulkWriteError(result)
+            return BulkWriteResult(result, True)
+
+
+def _documents(data_factory, indexes) -> List[Dict]:
+    documents = []
+    for index in indexes:
+        document = data_factory(index).to_document()
+        document["_id"] = f"id-{index}"
+        documents.append(document)
+    return documents
+
+
+def _repository(collection, **config) -> MongoRepository:
+    repository = MongoRepository(
+        MongoConfig(
+            connection_string="mongodb://localhost:1",
+            database_name="test",
+            collection_name="spins",
+            rollups=[],
+            **config,
+        )
+    )
+    repository.collection = collection
+    if repository._writer is not None:
+        repository._writer._collection = collection
+    return repository
+
+
+class TestSpinKey:
+    def test_key_is_game_and_spin_id(self, data_factory):
+        assert data_factory(3, game_id="token-9").spin_key == "token-9:1003"
+        assert data_factory(3).to_document()["spin_key"] == "token-1:1003"
+
+    def test_spin_without_id_is_keyed_by_its_payload(self, data_factory):
+        data = data_factory(3)
+        del data.response.body["dt"]["si"]["sid"]
+        other = data_factory(4)
+        del other.response.body["dt"]["si"]["sid"]
+
+        assert data.spin_key.startswith("token-1:")
+        assert data.spin_key != other.spin_key
+
+    def test_error_response_has_no_key(self, data_factory):
+        data = data_factory()
+        data = data.model_copy(
+            update={
+                "response": data.response.model_copy(
+                    update={"body": {"dt": None, "err": {"cd": "1302"}}}
+                )
+            }
+        )
+
+        assert data.spin_key is None
+
+
+class TestRecentKeys:
+    def test_forgets_the_least_recently_seen(self):
+        keys = RecentKeys(capacity=2)
+        keys.add("a")
+        keys.add("b")
+        assert "a" in keys
+        keys.add("c")
+
+        assert "a" in keys
+        assert "b" not in keys
+        assert len(keys) == 2
+        assert None not in keys
+
+
+class TestBulkUpsert:
+    def test_writing_twice_is_a_no_op(self, data_factory):
+        collection = FakeKeyedCollection()
+
+        first = bulk_upsert(collection, _documents(data_factory, range(3)))
+        second = bulk_upsert(collection, _documents(data_factory, range(2, 5)))
+
+        assert first.written == [0, 1, 2]
+        assert second.written == [1, 2]
+        assert second.duplicates == 1
+        assert len(collection.stored) == 5
+
+    def test_documents_without_key_are_inserted(self, data_factory):
+        collection = FakeKeyedCollection()
+        documents = _documents(data_factory, range(2))
+        documents[1][SPIN_KEY_FIELD] = None
+
+        result = bulk_upsert(collection, documents)
+
+        assert result.written == [0, 1]
+        assert result.errors == []
+
+
+class TestDeduplicatingRepository:
+    def test_recent_duplicates_skip_the_round_trip(self, data_factory):
+        collection = FakeKeyedCollection()
+        repository = _repository(collection)
+
+        saved = repository.save_batch([data_factory(0), data_factory(1)])
+        again = repository.save_batch([data_factory(1), data_factory(2)])
+        duplicate = repository.save_data(data_factory(2))
+
+        assert len(saved) == 2
+        assert len(again) == 1
+        assert duplicate is None
+        assert collection.bulk_writes == [2, 1]
+        assert len(collection.stored) == 3
+
+    def test_duplicates_the_filter_forgot_are_dropped_by_the_upsert(self, data_factory):
+        collection = FakeKeyedCollection()
+        repository = _repository(collection, recent_keys=0)
+
+        repository.save_batch([data_factory(0), data_factory(0), data_factory(1)])
+        again = repository.save_batch([data_factory(1), data_factory(2)])
+
+        assert len(again) == 1
+        assert collection.bulk_writes == [2, 2]
+        assert len(collection.stored) == 3
+
+    def test_unique_index_only_with_deduplicate(self):
+        assert SPIN_KEY_INDEX in _repository(None).index_specs()
+        assert SPIN_KEY_INDEX not in _repository(None, deduplicate=False).index_specs()
+
+    def test_buffered_writer_upserts(self, data_factory):
+        collection = FakeKeyedCollection()
+        writer = BufferedMongoWriter(
+            collection, batch_size=3, upsert_key=SPIN_KEY_FIELD
+        )
+        for document in _documents(data_factory, [0, 1, 1, 2]):
+            writer.submit(document)
+        writer.close()
+        stats = writer.stats()
+
+        assert stats.written == 3
+        assert stats.duplicates == 1
+        assert stats.failed == 0
+
+
+    def test_buffered_spins_are_remembered_once_written(self, data_factory):
+        collection = FakeKeyedCollection(failing_calls=1)
+        repository = _repository(
+            collection, buffered=True, flush_interval_seconds=0.01
+        )
+
+        repository.save_data(data_factory(0))
+        deadline = time.monotonic() + 5
+        while repository._writer.stats().failed == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # The batch was dropped, so the retry of the spin is not a duplicate
+        retried = repository.save_data(data_factory(0))
+        repository.close()
+
+        assert retried is not None
+        assert len(collection.stored) == 1
+        assert data_factory(0).spin_key in repository._recent_keys
+
+
+class TestDeduplicationOnMongo:
+    def test_retried_spins_are_stored_once(self, mongo_database, data_factory):
+        connection_string, database_name = mongo_database
+        config = dict(
+            connection_string=connection_string,
+            database_name=database_name,
+            collection_name="spins",
+        )
+        data = [data_factory(index) for index in range(1000)]
+        results = {}
+        for name, recent_keys in (("upsert", 0), ("filtered", 100_000)):
+            repository = MongoRepository(MongoConfig(recent_keys=recent_keys, **config))
+            repository.create_collection()
+            repository.save_batch(data[:500])
+            start = time.perf_counter()
+            # A retry after a frozen game sends the last spins again
+            repository.save_batch(data[250:])
+            results[name] = time.perf_counter() - start
+            repository.close()
+            MongoClient(connection_string)[database_name]["spins"].drop()
+        print(
+            f"overlapping batch: upserts only {results['upsert'] * 1000:.1f} ms, "
+            f"with recent keys {results['filtered'] * 1000:.1f} ms"
+        )
+
+        repository = MongoRepository(MongoConfig(**config))
+        repository.create_collection()
+        repository.save_batch(data[:500])
+        repository.save_batch(data[250:])
+        stored = repository.collection.count_documents({})
+        repository.close()
+        assert stored == 1000
@@ -0,0 +1,186 @@
+import os
+import time
+
+from repository.mongodb.repository import MongoConfig, MongoRepository
+from repository.segment_log.repository import SegmentLogRepository
+from repository.segment_log.segment import (
+    SegmentLogConfig,
+    SegmentReader,
+    SegmentWriter,
+    list_segments,
+    read_index,
+)
+from repository.segment_log.shipper import SegmentShipper, ShipperConfig
+from tests.supervisor.supervisor_test import InMemoryRepository
+
+
+def _config(tmp_path, **options) -> SegmentLogConfig:
+    options.setdefault("block_records", 10)
+    return SegmentLogConfig(directory=str(tmp_path / "segments"), **options)
+
+
+def _records(start: int, end: int):
+    return [f"record-{index}".encode() for index in range(start, end)]
+
+
+class TestSegmentWriter:
+    def test_rotates_segments_with_consecutive_offsets(self, tmp_path):
+        config = _config(tmp_path, segment_bytes=200)
+        writer = SegmentWriter(config).open()
+
+        offsets = [writer.append([record])[0] for record in _records(0, 100)]
+        writer.close()
+        segments = list_segments(config.directory)
+
+        assert offsets == list(range(100))
+        assert len(segments) > 1
+        assert all(segment.closed for segment in segments)
+        assert list(SegmentReader(config.directory).read()) == list(
+            enumerate(_records(0, 100))
+        )
+
+    def test_reads_from_an_offset_through_the_sparse_index(self, tmp_path):
+        config = _config(tmp_path)
+        writer = SegmentWriter(config).open()
+        writer.append(_records(0, 95))
+        writer.close()
+        (segment,) = list_segments(config.directory)
+
+        assert [entry[0] for entry in read_index(segment.index_path)] == list(
+            range(0, 100, 10)
+        )
+        assert list(SegmentReader(config.directory).read(57))[0] == (57, b"record-57")
+
+    def test_fsync_always_writes_a_block_per_append(self, tmp_path):
+        config = _config(tmp_path, fsync="always")
+        writer = SegmentWriter(config).open()
+        writer.append(_records(0, 3))
+        writer.append(_records(3, 4))
+
+        (segment,) = list_segments(config.directory)
+        assert not segment.closed
+        assert len(read_index(segment.index_path)) == 2
+        assert len(list(SegmentReader(config.directory).read())) == 4
+        writer.close()
+
+    def test_recovers_a_segment_cut_by_a_crash(self, tmp_path):
+        config = _config(tmp_path, fsync="always")
+        writer = SegmentWriter(config).open()
+        writer.append(_records(0, 5))
+        writer.append(_records(5, 8))
+        (segment,) = list_segments(config.directory)
+        writer._segment_file.close()
+        writer._index_file.close()
+        with open(segment.path, "r+b") as segment_file:
+            segment_file.truncate(os.path.getsize(segment.path) - 3)
+
+        recovered = SegmentWriter(config).open()
+        offsets = recovered.append(_records(5, 6))
+        recovered.close()
+
+        assert offsets == [5]
+        assert [offset for offset, _ in SegmentReader(config.directory).read()] == (
+            list(range(6))
+        )
+
+
+class TestSegmentLogRepository:
+    def test_round_trips_spins(self, tmp_path, data_factory):
+        repository = SegmentLogRepository(_config(tmp_path))
+        assert repository.ping()
+        assert repository.create_collection()
+        data = [data_factory(index) for index in range(25)]
+
+        ids = repository.save_batch(data[:20]) + [repository.save_data(data[20])]
+        read = list(repository.iter_data(from_offset=5, limit=10))
+        repository.close()
+
+        assert ids == [str(index) for index in range(21)]
+        assert [item.spin_key for item in read] == [
+            item.spin_key for item in data[5:15]
+        ]
+        assert read[0].response.date == data[5].response.date
+
+    def test_reads_records_from_a_date_on(self, tmp_path, data_factory):
+        repository = SegmentLogRepository(_config(tmp_path))
+        assert repository.create_collection()
+        data = [data_factory(index) for index in range(10)]
+        repository.save_batch(data)
+
+        since = list(repository.iter_records_since(data[6].response.date))
+        everything = list(repository.iter_records_since(None))
+        repository.close()
+
+        assert [record.key for record in since] == [
+            item.spin_key for item in data[6:]
+        ]
+        assert len(everything) == 10
+
+
+class TestSegmentShipper:
+    def test_ships_closed_segments_once(self, tmp_path, data_factory):
+        config = _config(tmp_path)
+        repository = SegmentLogRepository(config)
+        repository.save_batch([data_factory(index) for index in range(15)])
+        repository.close()
+        repository.save_batch([data_factory(index) for index in range(15, 20)])
+        target = InMemoryRepository()
+        shipper = SegmentShipper(config.directory, target, ShipperConfig(batch_size=4))
+
+        first = shipper.ship_closed()
+        second = shipper.ship_closed()
+        repository.close()
+        third = shipper.ship_closed()
+
+        assert (first.records, second.records, third.records) == (15, 0, 5)
+        assert [data.spin_key for data in target.saved] == [
+            data_factory(index).spin_key for index in range(20)
+        ]
+
+    def test_offsets_continue_after_deleting_shipped_segments(
+        self, tmp_path, data_factory
+    ):
+        config = _config(tmp_path)
+        repository = SegmentLogRepository(config)
+        repository.save_batch([data_factory(index) for index in range(5)])
+        repository.close()
+        SegmentShipper(
+            config.directory, InMemoryRepository(), ShipperConfig(delete_shipped=True)
+        ).ship_closed()
+
+        assert list_segments(config.directory) == []
+        repository = SegmentLogRepository(config)
+        assert repository.save_data(data_factory(5)) == "5"
+        repository.close()
+
+
+class TestSegmentLogBenchmark:
+    def test_appends_faster_than_mongo_inserts(
+        self, tmp_path, mongo_database, data_factory
+    ):
+        connection_string, database_name = mongo_database
+        data = [data_factory(index) for index in range(5000)]
+        repositories = {
+            "segment_log": SegmentLogRepository(_config(tmp_path, block_records=100)),
+            "mongo": MongoRepository(
+                MongoConfig(
+                    connection_string=connection_string,
+                    database_name=database_name,
+                    collection_name="spins",
+                )
+            ),
+        }
+        results = {}
+        for name, repository in repositories.items():
+            repository.create_collection()
+            start = time.perf_counter()
+            for item in data:
+                repository.save_data(item)
+            repository.close()
+            results[name] = len(data) / (time.perf_counter() - start)
+        print(
+            f"save_data: segment log {results['segment_log']:.0f}/s, "
+            f"mongodb {results['mongo']:.0f}/s"
+        )
+
+        assert results["segment_log"] > results["mongo"]
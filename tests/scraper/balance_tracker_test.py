@@ -0,0 +1,198 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from scraper.archive import TrafficArchive
+from scraper.balance_tracker import BalanceState, BalanceTracker
+from scraper.image_recognizer import Frame, ScraperImageRecognizer, Screenshot
+from scraper.scraper import FortuneTigerGame, FortuneTigerScraper, ScraperConfig
+from scraper.traffic import to_fortune_tiger_data
+
+ENABLED = Screenshot(image_bytes=b"enabled", width=540, height=960, extension="png")
+
+
+class CountingRecognizer(ScraperImageRecognizer):
+    def __init__(self, balance_in_cents: int):
+        self.balance_in_cents = balance_in_cents
+        self.balance_reads = 0
+
+    def get_bet_value(self, frame: Frame) -> int:
+        return 4500
+
+    def get_balance_in_cents(self, frame: Frame) -> int:
+        self.balance_reads += 1
+        return self.balance_in_cents
+
+    def check_if_is_enabled_to_play(self, frame: Frame) -> bool:
+        return True
+
+
+class BatchScraper(FortuneTigerScraper):
+    """
+    Plays one batch per given spin without a browser, each spin reporting the
+    balance left.
+    """
+
+    def __init__(self, spins, **kwargs):
+        super().__init__(**kwargs)
+        self.spins = list(spins)
+        self.batches = 0
+
+    def open_game(self, headless: bool = True) -> FortuneTigerGame:
+        return FortuneTigerGame.model_construct()
+
+    def _start_automate_bet(self, game):
+        pass
+
+    def _wait_for_batch(self, game, spins_target) -> Frame:
+        self._balance_tracker.process_data(self.spins[self.batches])
+        self.batches += 1
+        return Frame(ENABLED)
+
+    def _notify_subscribers(self, driver, subscribers):
+        pass
+
+
+def _spin(spin_exchange_factory, spin_body_factory, balance, seconds=0):
+    request, response = spin_exchange_factory(body=spin_body_factory(balance=balance))
+    response.date += timedelta(seconds=seconds)
+    return to_fortune_tiger_data(request, response)
+
+
+class TestBalanceTracker:
+    def test_follows_the_latest_spin(self, spin_exchange_factory, spin_body_factory):
+        tracker = BalanceTracker()
+        assert tracker.state == BalanceState.UNKNOWN
+
+        tracker.process_data(_spin(spin_exchange_factory, spin_body_factory, 99.5, 1))
+        tracker.process_data(_spin(spin_exchange_factory, spin_body_factory, 98, 2))
+        # a spin answered earlier but delivered late is ignored
+        tracker.process_data(_spin(spin_exchange_factory, spin_body_factory, 99.5, 1))
+
+        assert tracker.state == BalanceState.TRACKING
+        assert tracker.balance_in_cents == 9800
+        assert tracker.spins == 3
+
+    def test_check_flags_discrepancies(self, spin_exchange_factory, spin_body_factory):
+        tracker = BalanceTracker(tolerance_cents=1)
+        tracker.process_data(_spin(spin_exchange_factory, spin_body_factory, 98))
+
+        assert tracker.check(9801)
+        assert not tracker.check(9700)
+        assert tracker.state == BalanceState.DIVERGED
+        assert tracker.discrepancies == 1
+        assert tracker.check(9800)
+        assert tracker.state == BalanceState.TRACKING
+
+
+class TestScraperBalance:
+    def _record_batches(self, path, spin_exchange_factory, spin_body_factory, batches):
+        archive = TrafficArchive(str(path)).open_for_recording()
+        for batch in range(batches):
+            request, response = spin_exchange_factory(
+                body=spin_body_factory(balance=995)
+            )
+            response.date = datetime(2024, 12, 1, tzinfo=timezone.utc) + timedelta(
+                seconds=batch
+            )
+            archive.record_exchange(request, response)
+            archive.record_screenshot(ENABLED)
+        archive.close()
+        return archive
+
+    def test_reads_the_screen_only_to_check(
+        self, tmp_path, spin_exchange_factory, spin_body_factory
+    ):
+        archive = self._record_batches(
+            tmp_path, spin_exchange_factory, spin_body_factory, batches=6
+        )
+        recognizer = CountingRecognizer(balance_in_cents=99500)
+        scraper = FortuneTigerScraper(
+            image_recognizer=recognizer,
+            config=ScraperConfig(ocr_balance_check_every_batches=3),
+        )
+
+        scraper.replay_data(archive, [])
+
+        assert recognizer.balance_reads == 2
+
+    def test_checks_every_batch_while_diverged(
+        self, tmp_path, spin_exchange_factory, spin_body_factory
+    ):
+        archive = self._record_batches(
+            tmp_path, spin_exchange_factory, spin_body_factory, batches=6
+        )
+        recognizer = CountingRecognizer(balance_in_cents=1)
+        scraper = FortuneTigerScraper(
+            image_recognizer=recognizer,
+            config=ScraperConfig(ocr_balance_check_every_batches=3),
+        )
+
+        scraper.replay_data(archive, [])
+
+        # the first check fails at the third batch, then every batch is checked
+        assert recognizer.balance_reads == 4
+
+    def _tracking_scraper(self, spin_exchange_factory, spin_body_factory, **config):
+        recognizer = CountingRecognizer(balance_in_cents=1)
+        scraper = FortuneTigerScraper(
+            image_recognizer=recognizer, config=ScraperConfig(**config)
+        )
+        scraper._track_balance([])
+        scraper._balance_tracker.process_data(
+            _spin(spin_exchange_factory, spin_body_factory, 995)
+        )
+        return scraper
+
+    def test_returns_the_tracked_balance_while_diverged(
+        self, spin_exchange_factory, spin_body_factory
+    ):
+        scraper = self._tracking_scraper(
+            spin_exchange_factory,
+            spin_body_factory,
+            ocr_balance_check_every_batches=1,
+        )
+
+        assert scraper._read_balance(Frame(ENABLED)) == 99500
+        assert scraper._balance_tracker.state == BalanceState.DIVERGED
+
+    def test_unreadable_screen_is_not_a_balance(
+        self, spin_exchange_factory, spin_body_factory
+    ):
+        spins = [
+            _spin(spin_exchange_factory, spin_body_factory, balance, seconds)
+            for seconds, balance in enumerate([995, 990, 985, 0])
+        ]
+        recognizer = CountingRecognizer(balance_in_cents=0)
+        scraper = BatchScraper(
+            spins,
+            image_recognizer=recognizer,
+            config=ScraperConfig(ocr_balance_check_every_batches=1),
+        )
+
+        scraper.scrape_data([])
+
+        # every batch was checked, and only the spins ended the session
+        assert scraper.batches == 4
+        assert recognizer.balance_reads == 4
+        assert scraper._balance_tracker.discrepancies == 0
+
+    def test_unknown_balance_stops_the_session_after_a_few_batches(self):
+        scraper = FortuneTigerScraper(
+            image_recognizer=CountingRecognizer(balance_in_cents=0),
+            config=ScraperConfig(max_unknown_balance_batches=2),
+        )
+        scraper._track_balance([])
+
+        assert scraper._read_balance(Frame(ENABLED)) is None
+        assert scraper._read_balance(Frame(ENABLED)) == 0
+
+    def test_does_not_wait_for_spins_that_never_reach_the_tracker(
+        self, spin_exchange_factory, spin_body_factory
+    ):
+        scraper = self._tracking_scraper(spin_exchange_factory, spin_body_factory)
+        # counted by the interceptor, but its body could not be decoded
+        scraper._intercept_response(*spin_exchange_factory(content_encoding="unknown"))
+        started_at = time.monotonic()
+
+        assert scraper._read_balance(Frame(ENABLED)) == 99500
+        assert time.monotonic() - started_at < 0.5
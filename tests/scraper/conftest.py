@@ -0,0 +1,65 @@
+import time
+from typing import List
+
+import pytest
+
+from model.data import FortuneTigerData
+from scraper.archive import TrafficArchive
+from scraper.image_recognizer import Frame, ScraperImageRecognizer, Screenshot
+from scraper.subscriber.interface import FortuneTigerSubscriber
+
+ENABLED = Screenshot(image_bytes=b"enabled", width=540, height=960, extension="png")
+BUSY = Screenshot(image_bytes=b"busy", width=540, height=960, extension="png")
+
+
+class StubRecognizer(ScraperImageRecognizer):
+    def get_bet_value(self, frame: Frame) -> int:
+        return 4500
+
+    def get_balance_in_cents(self, frame: Frame) -> int:
+        return 100000
+
+    def check_if_is_enabled_to_play(self, frame: Frame) -> bool:
+        return frame.screenshot.image_bytes == ENABLED.image_bytes
+
+
+class CollectingSubscriber(FortuneTigerSubscriber):
+    def __init__(self):
+        self.received: List[FortuneTigerData] = []
+
+    def process_data(self, data: FortuneTigerData):
+        self.received.append(data)
+
+
+@pytest.fixture
+def stub_recognizer():
+    return StubRecognizer()
+
+
+@pytest.fixture
+def collecting_subscriber_factory():
+    return CollectingSubscriber
+
+
+@pytest.fixture
+def session_recorder(spin_exchange_factory):
+    """
+    Records two batches, of two spins of g1 and one of g2, each ended by a
+    screenshot enabled to play.
+    """
+
+    def record(path, pause: float = 0) -> TrafficArchive:
+        archive = TrafficArchive(str(path)).open_for_recording()
+        archive.record_screenshot(BUSY)
+        for _ in range(2):
+            archive.record_exchange(*spin_exchange_factory(game_id="g1"))
+            time.sleep(pause)
+        archive.record_screenshot(BUSY)
+        archive.record_screenshot(ENABLED)
+        archive.record_exchange(*spin_exchange_factory(game_id="g2"))
+        time.sleep(pause)
+        archive.record_screenshot(ENABLED)
+        archive.close()
+        return archive
+
+    return record
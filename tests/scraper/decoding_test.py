@@ -0,0 +1,147 @@
+import gzip
+import json
+import time
+from typing import Callable, List, Tuple
+from urllib.parse import parse_qs
+
+import pytest
+import zstandard
+
+from model.data import FortuneTigerData, FortuneTigerRequest, FortuneTigerResponse
+from scraper.archive import SpinEvent, TrafficArchive
+from scraper.decoding import UnsupportedEncoding, decode_body, parse_form
+from scraper.traffic import to_fortune_tiger_data
+
+ENCODINGS = ["gzip", "br", "zstd", "deflate", "identity", None]
+
+# Recorded spins per encoding in the benchmark session
+SPINS = 300
+
+
+class TestDecodeBody:
+    @pytest.mark.parametrize("content_encoding", ENCODINGS)
+    def test_decodes_spins_in_every_encoding(
+        self, spin_exchange_factory, spin_body_factory, content_encoding
+    ):
+        request, response = spin_exchange_factory(content_encoding=content_encoding)
+
+        data = to_fortune_tiger_data(request, response)
+
+        assert data.response.body == spin_body_factory()
+        assert data.request.body["atk"] == ["token-1"]
+
+    def test_zstd_frame_without_content_size(self, spin_body_factory):
+        raw_body = json.dumps(spin_body_factory()).encode()
+        compressor = zstandard.ZstdCompressor().compressobj()
+        body = compressor.compress(raw_body) + compressor.flush()
+
+        assert decode_body(body, "zstd") == raw_body
+
+    def test_undoes_stacked_codings_in_reverse(self):
+        body = gzip.compress(b'{"a": 1}')
+
+        assert decode_body(body, "identity, GZIP") == b'{"a": 1}'
+
+    @pytest.mark.parametrize("content_encoding", ["gzip, ", "gzip,,identity", " ,gzip"])
+    def test_skips_empty_list_elements(self, content_encoding):
+        body = gzip.compress(b'{"a": 1}')
+
+        assert decode_body(body, content_encoding) == b'{"a": 1}'
+
+    def test_unsupported_coding(self, spin_exchange_factory):
+        request, response = spin_exchange_factory(content_encoding="compress")
+
+        with pytest.raises(UnsupportedEncoding):
+            decode_body(response.body, "compress")
+        assert to_fortune_tiger_data(request, response) is None
+
+    def test_form_body_matches_parse_qs(self):
+        body = b"id=1&atk=token-1&cs=0.3&ml=10&wk=0_C"
+
+        assert parse_form(body) == parse_qs(body.decode())
+
+
+def legacy_decode(event: SpinEvent):
+    # What to_fortune_tiger_data did before the decoding layer
+    request, response = event.request, event.response
+    if "gzip" not in response.headers.get("content-encoding"):
+        return None
+    return FortuneTigerData.trusted(
+        request=FortuneTigerRequest.model_construct(
+            body=parse_qs(request.body.decode()),
+            headers=dict(request.headers),
+            host=request.host,
+            method=request.method,
+            path=request.path,
+            url=request.url,
+            query_string=request.querystring,
+        ),
+        response=FortuneTigerResponse.model_construct(
+            headers=dict(response.headers),
+            status_code=response.status_code,
+            body=json.loads(gzip.decompress(response.body)),
+            date=response.date,
+        ),
+    )
+
+
+def current_decode(event: SpinEvent):
+    return to_fortune_tiger_data(event.request, event.response)
+
+
+def _measure(
+    decode: Callable[[SpinEvent], object], events: List[SpinEvent]
+) -> Tuple[int, float]:
+    """
+    :return: The spins decoded and the CPU microseconds per recorded spin.
+    """
+    decoded = 0
+    start = time.process_time()
+    for event in events:
+        try:
+            decoded += decode(event) is not None
+        except (TypeError, ValueError):
+            pass
+    cpu_seconds = time.process_time() - start
+    return decoded, cpu_seconds / len(events) * 1e6
+
+
+@pytest.fixture
+def recorded_events(tmp_path, spin_exchange_factory, spin_body_factory):
+    def record(encodings: List[str]) -> List[SpinEvent]:
+        archive = TrafficArchive(str(tmp_path / "-".join(map(str, encodings))))
+        archive.open_for_recording()
+        for index in range(SPINS):
+            for content_encoding in encodings:
+                body = spin_body_factory(balance=100000 - index)
+                archive.record_exchange(
+                    *spin_exchange_factory(body, content_encoding=content_encoding)
+                )
+        archive.close()
+        return [event for event in archive.events() if isinstance(event, SpinEvent)]
+
+    return record
+
+
+class TestDecodingBenchmark:
+    def test_no_recorded_spin_is_lost(self, recorded_events):
+        events = recorded_events(["gzip", "br", "zstd", None])
+
+        legacy, _ = _measure(legacy_decode, events)
+        current, _ = _measure(current_decode, events)
+        print(f"decoded: legacy {legacy}/{len(events)}, current {current}")
+
+        assert legacy == SPINS
+        assert current == len(events)
+
+    def test_gzip_costs_less_cpu_per_spin(self, recorded_events):
+        events = recorded_events(["gzip"])
+        # Warm up both paths before measuring
+        _measure(legacy_decode, events)
+        _measure(current_decode, events)
+
+        _, legacy = _measure(legacy_decode, events)
+        _, current = _measure(current_decode, events)
+        print(f"gzip CPU per spin: legacy {legacy:.1f} us, current {current:.1f} us")
+
+        assert current < legacy
@@ -0,0 +1,225 @@
+import threading
+from typing import List
+
+from model.data import FortuneTigerData
+from monitoring import PipelineMetrics
+from scraper.scraper import FortuneTigerScraper, ScraperConfig
+from scraper.subscriber.dispatcher import (
+    DispatcherConfig,
+    SpillFile,
+    SubscriberDispatcher,
+)
+from scraper.subscriber.interface import FortuneTigerSubscriber
+from scraper.traffic import to_fortune_tiger_data
+
+
+class BatchCollectingSubscriber(FortuneTigerSubscriber):
+    def __init__(self):
+        self.batches: List[List[FortuneTigerData]] = []
+
+    def process_data(self, data: FortuneTigerData):
+        self.batches.append([data])
+
+    def process_batch(self, batch: List[FortuneTigerData]):
+        self.batches.append(list(batch))
+
+    @property
+    def game_ids(self) -> List[str]:
+        return [data.game_id for batch in self.batches for data in batch]
+
+
+class GatedSubscriber(BatchCollectingSubscriber):
+    """
+    Holds its first batch until released.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def process_batch(self, batch: List[FortuneTigerData]):
+        self.started.set()
+        self.release.wait(5)
+        super().process_batch(batch)
+
+
+class FailingSubscriber(FortuneTigerSubscriber):
+    def process_data(self, data: FortuneTigerData):
+        raise RuntimeError("sink is down")
+
+
+def _spins(spin_exchange_factory, count: int) -> List[FortuneTigerData]:
+    return [
+        to_fortune_tiger_data(*spin_exchange_factory(game_id=f"g{index}"))
+        for index in range(count)
+    ]
+
+
+def _dispatch(subscribers, **config):
+    dispatcher = SubscriberDispatcher(
+        subscribers, DispatcherConfig(**config), metrics=PipelineMetrics()
+    )
+    dispatcher.start()
+    return dispatcher
+
+
+class TestSubscriberDispatcher:
+    def test_waits_for_one_subscriber_only(self, spin_exchange_factory):
+        gated = GatedSubscriber()
+        collecting = BatchCollectingSubscriber()
+        dispatcher = _dispatch([gated, collecting])
+
+        for data in _spins(spin_exchange_factory, 3):
+            dispatcher.process_data(data)
+        gated.started.wait(5)
+
+        assert dispatcher.wait_until_idle(5, subscriber=collecting)
+        assert not dispatcher.wait_until_idle(0.05)
+        gated.release.set()
+        dispatcher.stop()
+
+    def test_slow_subscriber_does_not_hold_back_the_others(self, spin_exchange_factory):
+        gated = GatedSubscriber()
+        collecting = BatchCollectingSubscriber()
+        dispatcher = _dispatch([gated, collecting])
+
+        for data in _spins(spin_exchange_factory, 5):
+            dispatcher.process_data(data)
+        gated.started.wait(5)
+        fast_worker = dispatcher._workers[1]
+        assert fast_worker.wait_until_idle(5)
+        assert collecting.game_ids == ["g0", "g1", "g2", "g3", "g4"]
+        assert gated.game_ids == []
+
+        gated.release.set()
+        dispatcher.stop()
+        assert gated.game_ids == collecting.game_ids
+
+    def test_failures_are_counted_per_subscriber(self, spin_exchange_factory):
+        metrics = PipelineMetrics()
+        collecting = BatchCollectingSubscriber()
+        dispatcher = SubscriberDispatcher(
+            [FailingSubscriber(), collecting], metrics=metrics
+        )
+        dispatcher.start()
+        for data in _spins(spin_exchange_factory, 3):
+            dispatcher.process_data(data)
+        dispatcher.stop()
+
+        failing, healthy = dispatcher.stats()
+        assert (failing.delivered, failing.failed) == (0, 3)
+        assert (healthy.delivered, healthy.failed) == (3, 0)
+        stages = metrics.snapshot()
+        assert stages["subscriber_FailingSubscriber"].errors >= 1
+        assert stages["subscriber_BatchCollectingSubscriber"].errors == 0
+
+    def test_queued_records_are_delivered_in_batches(self, spin_exchange_factory):
+        gated = GatedSubscriber()
+        dispatcher = _dispatch([gated], max_batch_size=3)
+        spins = _spins(spin_exchange_factory, 7)
+        dispatcher.process_data(spins[0])
+        gated.started.wait(5)
+        for data in spins[1:]:
+            dispatcher.process_data(data)
+        gated.release.set()
+        dispatcher.stop()
+
+        assert [len(batch) for batch in gated.batches] == [1, 3, 3]
+
+    def test_drop_oldest_keeps_the_newest(self, spin_exchange_factory):
+        gated = GatedSubscriber()
+        dispatcher = _dispatch([gated], queue_size=2, overflow="drop_oldest")
+        spins = _spins(spin_exchange_factory, 6)
+        dispatcher.process_data(spins[0])
+        gated.started.wait(5)
+        for data in spins[1:]:
+            dispatcher.process_data(data)
+        gated.release.set()
+        dispatcher.stop()
+
+        assert gated.game_ids == ["g0", "g4", "g5"]
+        assert dispatcher.stats()[0].dropped == 3
+
+    def test_spill_delivers_everything_in_order(self, spin_exchange_factory, tmp_path):
+        gated = GatedSubscriber()
+        dispatcher = _dispatch(
+            [gated], queue_size=2, overflow="spill", spill_dir=str(tmp_path)
+        )
+        spins = _spins(spin_exchange_factory, 8)
+        dispatcher.process_data(spins[0])
+        gated.started.wait(5)
+        for data in spins[1:]:
+            dispatcher.process_data(data)
+        stats = dispatcher.stats()[0]
+        gated.release.set()
+        dispatcher.stop()
+
+        assert stats.spilled == 5
+        assert gated.game_ids == [f"g{index}" for index in range(8)]
+        assert list(tmp_path.iterdir()) == []
+
+    def test_spill_left_by_a_crash_is_delivered_first(
+        self, spin_exchange_factory, tmp_path
+    ):
+        spins = _spins(spin_exchange_factory, 3)
+        spill = SpillFile(str(tmp_path / "BatchCollectingSubscriber.jsonl"))
+        spill.append(spins[0])
+        spill.append(spins[1])
+        spill.close()
+        # a record cut in the middle of writing
+        with open(tmp_path / "BatchCollectingSubscriber.jsonl", "ab") as spill_file:
+            spill_file.write(b'{"request": {"hea')
+        collecting = BatchCollectingSubscriber()
+
+        dispatcher = _dispatch([collecting], overflow="spill", spill_dir=str(tmp_path))
+        dispatcher.process_data(spins[2])
+        dispatcher.stop()
+
+        assert collecting.game_ids == ["g0", "g1", "g2"]
+        assert dispatcher.stats()[0].failed == 1
+        assert list(tmp_path.iterdir()) == []
+
+    def test_block_waits_for_room(self, spin_exchange_factory):
+        gated = GatedSubscriber()
+        dispatcher = _dispatch([gated], queue_size=1, overflow="block")
+        spins = _spins(spin_exchange_factory, 3)
+        dispatcher.process_data(spins[0])
+        gated.started.wait(5)
+        dispatcher.process_data(spins[1])
+        publisher = threading.Thread(target=dispatcher.process_data, args=(spins[2],))
+        publisher.start()
+        publisher.join(0.2)
+        assert publisher.is_alive()
+
+        gated.release.set()
+        publisher.join(5)
+        dispatcher.stop()
+        assert gated.game_ids == ["g0", "g1", "g2"]
+
+
+class TestScraperFanOut:
+    def test_replay_through_the_dispatcher(
+        self, tmp_path, session_recorder, stub_recognizer, collecting_subscriber_factory
+    ):
+        archive = session_recorder(tmp_path)
+        subscriber = collecting_subscriber_factory()
+        scraper = FortuneTigerScraper(
+            image_recognizer=stub_recognizer,
+            config=ScraperConfig(dispatch_subscribers=True),
+        )
+
+        scraper.replay_data(archive, [subscriber])
+
+        assert [data.game_id for data in subscriber.received] == ["g1", "g1", "g2"]
+
+    def test_failing_subscriber_does_not_stop_the_batch(
+        self, tmp_path, session_recorder, stub_recognizer, collecting_subscriber_factory
+    ):
+        archive = session_recorder(tmp_path)
+        subscriber = collecting_subscriber_factory()
+        scraper = FortuneTigerScraper(image_recognizer=stub_recognizer)
+
+        scraper.replay_data(archive, [FailingSubscriber(), subscriber])
+
+        assert len(subscriber.received) == 3
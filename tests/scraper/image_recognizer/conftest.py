@@ -0,0 +1,159 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from scraper.image_recognizer import Frame, Screenshot
+from scraper.image_recognizer.calibration import LABELS_FILE_NAME
+from scraper.image_recognizer.play_button import (
+    DISABLED_BUTTON_PATH,
+    ENABLED_BUTTON_PATH,
+)
+from scraper.image_recognizer.regions import (
+    balance_region,
+    bet_region,
+    play_button_region,
+)
+
+CANVAS_SIZE = (540, 960)
+BACKGROUND = (120, 20, 20)
+
+
+def _draw_text(draw: ImageDraw.ImageDraw, region, text: str, x: int) -> None:
+    font = ImageFont.load_default(size=22)
+    for char in text:
+        draw.text((x, region[1] + 10), char, fill=(255, 255, 255), font=font)
+        x += int(draw.textlength(char, font=font)) + 3
+
+
+def render_frame(balance_text: str, bet_text: str, enabled: bool = True) -> bytes:
+    """
+    Paint a synthetic game canvas with the given texts at the regions the
+    recognizers crop, and the play button in the requested state.
+    """
+    width, height = CANVAS_SIZE
+    image = Image.new("RGB", CANVAS_SIZE, BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    # The balance crop overlaps the bet crop, so the bet is drawn past it as in game
+    balance_box = balance_region(width, height)
+    bet_box = bet_region(width, height)
+    _draw_text(draw, balance_box, balance_text, balance_box[0] + 6)
+    _draw_text(draw, bet_box, bet_text, balance_box[2] + 10)
+    button_box = play_button_region(width, height)
+    button_path = ENABLED_BUTTON_PATH if enabled else DISABLED_BUTTON_PATH
+    with Image.open(button_path) as button:
+        button = button.resize(
+            (button_box[2] - button_box[0], button_box[3] - button_box[1])
+        )
+        image.paste(button, button_box[:2])
+    output = BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def make_screenshot(image_bytes: bytes) -> Screenshot:
+    return Screenshot(
+        image_bytes=image_bytes,
+        width=CANVAS_SIZE[0],
+        height=CANVAS_SIZE[1],
+        extension="png",
+    )
+
+
+LABELS = [
+    ("R$1.234,56", "45,00"),
+    ("R$7.890,12", "9,00"),
+    ("R$3.456,78", "12,50"),
+    ("R$9.012,34", "67,80"),
+    ("R$5.678,90", "3,45"),
+    ("R$2.109,87", "1,23"),
+]
+
+
+@pytest.fixture
+def frame_factory():
+    return render_frame
+
+
+@pytest.fixture
+def screenshot_factory():
+    return lambda *args, **kwargs: make_screenshot(render_frame(*args, **kwargs))
+
+
+@pytest.fixture
+def game_frame_factory(screenshot_factory):
+    return lambda *args, **kwargs: Frame(screenshot_factory(*args, **kwargs))
+
+
+@pytest.fixture
+def labelled_screenshots_dir(tmp_path) -> str:
+    labels = {}
+    for index, (balance_text, bet_text) in enumerate(LABELS):
+        file_name = f"{index:04d}.png"
+        (tmp_path / file_name).write_bytes(render_frame(balance_text, bet_text))
+        labels[file_name] = {"balance": balance_text, "bet": bet_text}
+    (tmp_path / LABELS_FILE_NAME).write_text(json.dumps(labels))
+    return str(tmp_path)
+
+
+class StubTikaServer:
+    """
+    Answers every PUT /tika with the same text after a fixed delay, standing in
+    for a Tika server doing OCR. Counts the requests and the connections opened.
+    """
+
+    def __init__(self, text: str = "12345", delay_seconds: float = 0.005):
+        self.text = text
+        self.delay_seconds = delay_seconds
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Send headers and body in one segment, as real servers do, so
+            # keep-alive calls don't wait on delayed ACKs
+            wbufsize = 64 * 1024
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_PUT(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                with stub._lock:
+                    stub.requests += 1
+                time.sleep(stub.delay_seconds)
+                body = stub.text.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.address = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_tika_server():
+    server = StubTikaServer()
+    yield server
+    server.stop()
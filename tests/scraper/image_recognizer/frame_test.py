@@ -0,0 +1,41 @@
+import numpy as np
+
+from scraper.image_recognizer import Frame, FrameCounter, TemplateImageRecognizer
+from scraper.image_recognizer.calibration import (
+    calibrate_atlas,
+    load_labelled_screenshots,
+)
+from scraper.image_recognizer.regions import balance_region, play_button_region
+
+
+class TestFrame:
+    def test_decodes_once_for_many_crops(self, screenshot_factory):
+        counter = FrameCounter()
+        frame = Frame(screenshot_factory("R$1,00", "1,00"), counter=counter)
+        assert counter.decodes == 0
+
+        frame.crop(balance_region)
+        frame.crop(play_button_region)
+        frame.gray_crop(balance_region)
+
+        assert counter.decodes == 1
+
+    def test_crop_is_a_view_of_the_frame_buffer(self, screenshot_factory):
+        frame = Frame(screenshot_factory("R$1,00", "1,00"))
+        crop = frame.crop(balance_region)
+
+        assert np.shares_memory(crop, frame.pixels)
+        assert crop.shape == (48, 200, 3)
+
+    def test_read_frame_answers_only_requested_questions(
+        self, labelled_screenshots_dir, game_frame_factory
+    ):
+        atlas = calibrate_atlas(load_labelled_screenshots(labelled_screenshots_dir))
+        recognizer = TemplateImageRecognizer(atlas=atlas)
+        reading = recognizer.read_frame(
+            game_frame_factory("R$12,34", "5,00"), enabled_to_play=True, bet=True
+        )
+
+        assert reading.is_enabled_to_play is True
+        assert reading.bet_value == 500
+        assert reading.balance_in_cents is None
@@ -0,0 +1,98 @@
+import numpy as np
+
+from scraper.image_recognizer import TikaImageRecognizer
+from scraper.image_recognizer.ocr_cache import OcrCache
+from scraper.image_recognizer.preprocessing import OcrPreprocessing
+from scraper.image_recognizer.regions import balance_region
+
+
+class TestOcrCache:
+    def test_evicts_least_recently_used(self):
+        cache = OcrCache(max_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        assert cache.get("a") == "1"
+        cache.put("c", "3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.evictions, stats.size) == (2, 1, 1, 2)
+
+    def test_disk_tier_survives_restarts(self, tmp_path):
+        path = str(tmp_path / "ocr.sqlite")
+        cache = OcrCache(disk_path=path)
+        cache.put("crop", "12345")
+        cache.close()
+
+        restarted = OcrCache(disk_path=path)
+        assert restarted.get("crop") == "12345"
+        assert restarted.stats().disk_hits == 1
+        restarted.close()
+
+    def test_disk_tier_keeps_the_latest_entries(self, tmp_path):
+        path = str(tmp_path / "ocr.sqlite")
+        cache = OcrCache(max_entries=1, disk_path=path, max_disk_entries=2)
+        for key in ["a", "b", "c"]:
+            cache.put(key, "1")
+        cache.close()
+
+        restarted = OcrCache(disk_path=path)
+        assert restarted.get("a") is None
+        assert restarted.get("b") == "1"
+        assert restarted.get("c") == "1"
+        restarted.close()
+
+    def test_perceptual_hash_ignores_noise(self, game_frame_factory):
+        crop = game_frame_factory("R$1.234,56", "45,00").crop(balance_region)
+        noise = np.random.default_rng(0).integers(-3, 4, crop.shape)
+        noisy = np.clip(crop.astype(int) + noise, 0, 255).astype(np.uint8)
+        other = game_frame_factory("R$1.234,57", "45,00").crop(balance_region)
+        exact = OcrCache(hash_mode="exact")
+        perceptual = OcrCache(hash_mode="perceptual")
+
+        assert exact.key(crop) != exact.key(noisy)
+        assert perceptual.key(crop) == perceptual.key(noisy)
+        assert perceptual.key(crop) != perceptual.key(other)
+
+
+class TestCachedTikaImageRecognizer:
+    def test_repeated_crops_skip_ocr(self, stub_tika_server, game_frame_factory):
+        recognizer = TikaImageRecognizer(
+            address=stub_tika_server.address, ocr_cache=OcrCache()
+        )
+        for _ in range(3):
+            frame = game_frame_factory("R$1.234,56", "45,00")
+            reading = recognizer.read_frame(frame, balance=True, bet=True)
+            assert reading.balance_in_cents == 12345
+        recognizer.close()
+
+        assert stub_tika_server.requests == 2
+
+    def test_unreadable_text_is_not_cached(self, stub_tika_server, game_frame_factory):
+        stub_tika_server.text = "R$"
+        recognizer = TikaImageRecognizer(
+            address=stub_tika_server.address, ocr_cache=OcrCache()
+        )
+        frame = game_frame_factory("R$1.234,56", "45,00")
+        for _ in range(2):
+            assert recognizer.get_balance_in_cents(frame) == 0
+        recognizer.close()
+
+        assert stub_tika_server.requests == 2
+
+    def test_other_preprocessing_does_not_reuse_results(
+        self, tmp_path, stub_tika_server, game_frame_factory
+    ):
+        path = str(tmp_path / "ocr.sqlite")
+        frame = game_frame_factory("R$1.234,56", "45,00")
+        for preprocessing in [OcrPreprocessing(), OcrPreprocessing(binarize=True)]:
+            recognizer = TikaImageRecognizer(
+                address=stub_tika_server.address,
+                ocr_cache=OcrCache(disk_path=path),
+                preprocessing=preprocessing,
+            )
+            recognizer.get_balance_in_cents(frame)
+            recognizer.close()
+
+        assert stub_tika_server.requests == 2
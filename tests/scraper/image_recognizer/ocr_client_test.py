@@ -0,0 +1,106 @@
+import time
+
+import pytest
+import requests
+
+from scraper.image_recognizer import TikaImageRecognizer
+from scraper.image_recognizer.ocr_client import TikaOcrClient
+
+CALLS = 100
+
+
+def _run(client: TikaOcrClient, payloads, parallel: bool) -> float:
+    """
+    :return: The calls per second.
+    """
+    started_at = time.perf_counter()
+    if parallel:
+        for future in [client.submit(payload) for payload in payloads]:
+            future.result()
+    else:
+        for payload in payloads:
+            client.extract_text(payload)
+    return len(payloads) / (time.perf_counter() - started_at)
+
+
+class TestTikaOcrClient:
+    def test_reuses_connections(self, stub_tika_server):
+        client = TikaOcrClient(stub_tika_server.address)
+        for index in range(10):
+            assert client.extract_text(f"crop {index}".encode()) == "12345"
+        client.close()
+
+        assert stub_tika_server.requests == 10
+        assert stub_tika_server.connections == 1
+
+    def test_coalesces_identical_crops_in_flight(self, stub_tika_server):
+        stub_tika_server.delay_seconds = 0.2
+        client = TikaOcrClient(stub_tika_server.address)
+        futures = [client.submit(b"same crop") for _ in range(5)]
+        texts = [future.result() for future in futures]
+        client.close()
+
+        assert texts == ["12345"] * 5
+        assert stub_tika_server.requests == 1
+        assert client.coalesced == 4
+
+    def test_times_out(self, stub_tika_server):
+        stub_tika_server.delay_seconds = 0.5
+        client = TikaOcrClient(stub_tika_server.address, timeout_seconds=0.05)
+        with pytest.raises(requests.Timeout):
+            client.extract_text(b"slow crop")
+        client.close()
+
+    def test_benchmark_pooling(self, stub_tika_server):
+        payloads = [f"crop {index}".encode() for index in range(CALLS)]
+        results = {}
+        for name, pooled, parallel in (
+            ("new connection, serial", False, False),
+            ("keep-alive, serial", True, False),
+            ("keep-alive, 4 threads", True, True),
+        ):
+            client = TikaOcrClient(stub_tika_server.address, pooled=pooled)
+            results[name] = _run(client, payloads, parallel)
+            client.close()
+            print(f"{name}: {results[name]:.0f} calls/s")
+
+        assert results["keep-alive, 4 threads"] > 2 * results["new connection, serial"]
+
+
+class TestTikaImageRecognizer:
+    def test_reads_balance_and_bet_in_parallel(
+        self, stub_tika_server, game_frame_factory
+    ):
+        stub_tika_server.delay_seconds = 0.2
+        recognizer = TikaImageRecognizer(address=stub_tika_server.address)
+        frame = game_frame_factory("R$1.234,56", "45,00")
+
+        started_at = time.perf_counter()
+        reading = recognizer.read_frame(frame, balance=True, bet=True)
+        elapsed = time.perf_counter() - started_at
+        recognizer.close()
+
+        assert reading.balance_in_cents == 12345
+        assert reading.bet_value == 12345
+        assert elapsed < 0.35
+
+    def test_returns_zero_when_tika_fails(self, game_frame_factory):
+        recognizer = TikaImageRecognizer(
+            address="http://127.0.0.1:9", timeout_seconds=0.5
+        )
+        assert (
+            recognizer.get_balance_in_cents(game_frame_factory("R$1,00", "1,00")) == 0
+        )
+        recognizer.close()
+
+    def test_leaves_a_shared_client_open(self, stub_tika_server, game_frame_factory):
+        client = TikaOcrClient(stub_tika_server.address)
+        frame = game_frame_factory("R$1,00", "1,00")
+        TikaImageRecognizer(address=stub_tika_server.address, ocr_client=client).close()
+        recognizer = TikaImageRecognizer(
+            address=stub_tika_server.address, ocr_client=client
+        )
+
+        assert recognizer.get_balance_in_cents(frame) == 12345
+        recognizer.close()
+        client.close()
@@ -0,0 +1,66 @@
+import time
+
+import numpy as np
+import pytest
+
+from scraper.image_recognizer import Frame
+from scraper.image_recognizer.play_button import PlayButtonDetector
+from scraper.image_recognizer.regions import play_button_region
+
+LATENCY_BUDGET_MS = 1.0
+
+
+@pytest.fixture
+def detector() -> PlayButtonDetector:
+    return PlayButtonDetector()
+
+
+@pytest.fixture
+def button_crops(game_frame_factory):
+    """
+    Play button crops of enabled and disabled frames, plus copies with sensor
+    like noise, labelled with the expected state.
+    """
+    rng = np.random.default_rng(7)
+    crops = []
+    for enabled in (True, False):
+        crop = game_frame_factory("R$1,00", "1,00", enabled=enabled).crop(
+            play_button_region
+        )
+        crops.append((crop, enabled))
+        for _ in range(5):
+            noise = rng.integers(-6, 7, size=crop.shape)
+            noisy = np.clip(crop.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+            crops.append((noisy, enabled))
+    return crops
+
+
+class TestPlayButtonDetector:
+    def test_accuracy_on_enabled_and_disabled_frames(self, detector, button_crops):
+        for crop, enabled in button_crops:
+            state = detector.detect(crop)
+            assert state.enabled is enabled
+            assert state.confidence > 0.5
+
+    def test_latency_budget(self, detector, button_crops):
+        crop, _ = button_crops[0]
+        detector.detect(crop)  # builds the sampling grid for this crop size
+        latencies = []
+        for _ in range(500):
+            start = time.perf_counter()
+            detector.detect(crop)
+            latencies.append(time.perf_counter() - start)
+        median_ms = float(np.median(latencies)) * 1000
+        print(f"play button detection median latency: {median_ms:.4f} ms")
+        assert median_ms < LATENCY_BUDGET_MS
+
+    def test_latency_budget_including_crop(self, detector, screenshot_factory):
+        screenshot = screenshot_factory("R$1,00", "1,00")
+        frame = Frame(screenshot)
+        frame.pixels  # decoding is paid once per frame, not per question
+        latencies = []
+        for _ in range(500):
+            start = time.perf_counter()
+            detector.is_enabled(frame.crop(play_button_region))
+            latencies.append(time.perf_counter() - start)
+        assert float(np.median(latencies)) * 1000 < LATENCY_BUDGET_MS
@@ -0,0 +1,87 @@
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+import scraper.image_recognizer.benchmark
+from monitoring import PipelineMetrics
+from scraper.image_recognizer.benchmark import pick_preprocessing, sweep_preprocessing
+from scraper.image_recognizer.calibration import load_labelled_screenshots
+from scraper.image_recognizer.preprocessing import (
+    OcrPreprocessing,
+    preprocessing_grid,
+)
+from scraper.image_recognizer.regions import balance_region
+
+
+class TestOcrPreprocessing:
+    def test_binarized_bmp(self, game_frame_factory):
+        crop = game_frame_factory("R$1.234,56", "45,00").crop(balance_region)
+        metrics = PipelineMetrics()
+        preprocessing = OcrPreprocessing(
+            binarize=True, scale=2, resample="nearest", image_format="bmp"
+        )
+
+        payload = preprocessing.prepare(crop, metrics)
+
+        with Image.open(BytesIO(payload)) as image:
+            assert image.format == "BMP"
+            assert image.size == (crop.shape[1] * 2, crop.shape[0] * 2)
+            pixels = np.asarray(image.convert("L"))
+        assert set(np.unique(pixels)) == {0, 255}
+        # The text is the minority, and it is drawn black
+        assert (pixels == 0).mean() < 0.5
+        assert preprocessing.content_type == "image/bmp"
+        assert {"ocr_threshold", "ocr_scale", "ocr_encode"} <= set(metrics.snapshot())
+
+    def test_smaller_scales_shrink_the_payload(self, game_frame_factory):
+        crop = game_frame_factory("R$1.234,56", "45,00").crop(balance_region)
+        metrics = PipelineMetrics()
+
+        original = OcrPreprocessing().prepare(crop, metrics)
+        binary_fast = OcrPreprocessing(
+            binarize=True, scale=1, png_compress_level=1
+        ).prepare(crop, metrics)
+
+        assert len(binary_fast) * 10 < len(original)
+
+
+class TestPreprocessingSweep:
+    def test_sweeps_settings_over_labelled_screenshots(
+        self, stub_tika_server, labelled_screenshots_dir
+    ):
+        samples = load_labelled_screenshots(labelled_screenshots_dir)
+        settings = preprocessing_grid(scales=(1, 4), image_formats=("png",))
+
+        results = sweep_preprocessing(stub_tika_server.address, samples, settings)
+
+        assert [result.preprocessing for result in results] == settings
+        for result in results:
+            assert result.benchmark.calls == 2 * len(samples)
+            assert "tika_ocr" in result.stage_latency_ms
+        sizes = {
+            result.preprocessing.label: result.mean_payload_bytes for result in results
+        }
+        assert sizes["binary x1 nearest png1"] < sizes["rgb x4 bicubic png1"]
+        assert pick_preprocessing(results) in results
+
+    def test_payload_sizes_do_not_add_stage_samples(
+        self, stub_tika_server, labelled_screenshots_dir, monkeypatch
+    ):
+        samples = load_labelled_screenshots(labelled_screenshots_dir)
+        created = []
+
+        class RecordedMetrics(PipelineMetrics):
+            def __init__(self):
+                super().__init__()
+                created.append(self)
+
+        monkeypatch.setattr(
+            scraper.image_recognizer.benchmark, "PipelineMetrics", RecordedMetrics
+        )
+
+        sweep_preprocessing(stub_tika_server.address, samples, [OcrPreprocessing()])
+
+        stages = created[0].snapshot()
+        for stage in ("ocr_threshold", "ocr_scale", "ocr_encode"):
+            assert stages[stage].count == stages["ocr_preprocess"].count
@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pytest
+import requests
+
+from scraper.image_recognizer import TemplateImageRecognizer, TikaImageRecognizer
+from scraper.image_recognizer.benchmark import benchmark_recognizer
+from scraper.image_recognizer.calibration import (
+    calibrate_atlas,
+    load_labelled_screenshots,
+)
+from scraper.image_recognizer.factory import RecognizerOptions, create_image_recognizer
+from scraper.image_recognizer.glyph_atlas import GlyphAtlas, segment_glyphs
+from scraper.image_recognizer.process_pool import ProcessPoolRecognizer
+
+
+class TestSegmentGlyphs:
+    def test_blank_crop_has_no_glyphs(self):
+        assert segment_glyphs(np.zeros((20, 40), dtype=np.uint8)) == []
+
+    def test_splits_separated_columns(self):
+        crop = np.zeros((20, 40), dtype=np.uint8)
+        crop[4:16, 5:9] = 255
+        crop[4:16, 20:26] = 255
+        assert len(segment_glyphs(crop)) == 2
+
+
+class TestTemplateImageRecognizer:
+    def test_reads_unseen_values(self, labelled_screenshots_dir, game_frame_factory):
+        atlas = calibrate_atlas(load_labelled_screenshots(labelled_screenshots_dir))
+        recognizer = TemplateImageRecognizer(atlas=atlas)
+        frame = game_frame_factory("R$8.642,05", "31,97")
+
+        assert recognizer.get_balance_in_cents(frame) == 864205
+        assert recognizer.get_bet_value(frame) == 3197
+
+    def test_atlas_round_trip(self, labelled_screenshots_dir, tmp_path):
+        atlas = calibrate_atlas(load_labelled_screenshots(labelled_screenshots_dir))
+        path = str(tmp_path / "atlas.npz")
+        atlas.save(path)
+        loaded = GlyphAtlas.load(path)
+
+        assert loaded.labels == atlas.labels
+        assert np.allclose(loaded.templates, atlas.templates)
+
+    def test_benchmark_against_tika(self, labelled_screenshots_dir):
+        samples = load_labelled_screenshots(labelled_screenshots_dir)
+        recognizer = TemplateImageRecognizer(atlas=calibrate_atlas(samples))
+        template_result = benchmark_recognizer("template", recognizer, samples)
+        print(template_result)
+        assert template_result.accuracy == 1.0
+
+        tika_address = os.environ.get("TIKA_ADDRESS")
+        if not tika_address:
+            pytest.skip("set TIKA_ADDRESS to compare against a running tika server")
+        try:
+            requests.get(tika_address, timeout=1)
+        except requests.RequestException:
+            pytest.skip(f"tika server is not reachable at {tika_address}")
+        tika_result = benchmark_recognizer(
+            "tika", TikaImageRecognizer(address=tika_address), samples
+        )
+        print(tika_result)
+        assert template_result.mean_latency_ms < tika_result.mean_latency_ms
+
+
+class TestProcessPoolRecognizer:
+    def test_reads_like_the_recognizer_it_runs(
+        self, labelled_screenshots_dir, game_frame_factory, tmp_path
+    ):
+        atlas = calibrate_atlas(load_labelled_screenshots(labelled_screenshots_dir))
+        atlas_path = str(tmp_path / "atlas.npz")
+        atlas.save(atlas_path)
+        recognizer = create_image_recognizer(
+            RecognizerOptions(kind="template", atlas_path=atlas_path, processes=1)
+        )
+        try:
+            assert isinstance(recognizer, ProcessPoolRecognizer)
+            reading = recognizer.read_frame(
+                game_frame_factory("R$8.642,05", "31,97"), balance=True, bet=True
+            )
+        finally:
+            recognizer.close()
+
+        assert reading.balance_in_cents == 864205
+        assert reading.bet_value == 3197
@@ -0,0 +1,107 @@
+from monitoring import PipelineMetrics
+from scraper.archive import ReplayDriver, ScreenshotEvent, SpinEvent, TrafficArchive
+from scraper.image_recognizer import Screenshot
+from scraper.scraper import FortuneTigerScraper, ScraperConfig
+
+ENABLED = Screenshot(image_bytes=b"enabled", width=540, height=960, extension="png")
+
+
+class TestTrafficArchive:
+    def test_round_trips_exchanges_and_screenshots(
+        self, tmp_path, spin_exchange_factory
+    ):
+        request, response = spin_exchange_factory()
+        archive = TrafficArchive(str(tmp_path)).open_for_recording()
+        archive.record_exchange(request, response)
+        archive.record_screenshot(ENABLED)
+        archive.close()
+
+        spin, screenshot = list(archive.events())
+
+        assert isinstance(spin, SpinEvent)
+        assert spin.request.body == request.body
+        assert spin.response.body == response.body
+        assert spin.response.date == response.date
+        assert spin.response.headers["content-encoding"] == "gzip"
+        assert isinstance(screenshot, ScreenshotEvent)
+        assert screenshot.screenshot == ENABLED
+        assert screenshot.offset_seconds >= spin.offset_seconds
+
+
+class TestReplay:
+    def test_replays_batches_through_the_subscribers(
+        self, tmp_path, session_recorder, stub_recognizer, collecting_subscriber_factory
+    ):
+        archive = session_recorder(tmp_path)
+        subscriber = collecting_subscriber_factory()
+        scraper = FortuneTigerScraper(image_recognizer=stub_recognizer)
+
+        stats = scraper.replay_data(archive, [subscriber])
+
+        assert [data.game_id for data in subscriber.received] == ["g1", "g1", "g2"]
+        assert stats.spins == 3
+        assert stats.screenshots == 4
+        assert stats.batches == 2
+
+    def test_streaming_replay(
+        self, tmp_path, session_recorder, stub_recognizer, collecting_subscriber_factory
+    ):
+        archive = session_recorder(tmp_path)
+        subscriber = collecting_subscriber_factory()
+        scraper = FortuneTigerScraper(
+            image_recognizer=stub_recognizer, config=ScraperConfig(streaming=True)
+        )
+
+        scraper.replay_data(archive, [subscriber])
+
+        assert len(subscriber.received) == 3
+
+    def test_replays_at_the_recorded_pace(
+        self, tmp_path, session_recorder, stub_recognizer, collecting_subscriber_factory
+    ):
+        archive = session_recorder(tmp_path, pause=0.05)
+        scraper = FortuneTigerScraper(image_recognizer=stub_recognizer)
+
+        fast = scraper.replay_data(archive, [collecting_subscriber_factory()])
+        paced = scraper.replay_data(archive, [collecting_subscriber_factory()], speed=1)
+
+        assert paced.elapsed_seconds >= paced.recorded_seconds >= 0.15
+        assert fast.elapsed_seconds < paced.elapsed_seconds
+
+    def test_records_pipeline_stages(
+        self, tmp_path, session_recorder, stub_recognizer, collecting_subscriber_factory
+    ):
+        archive = session_recorder(tmp_path)
+        metrics = PipelineMetrics()
+        scraper = FortuneTigerScraper(image_recognizer=stub_recognizer, metrics=metrics)
+
+        scraper.replay_data(archive, [collecting_subscriber_factory()])
+
+        stages = metrics.snapshot()
+        assert stages["spin_decode"].count == 3
+        # one batch call per batch for the collecting subscriber and the
+        # balance tracker
+        assert stages["subscriber"].count == 4
+        assert stages["notify_subscribers"].count == 2
+
+    def test_a_malformed_spin_does_not_drop_the_batch(
+        self, spin_exchange_factory, stub_recognizer, collecting_subscriber_factory
+    ):
+        driver = ReplayDriver()
+        truncated, response = spin_exchange_factory(game_id="g2")
+        response.body = response.body[:10]
+        for request in (
+            spin_exchange_factory(game_id="g1")[0],
+            truncated,
+            spin_exchange_factory(game_id="g3")[0],
+        ):
+            driver.add(request)
+        metrics = PipelineMetrics()
+        subscriber = collecting_subscriber_factory()
+        scraper = FortuneTigerScraper(image_recognizer=stub_recognizer, metrics=metrics)
+
+        scraper._notify_subscribers(driver, [subscriber])
+
+        assert [data.game_id for data in subscriber.received] == ["g1", "g3"]
+        assert metrics.snapshot()["spin_decode"].errors == 1
+        assert driver.requests == []
@@ -0,0 +1,84 @@
+import threading
+import time
+from typing import List
+
+from model.data import FortuneTigerData
+from scraper.spin_stream import SpinStream
+from scraper.subscriber.interface import FortuneTigerSubscriber
+
+
+class CollectingSubscriber(FortuneTigerSubscriber):
+    def __init__(self):
+        self.received: List[FortuneTigerData] = []
+
+    def process_data(self, data: FortuneTigerData):
+        self.received.append(data)
+
+
+class BlockedSubscriber(FortuneTigerSubscriber):
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def process_data(self, data: FortuneTigerData):
+        self.started.set()
+        self.release.wait(5)
+
+
+class TestSpinStream:
+    def test_streams_spins_to_subscribers(self, spin_exchange_factory):
+        subscriber = CollectingSubscriber()
+        stream = SpinStream([subscriber])
+        stream.start()
+        stream.response_interceptor(*spin_exchange_factory())
+        stream.response_interceptor(*spin_exchange_factory(status_code=500))
+        stream.stop()
+
+        assert len(subscriber.received) == 1
+        assert subscriber.received[0].game_id == "token-1"
+        assert stream.metrics().processed == 1
+
+    def test_drops_when_queue_is_full(self, spin_exchange_factory):
+        subscriber = BlockedSubscriber()
+        stream = SpinStream([subscriber], max_size=2)
+        stream.start()
+        stream.response_interceptor(*spin_exchange_factory())
+        subscriber.started.wait(5)
+        for _ in range(4):
+            stream.response_interceptor(*spin_exchange_factory())
+        metrics = stream.metrics()
+        subscriber.release.set()
+        stream.stop()
+
+        # one record is being processed, two are queued, the rest are dropped
+        assert metrics.dropped == 2
+        assert metrics.max_queue_depth == 2
+
+    def test_stop_does_not_hang_on_a_stuck_subscriber(self, spin_exchange_factory):
+        subscriber = BlockedSubscriber()
+        stream = SpinStream([subscriber], max_size=1)
+        stream.start()
+        stream.response_interceptor(*spin_exchange_factory())
+        subscriber.started.wait(5)
+        stream.response_interceptor(*spin_exchange_factory())
+        started_at = time.monotonic()
+
+        stream.stop(timeout=0.2)
+        subscriber.release.set()
+
+        assert time.monotonic() - started_at < 1
+
+    def test_drained_counts_failed_deliveries(self, spin_exchange_factory):
+        class FailingSubscriber(FortuneTigerSubscriber):
+            def process_data(self, data: FortuneTigerData):
+                raise ValueError("unavailable")
+
+        stream = SpinStream([FailingSubscriber()])
+        stream.start()
+        stream.response_interceptor(*spin_exchange_factory(content_encoding="br"))
+        # never queued, so not waited for
+        stream.response_interceptor(*spin_exchange_factory(content_encoding="xz"))
+
+        assert stream.wait_until_drained(timeout=5)
+        stream.stop()
+        assert stream.metrics().failed == 1
@@ -0,0 +1,44 @@
+import threading
+
+from seleniumwire.request import Request, Response
+
+from scraper.spin_tracker import SpinTracker
+
+SPIN_URL = "https://api.pg-demo.com/game-api/fortune-tiger/v2/Spin?traceId=1"
+
+
+def _exchange(url: str, status_code: int = 200):
+    return (
+        Request(method="POST", url=url, headers=[]),
+        Response(status_code=status_code, reason="", headers=[]),
+    )
+
+
+class TestSpinTracker:
+    def test_counts_only_successful_spins(self):
+        tracker = SpinTracker()
+        tracker.response_interceptor(*_exchange(SPIN_URL))
+        tracker.response_interceptor(*_exchange(SPIN_URL, status_code=500))
+        tracker.response_interceptor(
+            *_exchange("https://api.pg-demo.com/game-api/fortune-tiger/v2/GameInfo")
+        )
+
+        assert tracker.spins == 1
+
+    def test_wait_for_returns_when_batch_arrives(self):
+        tracker = SpinTracker()
+        target = tracker.expect(3)
+
+        def spin_three_times():
+            for _ in range(3):
+                tracker.response_interceptor(*_exchange(SPIN_URL))
+
+        threading.Thread(target=spin_three_times).start()
+
+        assert tracker.wait_for(target, timeout=5)
+
+    def test_wait_for_times_out(self):
+        tracker = SpinTracker()
+        target = tracker.expect(1)
+
+        assert not tracker.wait_for(target, timeout=0.01)
@@ -0,0 +1,237 @@
+import time
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from monitoring import PipelineMetrics
+from scraper.exceptions import GameFroze
+from scraper.image_recognizer import Frame, ScraperImageRecognizer, Screenshot
+from scraper.scraper import FortuneTigerGame, FortuneTigerScraper, ScraperConfig
+from scraper.startup import StartupTimings, benchmark_startup, summarize_startups
+
+
+class FakeDriver:
+    def __init__(self):
+        self.alive = True
+        self.quit_calls = 0
+        self.requests = ["captured before"]
+
+    @property
+    def current_url(self) -> str:
+        if not self.alive:
+            raise Exception("browser is gone")
+        return "https://m.pgsoft-games.com/126/index.html"
+
+    def close(self):
+        pass
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+class FakeGame:
+    """
+    A canvas whose reels spin all the time and whose controls bar keeps
+    changing for the given number of screenshots.
+    """
+
+    def __init__(self, changing_screenshots: int):
+        self.changing_screenshots = changing_screenshots
+        self.screenshots = 0
+
+    def take_screenshot(self) -> Screenshot:
+        self.screenshots += 1
+        image = Image.new("RGB", (54, 96), (self.screenshots * 37 % 256, 0, 0))
+        controls = min(self.screenshots, self.changing_screenshots) * 50 % 256
+        image.paste((0, controls, 0), (0, 72, 54, 96))
+        output = BytesIO()
+        image.save(output, format="PNG")
+        return Screenshot(
+            image_bytes=output.getvalue(), width=54, height=96, extension="png"
+        )
+
+    def capture_frame(self, record: bool = True):
+        return Frame(self.take_screenshot())
+
+
+class FakeCanvas:
+    size = {"width": 54, "height": 96}
+
+    def __init__(self):
+        self.game = FakeGame(changing_screenshots=2)
+
+    @property
+    def screenshot_as_png(self) -> bytes:
+        return self.game.take_screenshot().image_bytes
+
+
+class FakeArchive:
+    def __init__(self):
+        self.screenshots = 0
+
+    def record_screenshot(self, screenshot):
+        self.screenshots += 1
+
+
+class BetRecognizer(ScraperImageRecognizer):
+    def __init__(self, bets):
+        self.bets = list(bets)
+
+    def get_bet_value(self, frame) -> int:
+        return self.bets.pop(0) if len(self.bets) > 1 else self.bets[0]
+
+    def get_balance_in_cents(self, frame) -> int:
+        return 0
+
+    def check_if_is_enabled_to_play(self, frame) -> bool:
+        return True
+
+
+class EnabledRecognizer(BetRecognizer):
+    """
+    Sees the play button enabled from the given screenshot on.
+    """
+
+    def __init__(self, enabled_from: int):
+        super().__init__([4500])
+        self.enabled_from = enabled_from
+        self.checks = 0
+
+    def check_if_is_enabled_to_play(self, frame) -> bool:
+        self.checks += 1
+        return self.checks >= self.enabled_from
+
+
+def _scraper(recognizer=None, **config) -> FortuneTigerScraper:
+    return FortuneTigerScraper(
+        image_recognizer=recognizer or BetRecognizer([4500]),
+        config=ScraperConfig(**config),
+        metrics=PipelineMetrics(),
+    )
+
+
+class TestStartupTimings:
+    def test_records_phases_and_stages(self):
+        metrics = PipelineMetrics()
+        timings = StartupTimings()
+        with timings.phase("page_load", metrics):
+            time.sleep(0.01)
+
+        assert timings.phases["page_load"] >= 0.01
+        assert timings.total_seconds == timings.phases["page_load"]
+        assert metrics.snapshot()["startup_page_load"].count == 1
+
+    def test_summary_counts_skipped_phases_as_zero(self):
+        cold = StartupTimings(phases={"webdriver": 3, "page_load": 2})
+        warm = StartupTimings(warm_browser=True, phases={"page_load": 1})
+
+        result = summarize_startups([cold, warm])
+
+        assert result.warm_runs == 1
+        assert result.mean_total_seconds == 3
+        assert result.mean_phase_seconds == {"webdriver": 1.5, "page_load": 1.5}
+
+
+class TestWarmBrowser:
+    def test_reuses_a_responsive_browser(self):
+        scraper = _scraper(keep_browser=True)
+        driver = FakeDriver()
+        scraper._driver = driver
+
+        assert scraper._reuse_driver()
+        assert scraper._driver is driver
+        assert not hasattr(driver, "requests")
+
+    def test_replaces_a_dead_browser(self):
+        scraper = _scraper(keep_browser=True)
+        driver = FakeDriver()
+        driver.alive = False
+        scraper._driver = driver
+
+        assert not scraper._reuse_driver()
+        assert scraper._driver is None
+        assert driver.quit_calls == 1
+
+    def test_benchmark_only_the_first_kept_startup_is_cold(self):
+        class OpeningScraper:
+            def __init__(self):
+                self.browser_open = False
+                self.last_startup = None
+
+            def open_game(self, headless):
+                self.last_startup = StartupTimings(warm_browser=self.browser_open)
+                self.browser_open = True
+
+            def close(self):
+                self.browser_open = False
+
+        kept = benchmark_startup(OpeningScraper(), 3, True, keep_browser=True)
+        closed = benchmark_startup(OpeningScraper(), 3, True, keep_browser=False)
+
+        assert [timing.warm_browser for timing in kept] == [False, True, True]
+        assert not any(timing.warm_browser for timing in closed)
+
+
+class TestReadinessWaits:
+    def test_settled_canvas_returns_before_the_timeout(self):
+        game = FakeGame(changing_screenshots=2)
+        started_at = time.monotonic()
+
+        _scraper()._wait_for_canvas_to_settle(game, timeout=5, interval=0.01)
+
+        assert time.monotonic() - started_at < 1
+        assert game.screenshots == 3
+
+    def test_settle_screenshots_are_counted_but_not_archived(self):
+        metrics = PipelineMetrics()
+        archive = FakeArchive()
+        game = FortuneTigerGame.model_construct(
+            game_canvas=FakeCanvas(), archive=archive, metrics=metrics
+        )
+
+        _scraper()._wait_for_canvas_to_settle(game, timeout=5, interval=0.01)
+
+        assert game.frame_counter.screenshots == 3
+        assert metrics.snapshot()["screenshot"].count == 3
+        assert archive.screenshots == 0
+
+    def test_animated_canvas_waits_the_timeout(self):
+        game = FakeGame(changing_screenshots=1000)
+        started_at = time.monotonic()
+
+        _scraper()._wait_for_canvas_to_settle(game, timeout=0.2, interval=0.01)
+
+        assert time.monotonic() - started_at >= 0.2
+
+    def test_bet_is_polled_until_it_shows_the_raised_value(self):
+        scraper = _scraper(BetRecognizer([900, 2700, 4500]))
+
+        assert not scraper._check_if_game_is_blocked(FakeGame(1))
+
+    def test_bet_that_never_rises_means_blocked(self):
+        scraper = _scraper(BetRecognizer([900]), bet_ready_timeout_seconds=0.2)
+
+        assert scraper._check_if_game_is_blocked(FakeGame(1))
+
+    def test_batch_without_intercepted_spins_ends_on_screen(self):
+        recognizer = EnabledRecognizer(enabled_from=3)
+        scraper = _scraper(recognizer)
+        scraper.screen_check_interval_seconds = 0.01
+        started_at = time.monotonic()
+
+        scraper._wait_for_batch(FakeGame(1), scraper._spin_tracker.expect(10))
+
+        assert time.monotonic() - started_at < 1
+        assert recognizer.checks == 3
+
+    def test_frozen_batch_raises_at_one_deadline(self):
+        scraper = _scraper(EnabledRecognizer(enabled_from=1000))
+        scraper.batch_timeout_seconds = 0.3
+        scraper.screen_check_interval_seconds = 0.05
+        started_at = time.monotonic()
+
+        with pytest.raises(GameFroze):
+            scraper._wait_for_batch(FakeGame(1), scraper._spin_tracker.expect(10))
+
+        assert time.monotonic() - started_at < 0.6
@@ -0,0 +1,166 @@
+import json
+import statistics as reference
+from datetime import timedelta
+from urllib.request import urlopen
+
+from model.spin_record import SpinRecord
+from monitoring import MetricsServer, PipelineMetrics
+from scraper.spin_statistics import (
+    Drawdown,
+    FixedHistogram,
+    RunningMoments,
+    SlidingWindow,
+    SpinStatistics,
+)
+from scraper.subscriber import StatisticsConfig, StatisticsSubscriber
+from scraper.traffic import to_fortune_tiger_data
+
+
+def _spins(spin_exchange_factory, spin_body_factory, wins, seconds_apart=1):
+    spins = []
+    for index, win in enumerate(wins):
+        body = spin_body_factory(bet=100, win=win)
+        body["dt"]["si"]["sid"] = str(index)
+        request, response = spin_exchange_factory(body=body)
+        response.date += timedelta(seconds=index * seconds_apart)
+        spins.append(to_fortune_tiger_data(request, response))
+    return spins
+
+
+class TestAccumulators:
+    def test_running_moments_match_the_batch_formulas(self):
+        values = [3.5, -1, 0, 12.25, 7, 7, -4.5]
+        moments = RunningMoments()
+        for value in values:
+            moments.add(value)
+
+        assert abs(moments.mean - reference.mean(values)) < 1e-12
+        assert abs(moments.variance - reference.variance(values)) < 1e-12
+
+    def test_histogram_bins_by_upper_bound(self):
+        histogram = FixedHistogram(upper_bounds=[0, 1, 10])
+        for value in [0, 0, 0.5, 1, 3, 50]:
+            histogram.add(value)
+
+        assert histogram.labelled() == {"<=0": 2, "<=1": 2, "<=10": 1, ">10": 1}
+
+    def test_drawdown_from_the_peak(self):
+        drawdown = Drawdown()
+        for change in [10, -4, -8, 5, 20, -3]:
+            drawdown.add(change)
+
+        assert drawdown.max_drawdown == 12
+        assert drawdown.current == 3
+
+    def test_sliding_window_forgets_old_buckets(self):
+        window = SlidingWindow(window_seconds=60, buckets=6)
+        window.add(0, won=True, bet=100, win=200)
+        window.add(40, won=False, bet=100, win=0)
+        window.add(95, won=True, bet=100, win=50)
+
+        total = window.total()
+        assert (total.spins, total.wins, total.win) == (2, 1, 50)
+        assert len(window.by_bucket) <= window.buckets
+
+
+class TestSpinStatistics:
+    def test_rtp_hit_rate_and_multipliers(
+        self, spin_exchange_factory, spin_body_factory
+    ):
+        statistics = SpinStatistics()
+        for data in _spins(spin_exchange_factory, spin_body_factory, [0, 300, 0, 50]):
+            statistics.add(data)
+
+        snapshot = statistics.snapshot()
+        assert snapshot.spins == 4
+        assert snapshot.rtp == 350 / 400
+        assert snapshot.hit_rate == 0.5
+        assert snapshot.mean_multiplier == 3.5 / 4
+        assert snapshot.multiplier_histogram["<=0"] == 2
+        assert snapshot.multiplier_histogram["<=5"] == 1
+        assert snapshot.windows[0].spins == 4
+
+    def test_checkpoint_round_trip(self, spin_exchange_factory, spin_body_factory):
+        statistics = SpinStatistics()
+        for data in _spins(spin_exchange_factory, spin_body_factory, [0, 300, 20]):
+            statistics.add(data)
+
+        restored = SpinStatistics.model_validate_json(statistics.model_dump_json())
+
+        assert restored.snapshot() == statistics.snapshot()
+
+
+class TestStatisticsSubscriber:
+    def test_restart_catches_up_after_the_checkpoint(
+        self, spin_exchange_factory, spin_body_factory, tmp_path
+    ):
+        spins = _spins(
+            spin_exchange_factory, spin_body_factory, [0, 100, 0, 900, 0, 0, 250]
+        )
+        uninterrupted = StatisticsSubscriber()
+        for data in spins:
+            uninterrupted.process_data(data)
+        config = StatisticsConfig(
+            checkpoint_path=str(tmp_path / "statistics.json"),
+            checkpoint_every_spins=4,
+        )
+        crashed = StatisticsSubscriber(config)
+        for data in spins[:6]:
+            crashed.process_data(data)
+
+        restarted = StatisticsSubscriber(config)
+        assert restarted.restore()
+        last_checkpointed = restarted.snapshot().last_date
+        assert last_checkpointed == spins[3].response.date
+        stored_since = [
+            SpinRecord.from_document(data.to_document())
+            for data in spins
+            if data.response.date >= last_checkpointed
+        ]
+        assert restarted.catch_up(stored_since) == 3
+
+        assert restarted.snapshot() == uninterrupted.snapshot()
+
+    def test_catch_up_adds_the_uncounted_spins_of_the_checkpoint_date(
+        self, spin_exchange_factory, spin_body_factory, tmp_path
+    ):
+        spins = _spins(
+            spin_exchange_factory, spin_body_factory, [0, 100, 0, 900], seconds_apart=0
+        )
+        uninterrupted = StatisticsSubscriber()
+        for data in spins:
+            uninterrupted.process_data(data)
+        config = StatisticsConfig(
+            checkpoint_path=str(tmp_path / "statistics.json"),
+            checkpoint_every_spins=2,
+        )
+        crashed = StatisticsSubscriber(config)
+        for data in spins[:3]:
+            crashed.process_data(data)
+
+        restarted = StatisticsSubscriber(config)
+        assert restarted.restore()
+        stored = [SpinRecord.from_data(data) for data in spins]
+        assert restarted.catch_up(stored) == 2
+
+        assert restarted.snapshot() == uninterrupted.snapshot()
+
+    def test_served_live_next_to_the_metrics(
+        self, spin_exchange_factory, spin_body_factory
+    ):
+        subscriber = StatisticsSubscriber()
+        for data in _spins(spin_exchange_factory, spin_body_factory, [0, 200]):
+            subscriber.process_data(data)
+        server = MetricsServer(
+            PipelineMetrics(), port=0, statistics=subscriber.snapshot
+        )
+        server.start()
+        try:
+            url = f"http://127.0.0.1:{server.port}/statistics"
+            with urlopen(url, timeout=5) as response:
+                served = json.loads(response.read())
+        finally:
+            server.stop()
+
+        assert served["spins"] == 2
+        assert served["rtp"] == 1.0
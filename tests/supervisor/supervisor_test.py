@@ -0,0 +1,232 @@
+import json
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+import supervisor.processes
+
+from repository.fortune_tiger_interface import FortuneTigerRepository
+from repository.mongodb.repository import MongoConfig
+from scraper.traffic import to_fortune_tiger_data
+from supervisor import (
+    EXIT_FINISHED,
+    EXIT_GAME_ERROR,
+    EXIT_UNEXPECTED_ERROR,
+    ScraperProcessOptions,
+    ScraperSupervisor,
+    SupervisorConfig,
+    drain_records,
+    run_writer_process,
+)
+
+MONGO_CONFIG = MongoConfig(
+    connection_string="mongodb://localhost:1", database_name="d", collection_name="c"
+)
+# The fake processes are forked, so they see the paths the test sets here
+WORKDIR: Path = Path(".")
+
+
+def _next_run(name: str = "runs") -> int:
+    runs = WORKDIR / name
+    run = int(runs.read_text()) + 1 if runs.exists() else 1
+    runs.write_text(str(run))
+    return run
+
+
+def crash_then_finish(options, records, heartbeat):
+    run = _next_run()
+    records.put({"run": run})
+    records.close()
+    records.join_thread()
+    sys.exit(EXIT_GAME_ERROR if run == 1 else EXIT_FINISHED)
+
+
+def hang_then_finish(options, records, heartbeat):
+    run = _next_run()
+    records.put({"run": run})
+    if run == 1:
+        time.sleep(60)
+    records.close()
+    records.join_thread()
+    sys.exit(EXIT_FINISHED)
+
+
+def finish_after_a_while(options, records, heartbeat):
+    records.put({"run": _next_run()})
+    time.sleep(0.5)
+    records.close()
+    records.join_thread()
+    sys.exit(EXIT_FINISHED)
+
+
+def always_crash(options, records, heartbeat):
+    _next_run()
+    sys.exit(EXIT_UNEXPECTED_ERROR)
+
+
+def sleep_forever(options, records, heartbeat):
+    time.sleep(60)
+
+
+def crash_writer(config, records):
+    sys.exit(EXIT_UNEXPECTED_ERROR)
+
+
+def crash_writer_once(config, records):
+    if _next_run("writer_runs") == 1:
+        sys.exit(EXIT_UNEXPECTED_ERROR)
+    write_to_file(config, records)
+
+
+def write_to_file(config, records):
+    with open(WORKDIR / "written.jsonl", "a") as output:
+        while (document := records.get()) is not None:
+            output.write(json.dumps(document) + "\n")
+
+
+class InMemoryRepository(FortuneTigerRepository):
+    def __init__(self):
+        self.saved = []
+        self.batches = []
+
+    def save_batch(self, batch):
+        self.batches.append(len(batch))
+        return super().save_batch(batch)
+
+    def save_data(self, data) -> str:
+        self.saved.append(data)
+        return str(len(self.saved))
+
+    def ping(self) -> bool:
+        return True
+
+
+def _supervisor(
+    tmp_path, scraper_target, writer_target=write_to_file, **config
+) -> ScraperSupervisor:
+    global WORKDIR
+    WORKDIR = tmp_path
+    config = {
+        "initial_backoff_seconds": 0,
+        "poll_interval_seconds": 0.05,
+        "start_method": "fork",
+        **config,
+    }
+    return ScraperSupervisor(
+        ScraperProcessOptions(),
+        MONGO_CONFIG,
+        SupervisorConfig(**config),
+        scraper_target=scraper_target,
+        writer_target=writer_target,
+    )
+
+
+class TestScraperSupervisor:
+    def test_restarts_after_a_crash(self, tmp_path):
+        stats = _supervisor(tmp_path, crash_then_finish).run()
+
+        assert stats.finished
+        assert stats.scraper_starts == 2
+        assert stats.writer_starts == 1
+        # Both runs reached the same writer
+        written = (tmp_path / "written.jsonl").read_text().splitlines()
+        assert [json.loads(line) for line in written] == [{"run": 1}, {"run": 2}]
+
+    def test_kills_a_scraper_without_heartbeats(self, tmp_path):
+        stats = _supervisor(
+            tmp_path, hang_then_finish, heartbeat_timeout_seconds=0.5
+        ).run()
+
+        assert stats.finished
+        assert stats.hangs == 1
+        assert stats.scraper_starts == 2
+        # The spin of the hung run was relayed before killing it
+        written = (tmp_path / "written.jsonl").read_text().splitlines()
+        assert [json.loads(line) for line in written] == [{"run": 1}, {"run": 2}]
+
+    def test_gives_up_after_consecutive_failures(self, tmp_path):
+        stats = _supervisor(tmp_path, always_crash, max_consecutive_failures=3).run()
+
+        assert not stats.finished
+        assert stats.scraper_starts == 3
+
+    def test_gives_up_on_a_writer_that_keeps_failing(self, tmp_path):
+        started_at = time.monotonic()
+        stats = _supervisor(
+            tmp_path,
+            sleep_forever,
+            crash_writer,
+            initial_backoff_seconds=0.1,
+            max_consecutive_failures=3,
+        ).run()
+
+        assert not stats.finished
+        # Restarted twice, then once more at shutdown
+        assert stats.writer_starts == 4
+        assert stats.scraper_starts == 1
+        # restarted after 0.1s, then 0.2s
+        assert 0.3 <= time.monotonic() - started_at < 10
+
+    def test_restarts_a_dead_writer_to_save_the_last_spins(self, tmp_path):
+        stats = _supervisor(
+            tmp_path,
+            finish_after_a_while,
+            crash_writer_once,
+            initial_backoff_seconds=60,
+        ).run()
+
+        assert stats.finished
+        assert stats.writer_starts == 2
+        # The writer was waiting out its backoff when the scraper finished
+        written = (tmp_path / "written.jsonl").read_text().splitlines()
+        assert [json.loads(line) for line in written] == [{"run": 1}]
+
+
+class TestDrainRecords:
+    def test_saves_until_the_sentinel(self, spin_exchange_factory):
+        records = multiprocessing.get_context("fork").Queue()
+        data = to_fortune_tiger_data(*spin_exchange_factory())
+        records.put(data.to_document())
+        records.put({"not": "a spin"})
+        records.put(data.to_document())
+        records.put(None)
+        repository = InMemoryRepository()
+
+        assert drain_records(records, repository, poll_seconds=0.05) == 2
+        assert repository.saved[0].response.body == data.response.body
+
+    def test_saves_what_is_queued_in_one_batch(self, spin_exchange_factory):
+        records = multiprocessing.get_context("fork").Queue()
+        document = to_fortune_tiger_data(*spin_exchange_factory()).to_document()
+        for _ in range(5):
+            records.put(document)
+        records.put(None)
+        repository = InMemoryRepository()
+
+        assert drain_records(records, repository, batch_size=3) == 5
+        assert repository.batches == [3, 2]
+
+
+class TestRunWriterProcess:
+    def test_never_buffers_the_repository(self, monkeypatch):
+        configs = []
+
+        class FakeRepository(InMemoryRepository):
+            def __init__(self, config):
+                super().__init__()
+                configs.append(config)
+
+            def create_collection(self) -> None:
+                pass
+
+            def close(self) -> None:
+                pass
+
+        monkeypatch.setattr(supervisor.processes, "MongoRepository", FakeRepository)
+        records = multiprocessing.get_context("fork").Queue()
+        records.put(None)
+
+        run_writer_process(MONGO_CONFIG.model_copy(update={"buffered": True}), records)
+
+        assert [config.buffered for config in configs] == [False]